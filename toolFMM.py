@@ -5,15 +5,2629 @@ from tkinter import ttk, filedialog, messagebox, simpledialog
 from PIL import Image, ImageTk, ImageEnhance
 import json
 import csv
+import copy
+import hashlib
 from datetime import datetime
 import os
+import sys
 import time
 import math
-from scipy import optimize
-from scipy.spatial import distance
+import queue
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+# SciPy is only needed for CMM-mode fitting and is imported on first use
+
+
+def iter_tiles(shape, tile_size, overlap):
+    """Yield (core, padded) tile windows as (y0, y1, x0, x1) tuples covering an image"""
+    h, w = shape[:2]
+    for y0 in range(0, h, tile_size):
+        for x0 in range(0, w, tile_size):
+            y1, x1 = min(y0 + tile_size, h), min(x0 + tile_size, w)
+            padded = (max(0, y0 - overlap), min(h, y1 + overlap),
+                      max(0, x0 - overlap), min(w, x1 + overlap))
+            yield (y0, y1, x0, x1), padded
+
+
+def detect_edges(img, low=50, high=150, flat=None, origin=(0, 0), full_shape=None):
+    """Edge map used for contour detection (grayscale, flat field, Gaussian blur, Canny).
+
+    With a FlatField, img may be a tile at origin=(x, y) of an image of full_shape.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    if flat is not None:
+        gray = flat.apply(gray, origin, full_shape)
+    blurred = cv2.GaussianBlur(gray, (9, 9), 2)
+    return cv2.Canny(blurred, low, high)
+
+
+def spill_to_memmap(img):
+    """Move a decoded image into a temporary memory-mapped file so pages can be evicted.
+
+    The file is written strip by strip through an ordinary file handle, so the
+    copy never becomes resident in this process while it is written.
+    """
+    fd, path = tempfile.mkstemp(prefix="toolfmm_", suffix=".npy")
+    with os.fdopen(fd, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(img.dtype),
+                                                 'fortran_order': False, 'shape': img.shape})
+        for y0 in range(0, img.shape[0], 1024):
+            f.write(np.ascontiguousarray(img[y0:y0 + 1024]).tobytes())
+    return np.load(path, mmap_mode='r'), path
+
+
+def read_image(path, spill=lambda shape: False):
+    """Decode an image file, moved to a memory-mapped copy when `spill(shape)` is true.
+
+    Returns (image, memmap path or None), or (None, None) if the file cannot be
+    read. Nothing else holds the decoded pixels, so for a spilled image they are
+    freed as soon as the copy is written.
+    """
+    img = cv2.imread(path)
+    if img is None:
+        return None, None
+    if spill(img.shape):
+        return spill_to_memmap(img)
+    return img, None
+
+
+def resize_tiled(img, scale, strip_rows=1024):
+    """Downscale an image strip by strip so only one strip is resident at a time"""
+    h, w = img.shape[:2]
+    new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+    out = np.empty((new_h, new_w) + img.shape[2:], dtype=img.dtype)
+    for y0 in range(0, h, strip_rows):
+        y1 = min(h, y0 + strip_rows)
+        oy0, oy1 = int(round(y0 * scale)), min(new_h, int(round(y1 * scale)))
+        if oy1 > oy0:
+            out[oy0:oy1] = cv2.resize(np.ascontiguousarray(img[y0:y1]), (new_w, oy1 - oy0),
+                                      interpolation=cv2.INTER_AREA)
+    return out
+
+
+class _UnionFind:
+    """Minimal union-find over integer ids, used to join components across tile seams"""
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, a):
+        self.parent.setdefault(a, a)
+        root = a
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[a] != root:
+            self.parent[a], a = root, self.parent[a]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def find_contours_tiled(img, tile_size=2048, overlap=32, canny=None, flat=None):
+    """External contours of the Canny edge map, computed tile by tile.
+
+    Each tile is processed with `overlap` pixels of context so blur and gradient
+    results inside the tile core match whole-image processing. Edge components
+    that touch a tile seam are joined with a union-find over the seam pixels and
+    re-traced from a crop of their merged bounding box, so peak memory is bounded
+    by the tile size (or the largest object), not by the image size.
+    `canny` holds optional low/high thresholds for detect_edges, and `flat`
+    an optional FlatField applied to each tile.
+    """
+    canny = canny or {}
+    h, w = img.shape[:2]
+    uf = _UnionFind()
+    contours, boxes, seeds = [], {}, {}
+    seam_rows, seam_cols = {}, {}
+    next_id = 1
+
+    for (y0, y1, x0, x1), (py0, py1, px0, px1) in iter_tiles(img.shape, tile_size, overlap):
+        edges = detect_edges(np.ascontiguousarray(img[py0:py1, px0:px1]), flat=flat,
+                             origin=(px0, py0), full_shape=img.shape, **canny)
+        core = np.ascontiguousarray(edges[y0 - py0:y1 - py0, x0 - px0:x1 - px0])
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(core, connectivity=8)
+        if n <= 1:
+            continue
+
+        # Components touching an interior seam need stitching; the rest are final
+        touches = np.zeros(n, dtype=bool)
+        if y0 > 0:
+            touches[labels[0]] = True
+        if y1 < h:
+            touches[labels[-1]] = True
+        if x0 > 0:
+            touches[labels[:, 0]] = True
+        if x1 < w:
+            touches[labels[:, -1]] = True
+        touches[0] = False
+
+        if not touches[1:].any():
+            local = cv2.findContours(core, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+            contours.extend(c + np.array([[x0, y0]], dtype=np.int32) for c in local)
+            continue
+
+        free = np.isin(labels, np.flatnonzero(~touches)[1:]).astype(np.uint8)
+        local = cv2.findContours(free, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+        contours.extend(c + np.array([[x0, y0]], dtype=np.int32) for c in local)
+
+        ids = np.zeros(n, dtype=np.int64)
+        for lbl in np.flatnonzero(touches):
+            sx, sy, sw, sh = stats[lbl, :4]
+            ys, xs = np.nonzero(labels[sy:sy + sh, sx:sx + sw] == lbl)
+            ids[lbl] = next_id
+            boxes[next_id] = (x0 + sx, y0 + sy, x0 + sx + sw, y0 + sy + sh)
+            seeds[next_id] = (x0 + sx + xs[0], y0 + sy + ys[0])
+            uf.find(next_id)
+            next_id += 1
+        seam_rows[(y0, x0)] = (ids[labels[0]], ids[labels[-1]])
+        seam_cols[(y0, x0)] = (ids[labels[:, 0]], ids[labels[:, -1]])
+
+    # Join labels facing each other across a seam (8-connected)
+    for (y0, x0), (_, bottom) in seam_rows.items():
+        below = seam_rows.get((y0 + tile_size, x0))
+        if below is not None:
+            _join_seam(uf, bottom, below[0])
+    for (y0, x0), (_, right) in seam_cols.items():
+        beside = seam_cols.get((y0, x0 + tile_size))
+        if beside is not None:
+            _join_seam(uf, right, beside[0])
+    _join_corners(uf, seam_rows, seam_cols, tile_size)
+
+    merged = {}
+    for cid, (bx0, by0, bx1, by1) in boxes.items():
+        root = uf.find(cid)
+        if root in merged:
+            mx0, my0, mx1, my1 = merged[root]
+            merged[root] = (min(mx0, bx0), min(my0, by0), max(mx1, bx1), max(my1, by1))
+        else:
+            merged[root] = (bx0, by0, bx1, by1)
+
+    # Re-trace each stitched component from a crop of its bounding box
+    for root, (bx0, by0, bx1, by1) in merged.items():
+        sx, sy = seeds[root]
+        cx0, cy0 = max(0, bx0 - overlap), max(0, by0 - overlap)
+        cx1, cy1 = min(w, bx1 + overlap), min(h, by1 + overlap)
+        edges = detect_edges(np.ascontiguousarray(img[cy0:cy1, cx0:cx1]), flat=flat,
+                             origin=(cx0, cy0), full_shape=img.shape, **canny)
+        edges[:by0 - cy0] = 0
+        edges[by1 - cy0:] = 0
+        edges[:, :bx0 - cx0] = 0
+        edges[:, bx1 - cx0:] = 0
+        _, labels = cv2.connectedComponents(edges, connectivity=8)
+        lbl = labels[sy - cy0, sx - cx0]
+        if lbl == 0:
+            continue
+        mask = (labels == lbl).astype(np.uint8)
+        found = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+        if found:
+            cnt = max(found, key=cv2.contourArea)
+            contours.append(cnt + np.array([[cx0, cy0]], dtype=np.int32))
+
+    return _drop_nested(contours)
+
+
+def _join_seam(uf, side_a, side_b):
+    """Union labels on two facing seam lines, including diagonal neighbours"""
+    n = min(len(side_a), len(side_b))
+    a, b = side_a[:n], side_b[:n]
+    for shift in (-1, 0, 1):
+        if shift < 0:
+            pa, pb = a[-shift:], b[:shift]
+        elif shift > 0:
+            pa, pb = a[:-shift], b[shift:]
+        else:
+            pa, pb = a, b
+        hit = (pa > 0) & (pb > 0)
+        for i, j in set(zip(pa[hit].tolist(), pb[hit].tolist())):
+            uf.union(i, j)
+
+
+def _join_corners(uf, seam_rows, seam_cols, tile_size):
+    """Union components that only meet diagonally at a four-tile corner"""
+    for (y0, x0), (_, bottom) in seam_rows.items():
+        diag = seam_rows.get((y0 + tile_size, x0 + tile_size))
+        if diag is not None and len(bottom) and len(diag[0]):
+            if bottom[-1] > 0 and diag[0][0] > 0:
+                uf.union(int(bottom[-1]), int(diag[0][0]))
+        anti = seam_rows.get((y0 + tile_size, x0 - tile_size))
+        if anti is not None and len(bottom) and len(anti[0]):
+            if bottom[0] > 0 and anti[0][-1] > 0:
+                uf.union(int(bottom[0]), int(anti[0][-1]))
+
+
+def _drop_nested(contours):
+    """Keep only outermost contours, matching RETR_EXTERNAL on the whole image"""
+    if len(contours) < 2:
+        return list(contours)
+    rects = np.array([cv2.boundingRect(c) for c in contours])
+    areas = rects[:, 2] * rects[:, 3]
+    order = np.argsort(-areas)
+    kept = []
+    for i in order:
+        x, y, cw, ch = rects[i]
+        pt = (float(contours[i][0][0][0]), float(contours[i][0][0][1]))
+        nested = False
+        for j in kept:
+            kx, ky, kw, kh = rects[j]
+            if kx <= x and ky <= y and x + cw <= kx + kw and y + ch <= ky + kh and \
+                    (kx, ky, kw, kh) != (x, y, cw, ch) and \
+                    cv2.pointPolygonTest(contours[j], pt, False) > 0:
+                nested = True
+                break
+        if not nested:
+            kept.append(i)
+    return [contours[i] for i in sorted(kept)]
+
+
+def hough_circles_tiled(img, tile_size=2048, flat=None, **params):
+    """HoughCircles run per tile on a BGR image; tiles overlap by the largest
+    diameter and each circle is kept only by the tile whose core holds its centre"""
+    overlap = 2 * params.get('maxRadius', 150) + 8
+    found = []
+    for (y0, y1, x0, x1), (py0, py1, px0, px1) in iter_tiles(img.shape, tile_size, overlap):
+        gray = cv2.cvtColor(np.ascontiguousarray(img[py0:py1, px0:px1]), cv2.COLOR_BGR2GRAY)
+        if flat is not None:
+            gray = flat.apply(gray, (px0, py0), img.shape)
+        gray = cv2.medianBlur(gray, 5)
+        circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, **params)
+        if circles is None:
+            continue
+        for cx, cy, r in circles[0]:
+            gx, gy = cx + px0, cy + py0
+            if x0 <= gx < x1 and y0 <= gy < y1:
+                found.append((gx, gy, r))
+    if not found:
+        return None
+    return np.array([found], dtype=np.float32)
+
+
+DEFAULT_DETECTION_RECIPE = {
+    'hough': {'dp': 1.2, 'minDist': 20, 'param1': 50, 'param2': 30, 'minRadius': 10, 'maxRadius': 150},
+    'canny': {'low': 50, 'high': 150},
+}
+
+
+def _circle_error(found, label):
+    """Center plus radius error of a detected circle, relative to the labelled radius"""
+    (cx, cy, r), (lx, ly, lr) = found, label
+    return (math.hypot(cx - lx, cy - ly) + abs(r - lr)) / lr
+
+
+def score_hough(sample, params, max_edge_fraction=0.05):
+    """Mean labelled-circle error (1 = missed) and run time of one HoughCircles setting"""
+    # HoughCircles cost grows with the edge count; settings that turn noise into
+    # edges can take minutes per frame and are rejected before running
+    edges = cv2.Canny(sample['gray'], params['param1'] / 2, params['param1'])
+    if cv2.countNonZero(edges) > max_edge_fraction * edges.size:
+        return 1.0, 0.0
+    start = time.perf_counter()
+    circles = cv2.HoughCircles(sample['gray'], cv2.HOUGH_GRADIENT, **params)
+    elapsed = time.perf_counter() - start
+    circles = [] if circles is None else circles[0]
+    errors = [min([_circle_error(c, label) for c in circles] + [1.0]) for label in sample['labels']]
+    # Spurious circles make the "smallest is reference" rule unreliable
+    extra = max(len(circles) - len(sample['labels']), 0) * 0.02
+    return min(float(np.mean(errors)) + extra, 1.0), elapsed
+
+
+def score_canny(sample, params):
+    """Mean labelled-circle error of the contours found with one Canny setting"""
+    start = time.perf_counter()
+    edges = detect_edges(sample['small'], params['low'], params['high'])
+    contours = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+    elapsed = time.perf_counter() - start
+    errors = []
+    for lx, ly, lr in sample['small_labels']:
+        # Same rule as the click selection: the contour closest to the labelled edge
+        pt = (float(lx + lr), float(ly))
+        best = min(contours, key=lambda c: abs(cv2.pointPolygonTest(c, pt, True)), default=None)
+        if best is None:
+            errors.append(1.0)
+            continue
+        (cx, cy), r = cv2.minEnclosingCircle(best)
+        errors.append(min(_circle_error((cx, cy, r), (lx, ly, lr)), 1.0))
+    return float(np.mean(errors)), elapsed
+
+
+def tune_detection(samples, time_weight=0.5, workers=None, flat=None):
+    """Grid-search HoughCircles and Canny parameters on labelled frames.
+
+    `samples` is a list of dicts with a BGR 'image', the display 'scale' used
+    for contour detection, and 'labels' as (cx, cy, r) circles in image pixels.
+    Every candidate is scored on all samples in a thread pool (OpenCV releases
+    the GIL); the cost is mean error + `time_weight` * mean seconds per frame.
+    With a FlatField the frames are normalized first, as detection does.
+    Returns (recipe, report) where report holds the best errors and timings.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    prepared = []
+    for sample in samples:
+        gray = cv2.cvtColor(sample['image'], cv2.COLOR_BGR2GRAY)
+        scale = sample['scale']
+        small = sample['image'] if scale == 1.0 else cv2.resize(sample['image'], None, fx=scale, fy=scale)
+        if flat is not None:
+            # Same intensities the tuned thresholds will see in locate_circles and detect_edges
+            gray = flat.apply(gray)
+            small = flat.apply(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)).copy()
+        gray = cv2.medianBlur(gray, 5)
+        prepared.append({'gray': gray, 'labels': sample['labels'], 'small': small,
+                         'small_labels': [(x * scale, y * scale, r * scale) for x, y, r in sample['labels']]})
+
+    # Radius and spacing bounds follow from the labels, which also keeps Hough fast
+    radii = [r for sample in samples for _, _, r in sample['labels']]
+    spacing = min([math.hypot(a[0] - b[0], a[1] - b[1]) for sample in samples
+                   for i, a in enumerate(sample['labels']) for b in sample['labels'][i + 1:]] + [max(radii)])
+    bounds = {'minDist': max(spacing * 0.5, 1.0),
+              'minRadius': max(int(min(radii) * 0.8), 1), 'maxRadius': int(math.ceil(max(radii) * 1.2))}
+    hough_grid = [dict(bounds, dp=dp, param1=p1, param2=p2)
+                  for dp in (1.0, 1.2, 1.5) for p1 in (30, 50, 80, 120, 160) for p2 in (15, 20, 30, 40, 60)]
+    canny_grid = [{'low': low, 'high': low * ratio} for low in (20, 35, 50, 80, 120) for ratio in (2, 3)]
+
+    def evaluate(scorer, params):
+        results = [scorer(sample, params) for sample in prepared]
+        error = float(np.mean([e for e, _ in results]))
+        seconds = float(np.mean([t for _, t in results]))
+        return error + time_weight * seconds, error, seconds, params
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        hough = list(pool.map(lambda p: evaluate(score_hough, p), hough_grid))
+        canny = list(pool.map(lambda p: evaluate(score_canny, p), canny_grid))
+    best_hough = min(hough, key=lambda r: r[0])
+    best_canny = min(canny, key=lambda r: r[0])
+    recipe = {'hough': best_hough[3], 'canny': best_canny[3]}
+    report = {'hough_error': best_hough[1], 'hough_ms': best_hough[2] * 1000,
+              'canny_error': best_canny[1], 'canny_ms': best_canny[2] * 1000,
+              'candidates': len(hough_grid) + len(canny_grid), 'frames': len(samples)}
+    return recipe, report
+
+
+def scale_bounds(pixels_per_mm, diameter_mm, tolerance=0.15):
+    """Expected radius range (px) of a circle of the given diameter at this scale"""
+    r = diameter_mm * pixels_per_mm / 2
+    return max(int(r * (1 - tolerance)), 1), int(math.ceil(r * (1 + tolerance)))
+
+
+def fit_circle_lsq(points):
+    """Algebraic least-squares circle through points; returns ((cx, cy), r)"""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    mean = pts.mean(axis=0)
+    x, y = (pts - mean).T
+    A = np.column_stack([x, y, np.ones_like(x)])
+    c, *_ = np.linalg.lstsq(A, x * x + y * y, rcond=None)
+    cx, cy = c[0] / 2, c[1] / 2
+    r = math.sqrt(max(c[2] + cx * cx + cy * cy, 0.0))
+    return (cx + mean[0], cy + mean[1]), r
+
+
+def fit_circle_ransac(points, threshold=1.5, max_iterations=500, time_budget=None,
+                      success_prob=0.99, batch_size=64, rng=None):
+    """Robust circle fit that ignores burrs, chips and touching clamps.
+
+    Candidate circles are built from random point triplets a batch at a time and
+    scored against all points at once. Sampling stops when the adaptive RANSAC
+    iteration count for `success_prob` is reached, after `max_iterations`, or
+    once `time_budget` seconds have elapsed. The best candidate is refined by
+    least squares on its inliers (points within `threshold` pixels).
+
+    Returns ((cx, cy), r, inlier_mask, confidence), where confidence is the
+    probability that at least one all-inlier sample was drawn.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(pts)
+    if n < 3:
+        raise ValueError("Need at least 3 points to fit a circle")
+    rng = np.random.default_rng(rng)
+    start = time.perf_counter()
+
+    best_count, best = 0, None
+    needed, done = max_iterations, 0
+    while done < min(needed, max_iterations):
+        k = min(batch_size, max_iterations - done)
+        idx = rng.integers(0, n, size=(k, 3))
+        (ax, ay), (bx, by), (qx, qy) = pts[idx[:, 0]].T, pts[idx[:, 1]].T, pts[idx[:, 2]].T
+
+        # Circumcircles of all sampled triplets
+        d = 2 * (ax * (by - qy) + bx * (qy - ay) + qx * (ay - by))
+        valid = np.abs(d) > 1e-9
+        d = np.where(valid, d, 1.0)
+        a2, b2, q2 = ax * ax + ay * ay, bx * bx + by * by, qx * qx + qy * qy
+        ux = (a2 * (by - qy) + b2 * (qy - ay) + q2 * (ay - by)) / d
+        uy = (a2 * (qx - bx) + b2 * (ax - qx) + q2 * (bx - ax)) / d
+        r = np.hypot(ax - ux, ay - uy)
+
+        resid = np.abs(np.hypot(pts[None, :, 0] - ux[:, None], pts[None, :, 1] - uy[:, None]) - r[:, None])
+        counts = np.where(valid, (resid < threshold).sum(axis=1), 0)
+        j = int(np.argmax(counts))
+        done += k
+        if counts[j] > best_count:
+            best_count, best = int(counts[j]), (ux[j], uy[j], r[j])
+            w = best_count / n
+            if w >= 1.0:
+                needed = 0
+            else:
+                needed = math.ceil(math.log(1 - success_prob) / math.log(1 - w ** 3)) if w > 0 else max_iterations
+        if time_budget is not None and time.perf_counter() - start > time_budget:
+            break
+
+    if best is None:
+        raise ValueError("Points are collinear; no circle could be fitted")
+
+    cx, cy, r = best
+    mask = np.abs(np.hypot(pts[:, 0] - cx, pts[:, 1] - cy) - r) < threshold
+    if mask.sum() >= 3:
+        (cx, cy), r = fit_circle_lsq(pts[mask])
+        mask = np.abs(np.hypot(pts[:, 0] - cx, pts[:, 1] - cy) - r) < threshold
+    w = mask.mean()
+    confidence = 1.0 - (1.0 - w ** 3) ** done
+    return (cx, cy), r, mask, confidence
+
+
+def estimate_edge_noise(points, span=3):
+    """Robust per-point edge noise (px) from the local roughness of a contour.
+
+    Sparse (chain-approximated) contours are resampled at 1 px, then each
+    point is compared with the midpoint of its neighbours `span` samples away
+    along the local normal; for independent noise of sigma that deviation has
+    sigma * sqrt(1.5). Never below pixel quantization.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) > 1 and np.median(np.hypot(*np.diff(pts, axis=0).T)) > 1.5:
+        pts = resample_contour(pts, 1.0)
+    floor = 1.0 / math.sqrt(12.0)
+    if len(pts) < 2 * span + 1:
+        return floor
+    prev, nxt = np.roll(pts, span, axis=0), np.roll(pts, -span, axis=0)
+    tangent = nxt - prev
+    length = np.hypot(tangent[:, 0], tangent[:, 1])
+    ok = length > 0
+    d = pts - (prev + nxt) / 2
+    normal_dev = (d[ok, 0] * tangent[ok, 1] - d[ok, 1] * tangent[ok, 0]) / length[ok]
+    if not len(normal_dev):
+        return floor
+    return max(float(1.4826 * np.median(np.abs(normal_dev)) / math.sqrt(1.5)), floor)
+
+
+def batch_circle_diameter(pts):
+    """Algebraic circle fit over a batch of point sets (S, N, 2); returns (S,) diameters"""
+    centered = pts - pts.mean(axis=1, keepdims=True)
+    x, y = centered[..., 0], centered[..., 1]
+    z = x * x + y * y
+    n = pts.shape[1]
+    # Centered normal equations: the x/y sums vanish, leaving a 2x2 solve per sample
+    sxx, syy, sxy = (x * x).sum(1), (y * y).sum(1), (x * y).sum(1)
+    sxz, syz = (x * z).sum(1), (y * z).sum(1)
+    det = sxx * syy - sxy * sxy
+    cx = (sxz * syy - syz * sxy) / det / 2
+    cy = (syz * sxx - sxz * sxy) / det / 2
+    return 2 * np.sqrt(z.sum(1) / n + cx * cx + cy * cy)
+
+
+def batch_extent(axis=None):
+    """Batched extent along x (0), y (1) or the larger of the two (None)"""
+    def extent(pts):
+        span = pts.max(axis=1) - pts.min(axis=1)
+        return span.max(axis=1) if axis is None else span[:, axis]
+    return extent
+
+
+def batch_extent_along(angle_deg):
+    """Batched extent of the points projected on a fixed direction"""
+    direction = np.array([math.cos(math.radians(angle_deg)), math.sin(math.radians(angle_deg))])
+
+    def extent(pts):
+        projected = pts @ direction
+        return projected.max(axis=1) - projected.min(axis=1)
+    return extent
+
+
+def batch_inscribed_diameter(center):
+    """Batched twice the closest distance from a fixed center to the points"""
+    def inscribed(pts):
+        return 2 * np.hypot(pts[..., 0] - center[0], pts[..., 1] - center[1]).min(axis=1)
+    return inscribed
+
+
+def batch_distance(pts):
+    """Batched distance between the first two points"""
+    return np.hypot(*(pts[:, 0] - pts[:, 1]).T)
+
+
+def monte_carlo_uncertainty(points, estimator, pixels_per_mm, edge_sigma, scale_rel_std=0.0,
+                            samples=200, coverage=0.95, rng=None):
+    """Monte-Carlo uncertainty of a pixel measurement converted to mm.
+
+    All `samples` perturbed copies of `points` (Gaussian, `edge_sigma` px per
+    coordinate) are evaluated by `estimator` in one batched call, mapping
+    (S, N, 2) -> (S,) pixel values, and each is divided by an independently
+    perturbed scale (`scale_rel_std` relative). Returns mean, std and the
+    central `coverage` interval, all in mm.
+    """
+    rng = np.random.default_rng(rng)
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    noisy = pts[None] + edge_sigma * rng.standard_normal((samples,) + pts.shape, dtype=np.float32)
+    scale = pixels_per_mm * (1.0 + rng.normal(0.0, scale_rel_std, samples))
+    values = estimator(noisy) / scale
+    tail = (1.0 - coverage) / 2 * 100
+    low, high = np.percentile(values, [tail, 100 - tail])
+    return {'mean': float(values.mean()), 'std': float(values.std(ddof=1)),
+            'low': float(low), 'high': float(high), 'coverage': coverage}
+
+
+def measurement_unit(name):
+    """Display unit for a measurement key"""
+    return "°" if name.endswith('_deg') else "mm"
+
+
+def polar_edges(gray, center, max_radius, outer_guess, rays=720, oversample=2, min_strength=0.3):
+    """Outer and bore edge radius along every ray of one polar unwrap around center.
+
+    cv2.warpPolar resamples the disc into a rays x radii image, so the radial
+    derivative of all rays is a single np.diff. The outer edge is the strongest
+    step within 15% of outer_guess; its sign gives the part/background polarity,
+    and the bore edge is the strongest opposite step further in. Peaks are
+    refined to sub-sample accuracy with a parabola. Returns (angles, outer_r,
+    bore_r) in pixels, NaN for rays without a clear edge.
+    """
+    samples = int(math.ceil(max_radius * oversample))
+    step = max_radius / samples
+    polar = cv2.warpPolar(gray.astype(np.float32), (samples, rays), center, max_radius,
+                          cv2.WARP_POLAR_LINEAR | cv2.INTER_LINEAR)
+    polar = cv2.GaussianBlur(polar, (2 * oversample + 1, 1), 0)  # Smooth along the radius only
+    grad = np.diff(polar, axis=1)
+    n = grad.shape[1]
+    rows = np.arange(rays)
+    angles = rows * (2 * math.pi / rays)
+
+    def refine(strength, idx):
+        idx = np.clip(idx, 1, n - 2)
+        y0, y1, y2 = strength[rows, idx - 1], strength[rows, idx], strength[rows, idx + 1]
+        denom = y0 - 2 * y1 + y2
+        offset = np.divide(0.5 * (y0 - y2), denom, out=np.zeros_like(denom), where=denom < 0)
+        return (idx + 0.5 + np.clip(offset, -0.5, 0.5)) * step
+
+    lo, hi = int(outer_guess * 0.85 / step), min(n - 1, int(math.ceil(outer_guess * 1.15 / step)))
+    window = grad[:, lo:hi]
+    sign = np.sign(np.median(window[rows, np.abs(window).argmax(axis=1)])) or 1.0
+    outer_idx = (sign * window).argmax(axis=1) + lo
+    peak = sign * grad[rows, outer_idx]
+    level = min_strength * np.median(peak)
+    outer_r = np.where(peak > level, refine(sign * grad, outer_idx), np.nan)
+
+    # Bore: opposite polarity inside the outer edge, clear of its blur
+    inner = -sign * grad
+    inner = np.where(np.arange(n) < (outer_idx - 3 * oversample)[:, None], inner, -np.inf)
+    inner[:, :oversample] = -np.inf
+    bore_idx = inner.argmax(axis=1)
+    bore_r = np.where(inner[rows, bore_idx] > level, refine(np.where(np.isinf(inner), 0, inner), bore_idx), np.nan)
+    return angles, outer_r, bore_r
+
+
+ALL_FEATURES = "All Features"
+MEASUREMENT_PLUGINS = OrderedDict()
+
+
+def register_measurement(name, measure, uncertainty=None, manual_key=None, description=""):
+    """Add a measurement type to the Measure Type list and to "All Features".
+
+    measure(app, contour, fit) returns {key: value} from the shared, already
+    detected tool contour. fit is a dict private to one measurement pass where
+    measurers leave fit details (inliers, centres, profiles) instead of on the
+    app, which concurrent tasks share. uncertainty(app, points, sigma,
+    measurements, fit), if given, returns Monte-Carlo results per key and runs
+    right after measure with the same fit dict. manual_key is the feature a 2-point
+    manual span measures; without it the type needs a detected contour.
+    """
+    MEASUREMENT_PLUGINS[name] = {'measure': measure, 'uncertainty': uncertainty,
+                                 'manual_key': manual_key, 'description': description}
+
+
+def _diameter_uncertainty(app, points, sigma, measurements, fit):
+    if app.measurement_strategy != "automatic" or len(points) < 5:
+        return {'diameter_mm': app.run_uncertainty(points, batch_extent(), sigma)}
+    if fit.get('circle') is not None:
+        points = points[fit['circle']['inliers']]
+    return {'diameter_mm': app.run_uncertainty(points, batch_circle_diameter, sigma)}
+
+
+def _inner_diameter_uncertainty(app, points, sigma, measurements, fit):
+    center = fit.get('inscribed_center')
+    if app.measurement_strategy == "automatic" and center is not None and len(points) >= 5:
+        estimator = batch_inscribed_diameter(center)
+    else:
+        estimator = batch_extent()
+    return {'inner_diameter_mm': app.run_uncertainty(points, estimator, sigma)}
+
+
+def _extent_uncertainty(key, axis):
+    def uncertainty(app, points, sigma, measurements, fit):
+        exact_axis = axis if app.measurement_strategy == "automatic" and app.cmm_mode else None
+        return {key: app.run_uncertainty(points, batch_extent(exact_axis), sigma)}
+    return uncertainty
+
+
+def _width_uncertainty(app, points, sigma, measurements, fit):
+    if app.measurement_strategy == "automatic" and len(points) >= 2:
+        # Same estimator as the value: the minAreaRect short side, with the rectangle's angle held fixed
+        _, (w, h), angle = cv2.minAreaRect(points.astype(np.float32))
+        estimator = batch_extent_along(angle if w <= h else angle + 90)
+    else:
+        estimator = batch_extent(0)
+    return {'width_mm': app.run_uncertainty(points, estimator, sigma)}
+
+
+def _profile_uncertainty(app, points, sigma, measurements, fit):
+    # Profile features are distances between two silhouette edges
+    return {name: app.run_uncertainty([[0, 0], [value * app.pixels_per_mm, 0]], batch_distance, sigma)
+            for name, value in measurements.items() if name.endswith('_mm')}
+
+
+def _concentric_uncertainty(app, points, sigma, measurements, fit):
+    results = {}
+    for key, edge in (('diameter_mm', 'outer'), ('bore_diameter_mm', 'bore')):
+        edge_points = fit.get('polar', {}).get(edge)
+        if edge_points is not None:
+            results[key] = app.run_uncertainty(edge_points, batch_circle_diameter, estimate_edge_noise(edge_points))
+    return results
+
+
+def _measure_width(app, contour, fit):
+    if app.measurement_strategy == "automatic" and len(contour) >= 2:
+        return {'width_mm': min(cv2.minAreaRect(contour)[1]) / app.pixels_per_mm}
+    return {'width_mm': cv2.boundingRect(contour)[2] / app.pixels_per_mm}
+
+
+def fit_form_circle(points, threshold=1.5, max_iterations=500, time_budget=None, gate=5.0):
+    """Reference circle for form (roundness) measurement; returns ((cx, cy), r, kept).
+
+    RANSAC seeds the circle, then every point whose radial residual is within
+    `gate` robust standard deviations (and at least `threshold`) of the median
+    residual is kept and refitted by least squares. Burrs and a touching clamp
+    are gated out as with RANSAC, but a genuinely out-of-round edge stays in,
+    so its form error is not clipped to the RANSAC threshold.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    (cx, cy), r, _, _ = fit_circle_ransac(points, threshold=threshold, max_iterations=max_iterations,
+                                          time_budget=time_budget)
+    residual = np.hypot(points[:, 0] - cx, points[:, 1] - cy) - r
+    deviation = np.abs(residual - np.median(residual))
+    kept = deviation <= max(gate * 1.4826 * np.median(deviation), threshold)
+    if kept.sum() >= 5:
+        (cx, cy), r = fit_circle_lsq(points[kept])
+    return (cx, cy), r, kept
+
+
+def radial_spread(points, center, trim_pct=0.0):
+    """Max - min distance of the points from center, optionally between the
+    trim_pct and 100 - trim_pct percentiles to ignore single burrs"""
+    radial = np.hypot(points[:, 0] - center[0], points[:, 1] - center[1])
+    if trim_pct > 0:
+        low, high = np.percentile(radial, [trim_pct, 100 - trim_pct])
+        return float(high - low)
+    return float(radial.max() - radial.min())
+
+
+def _measure_roundness(app, contour, fit):
+    """Out-of-roundness: radial spread of the edge about its form reference circle"""
+    points = contour.reshape(-1, 2).astype(np.float64)
+    if len(points) < 5:
+        raise ValueError("Roundness needs at least 5 contour points")
+    center, _, kept = fit_form_circle(points, threshold=app.ransac_threshold_px,
+                                      max_iterations=app.ransac_max_iterations,
+                                      time_budget=app.ransac_time_budget)
+    return {'roundness_mm': radial_spread(points[kept], center, app.roundness_trim_pct) / app.pixels_per_mm}
+
+
+register_measurement("Diameter", lambda app, c, fit: {'diameter_mm': app.measure_diameter(c, fit)},
+                     _diameter_uncertainty, 'diameter_mm', "Outer diameter")
+register_measurement("Inner Diameter",
+                     lambda app, c, fit: {'inner_diameter_mm': app.measure_inner_diameter(c, fit)},
+                     _inner_diameter_uncertainty, 'inner_diameter_mm', "Inner hole diameter")
+register_measurement("Height", lambda app, c, fit: {'height_mm': app.measure_height(c)},
+                     _extent_uncertainty('height_mm', 1), 'height_mm', "Tool height from side view")
+register_measurement("Width", _measure_width, _width_uncertainty, 'width_mm',
+                     "Narrow side of the tool outline")
+register_measurement("Roundness", _measure_roundness, description="Radial spread of the edge about the fitted circle")
+register_measurement("Full Profile", lambda app, c, fit: app.measure_profile(c, fit), _profile_uncertainty,
+                     description="Length, shank, flutes, taper and corner radius from side view")
+register_measurement("Concentric Bore", lambda app, c, fit: app.measure_concentric(c, fit),
+                     _concentric_uncertainty,
+                     description="Outer and bore diameter, concentricity and roundness from one polar unwrap")
+
+
+def extract_tool_profile(contour, tolerance_px=2.0, window=15):
+    """Width profile of a side-view tool silhouette along its axis.
+
+    The contour is rotated so the principal (tool) axis is vertical and filled
+    into a mask no larger than the object. Vectorized row scans give the left and
+    right silhouette edges of every axial row; the resulting 1-D width array is
+    ordered tip -> shank and all dimensions are derived from it in one pass.
+    Returns a dict with the profile, the edges in image coordinates and the
+    dimensions in pixels (taper as included angle in degrees).
+    """
+    pts = contour.reshape(-1, 2).astype(np.float64)
+    if len(pts) < 3:
+        raise ValueError("Profile needs at least 3 contour points")
+    m = cv2.moments(contour)
+    theta = 0.5 * math.atan2(2 * m['mu11'], m['mu20'] - m['mu02'])  # major axis vs x-axis
+    rot = math.pi / 2 - theta
+    c, s = math.cos(rot), math.sin(rot)
+    rotated = pts @ np.array([[c, s], [-s, c]])
+    origin = rotated.min(axis=0)
+    rotated -= origin
+
+    h, w = int(math.ceil(rotated[:, 1].max())) + 1, int(math.ceil(rotated[:, 0].max())) + 1
+    mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.fillPoly(mask, [np.round(rotated).astype(np.int32)], 1)
+
+    # Row scans: first and last filled column of every axial row
+    filled = mask.any(axis=1)
+    left = mask.argmax(axis=1)
+    right = w - 1 - mask[:, ::-1].argmax(axis=1)
+    widths = np.where(filled, right - left + 1, 0).astype(np.float32)
+    rows = np.flatnonzero(filled)
+    if len(rows) < 3:
+        raise ValueError("Tool silhouette is too small for a profile")
+    span = slice(rows[0], rows[-1] + 1)
+    widths, left, right = widths[span], left[span], right[span]
+    n = len(widths)
+
+    # Silhouette edges back in image coordinates
+    axial = np.arange(rows[0], rows[-1] + 1, dtype=np.float64) + origin[1]
+    inverse = np.array([[c, -s], [s, c]])
+    left_edge = np.column_stack([left + origin[0], axial]) @ inverse
+    right_edge = np.column_stack([right + origin[0], axial]) @ inverse
+
+    # Local mean and spread; the shank is the smoother end of the tool
+    k = max(3, min(window, n // 5) | 1)
+    kernel = np.ones(k) / k
+    smooth = np.convolve(widths, kernel, mode='same')
+    spread = np.sqrt(np.maximum(np.convolve(widths ** 2, kernel, mode='same') - smooth ** 2, 0))
+    end = max(3, n // 5)
+    if spread[:end].mean() < spread[-end:].mean():
+        widths, smooth, spread = widths[::-1], smooth[::-1], spread[::-1]
+        left_edge, right_edge = left_edge[::-1], right_edge[::-1]
+
+    shank_d = float(np.median(widths[-end:]))
+
+    # Flutes: from the tip to the last row that departs from the smooth shank
+    deviates = (np.abs(smooth - shank_d) > tolerance_px) | (spread > tolerance_px / 2)
+    deviates[-end:] = False
+    flute_len = float(np.flatnonzero(deviates)[-1] + 1) if deviates.any() else 0.0
+
+    # Taper: included angle from the width slope along the shank section
+    y = np.arange(n - end, n, dtype=np.float64)
+    slope = np.polyfit(y, widths[-end:], 1)[0] if end >= 3 else 0.0
+    taper_deg = math.degrees(2 * math.atan(abs(slope) / 2))
+
+    # Corner radius: axial distance from the tip until the full tip diameter is reached
+    tip_d = float(np.percentile(widths[:max(5, n // 4)], 90))
+    reached = np.flatnonzero(widths >= tip_d - tolerance_px)
+    corner = float(min(reached[0] if len(reached) else 0, tip_d / 2))
+
+    return {
+        'widths': widths,
+        'left_edge': left_edge,
+        'right_edge': right_edge,
+        'axis_angle_deg': math.degrees(theta),
+        'overall_length': float(n),
+        'shank_diameter': shank_d,
+        'tip_diameter': tip_d,
+        'flute_length': flute_len,
+        'taper_deg': taper_deg,
+        'corner_radius': corner,
+    }
+
+
+def resample_contour(points, spacing):
+    """Resample a closed polyline at (roughly) uniform arc-length spacing"""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    closed = np.vstack([pts, pts[:1]])
+    seg = np.hypot(*np.diff(closed, axis=0).T)
+    arc = np.concatenate([[0.0], np.cumsum(seg)])
+    if arc[-1] <= 0:
+        return pts
+    t = np.arange(0.0, arc[-1], max(spacing, 1e-9))
+    return np.column_stack([np.interp(t, arc, closed[:, 0]), np.interp(t, arc, closed[:, 1])])
+
+
+def normalize_contour(points):
+    """Center points on their centroid and rotate the principal axis to vertical.
+
+    Returns (normalized points, centroid, rotation matrix) so that
+    normalized = (points - centroid) @ rotation.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    centroid = pts.mean(axis=0)
+    centered = pts - centroid
+    cov = centered.T @ centered
+    theta = 0.5 * math.atan2(2 * cov[0, 1], cov[0, 0] - cov[1, 1])
+    rot = math.pi / 2 - theta
+    c, s = math.cos(rot), math.sin(rot)
+    rotation = np.array([[c, s], [-s, c]])
+    return centered @ rotation, centroid, rotation
+
+
+def edge_distance_map(points, grid_size=512, margin=0.25):
+    """Nearest-outline-point map of a densely sampled closed outline.
+
+    The outline points are rasterized on a square grid and a labelled distance
+    transform assigns every grid cell the index of its nearest outline point, so
+    point-to-outline distances become one array lookup plus an exact hypot.
+    Returns a dict with the outline, the nearest-point map, an inside mask, the
+    grid origin and the grid resolution.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+    pad = (hi - lo).max() * margin + 1e-6
+    origin = lo - pad
+    res = ((hi - lo).max() + 2 * pad) / (grid_size - 1)
+    grid = np.round((pts - origin) / res).astype(np.int32)
+
+    edge = np.full((grid_size, grid_size), 255, dtype=np.uint8)
+    edge[grid[:, 1], grid[:, 0]] = 0
+    owner = np.zeros(grid_size * grid_size, dtype=np.int32)
+    owner[grid[:, 1] * grid_size + grid[:, 0]] = np.arange(len(pts), dtype=np.int32)
+    _, labels = cv2.distanceTransformWithLabels(edge, cv2.DIST_L2, 5, labelType=cv2.DIST_LABEL_PIXEL)
+    zero_idx = np.flatnonzero(edge.ravel() == 0)
+    label_owner = np.zeros(labels.max() + 1, dtype=np.int32)
+    label_owner[labels.ravel()[zero_idx]] = owner[zero_idx]
+    nearest = label_owner[labels]
+
+    inside = np.zeros((grid_size, grid_size), dtype=np.uint8)
+    cv2.fillPoly(inside, [grid], 1)
+    return {'outline': pts, 'nearest': nearest, 'inside': inside, 'origin': origin, 'res': res}
+
+
+def lookup_distance(dmap, points):
+    """Distance to the nearest outline point, inside flag and that nearest point"""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    outline = dmap['outline']
+    size = dmap['nearest'].shape[0]
+    g = np.clip(np.round((pts - dmap['origin']) / dmap['res']), 0, size - 1).astype(np.intp)
+    idx = dmap['nearest'][g[:, 1], g[:, 0]]
+
+    # The grid cell only approximates the nearest point; search the neighbouring
+    # outline samples (the outline is ordered) to remove the grid quantization
+    spacing = np.hypot(*np.diff(outline, axis=0).T).mean() if len(outline) > 1 else 1.0
+    k = int(math.ceil(dmap['res'] / max(spacing, 1e-9))) + 1
+    window = (idx[:, None] + np.arange(-k, k + 1)[None, :]) % len(outline)
+    d = np.hypot(pts[:, None, 0] - outline[window, 0], pts[:, None, 1] - outline[window, 1])
+    best = d.argmin(axis=1)
+    rows = np.arange(len(pts))
+    nearest = outline[window[rows, best]]
+    return d[rows, best], dmap['inside'][g[:, 1], g[:, 0]].astype(bool), nearest
+
+
+def align_to_outline(dmap, points, iterations=8, keep=0.8):
+    """Trimmed ICP: rigidly move points onto an outline, ignoring the worst matches
+    (the worn regions) when estimating each rotation/translation step"""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    for _ in range(iterations):
+        d, _, nearest = lookup_distance(dmap, pts)
+        sel = d <= np.quantile(d, keep)
+        src, dst = pts[sel], nearest[sel]
+        src_c, dst_c = src.mean(axis=0), dst.mean(axis=0)
+        u, _, vt = np.linalg.svd((src - src_c).T @ (dst - dst_c))
+        rot = u @ vt
+        if np.linalg.det(rot) < 0:
+            u[:, -1] *= -1
+            rot = u @ vt
+        pts = (pts - src_c) @ rot + dst_c
+    return pts
+
+
+class BaselineLibrary:
+    """New-tool reference outlines per tool ID and view, indexed in index.json and LRU-cached"""
+
+    def __init__(self, root_dir="tool_baselines", cache_size=64):
+        self.root_dir = root_dir
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.index_path = os.path.join(root_dir, "index.json")
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+
+    def has(self, tool_id, view):
+        return view in self.index.get(tool_id, {})
+
+    def save(self, tool_id, view, contour_mm, profile_mm=None, spacing_mm=0.02):
+        """Store a new-tool outline (in mm) as the baseline for tool_id/view"""
+        os.makedirs(self.root_dir, exist_ok=True)
+        outline, _, _ = normalize_contour(resample_contour(contour_mm, spacing_mm))
+        dmap = edge_distance_map(outline)
+        # Sanitizing is lossy ("A/B", "A B", "a_b" on a case-insensitive disk), so add a hash of the raw ID
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', tool_id) or "tool"
+        digest = hashlib.sha1(tool_id.encode('utf-8')).hexdigest()[:10]
+        filename = f"{name}_{digest}_{view}.npz"
+        np.savez_compressed(os.path.join(self.root_dir, filename), outline=outline,
+                            profile=np.asarray(profile_mm if profile_mm is not None else [], dtype=np.float32),
+                            nearest=dmap['nearest'], inside=dmap['inside'],
+                            origin=dmap['origin'], res=dmap['res'],
+                            created=datetime.now().isoformat())
+        self.index.setdefault(tool_id, {})[view] = filename
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+        self.cache.pop((tool_id, view), None)
+
+    def get(self, tool_id, view):
+        key = (tool_id, view)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        filename = self.index.get(tool_id, {}).get(view)
+        if filename is None:
+            return None
+        with np.load(os.path.join(self.root_dir, filename)) as data:
+            baseline = {k: data[k] for k in data.files}
+        baseline['res'] = float(baseline['res'])
+        self.cache[key] = baseline
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return baseline
+
+    def compare(self, tool_id, view, contour_mm, n_regions=12, spacing_mm=0.02):
+        """Chamfer/Hausdorff distances and a per-region wear map (negative = material lost)"""
+        baseline = self.get(tool_id, view)
+        if baseline is None:
+            return None
+        points = resample_contour(contour_mm, spacing_mm)
+        normalized, centroid, _ = normalize_contour(points)
+
+        # The principal axis has a 180 degree ambiguity; keep the better match
+        best = None
+        for flip in (1.0, -1.0):
+            aligned = align_to_outline(baseline, normalized * flip)
+            d, inside, _ = lookup_distance(baseline, aligned)
+            if best is None or d.mean() < best[0].mean():
+                best = (d, inside, aligned)
+        d_meas, inside, aligned = best
+        d_base, _, _ = lookup_distance(edge_distance_map(aligned), baseline['outline'])
+        signed = np.where(inside, -d_meas, d_meas)
+
+        # Regions are angular sectors around the centroid, in image orientation
+        offset = points - centroid
+        angle = np.mod(np.arctan2(offset[:, 1], offset[:, 0]), 2 * np.pi)
+        region = np.minimum((angle / (2 * np.pi) * n_regions).astype(np.intp), n_regions - 1)
+        counts = np.bincount(region, minlength=n_regions)
+        mean_dev = np.bincount(region, weights=signed, minlength=n_regions) / np.maximum(counts, 1)
+        max_dev = np.zeros(n_regions)
+        np.maximum.at(max_dev, region, d_meas)
+
+        return {
+            'chamfer_mm': float(0.5 * (d_meas.mean() + d_base.mean())),
+            'hausdorff_mm': float(max(d_meas.max(), d_base.max())),
+            'region_mean_mm': mean_dev,
+            'region_max_mm': max_dev,
+            'region': region,
+            'deviation_mm': signed,
+            'points_mm': points,
+        }
+
+
+CATALOG_FEATURES = ('diameter_mm', 'inner_diameter_mm', 'height_mm',
+                    'shank_diameter_mm', 'flute_length_mm', 'corner_radius_mm')
+
+
+class ToolCatalog:
+    """Nominal tool specs from a CSV, matched by nearest neighbour; parsed columns cached in an .npz"""
+
+    CACHE_VERSION = 1
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.cache_path = csv_path + ".index.npz"
+        self.trees = {}
+        if not self._load_cache():
+            self._parse_csv()
+            self._save_cache()
+
+    def __len__(self):
+        return len(self.items)
+
+    def _signature(self):
+        st = os.stat(self.csv_path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_cache(self):
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as cached:
+                meta = json.loads(str(cached['meta']))
+                if meta != {'version': self.CACHE_VERSION, 'signature': list(self._signature()),
+                            'features': list(CATALOG_FEATURES)}:
+                    return False
+                items, descriptions = cached['items'].tolist(), cached['descriptions'].tolist()
+                features = cached['features'].astype(np.float64)
+        except Exception:
+            return False  # Missing, stale, truncated or foreign: rebuild from the CSV
+        if features.shape != (len(items), len(CATALOG_FEATURES)) or len(descriptions) != len(items):
+            return False
+        self.items, self.descriptions, self.features = items, descriptions, features
+        return True
+
+    def _save_cache(self):
+        meta = {'version': self.CACHE_VERSION, 'signature': list(self._signature()),
+                'features': list(CATALOG_FEATURES)}
+        try:
+            with open(self.cache_path, 'wb') as f:
+                np.savez(f, meta=np.array(json.dumps(meta)), features=self.features,
+                         items=np.array(self.items, dtype=str), descriptions=np.array(self.descriptions, dtype=str))
+        except OSError:
+            pass  # Read-only location; the columns are simply parsed again next time
+
+    def _parse_csv(self):
+        def key(header):
+            k = re.sub(r'[^a-z0-9]+', '_', header.lower()).strip('_')
+            return k if k in CATALOG_FEATURES or f"{k}_mm" not in CATALOG_FEATURES else f"{k}_mm"
+
+        with open(self.csv_path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            headers = [key(h) for h in next(reader)]
+            rows = list(reader)
+
+        id_col = next((headers.index(k) for k in ('item', 'part_number', 'id', 'tool_id') if k in headers), 0)
+        desc_col = headers.index('description') if 'description' in headers else None
+        self.items = [row[id_col] for row in rows]
+        self.descriptions = [row[desc_col] if desc_col is not None else '' for row in rows]
+        self.features = np.full((len(rows), len(CATALOG_FEATURES)), np.nan)
+        for j, name in enumerate(CATALOG_FEATURES):
+            if name in headers:
+                col = headers.index(name)
+                for i, row in enumerate(rows):
+                    try:
+                        self.features[i, j] = float(row[col])
+                    except (ValueError, IndexError):
+                        pass
+
+    def _tree(self, cols):
+        if cols not in self.trees:
+            from scipy.spatial import cKDTree
+
+            rows = np.flatnonzero(~np.isnan(self.features[:, cols]).any(axis=1))
+            self.trees[cols] = (cKDTree(self.features[np.ix_(rows, cols)]), rows) if len(rows) else (None, rows)
+        return self.trees[cols]
+
+    def match(self, measurements, k=3):
+        """Nearest catalog entries for a dict of measured features (in mm)"""
+        cols = tuple(j for j, name in enumerate(CATALOG_FEATURES) if measurements.get(name))
+        if not cols:
+            return []
+        tree, rows = self._tree(cols)
+        if tree is None:
+            return []
+        query = [measurements[CATALOG_FEATURES[j]] for j in cols]
+        dist, idx = tree.query(query, k=min(k, len(rows)))
+        matches = []
+        for d, i in zip(np.atleast_1d(dist), np.atleast_1d(idx)):
+            row = rows[i]
+            matches.append({
+                'item': self.items[row],
+                'description': self.descriptions[row],
+                'distance_mm': float(d),
+                'deviations': {CATALOG_FEATURES[j]: float(measurements[CATALOG_FEATURES[j]] - self.features[row, j])
+                               for j in cols},
+            })
+        return matches
+
+
+class FrameAccumulator:
+    """Average or median of N camera frames, aligned to the first one.
+
+    Buffers are allocated once for a frame shape and reused between
+    captures: a float32 running sum for "mean", a uint8 frame stack for
+    "median". Each frame is registered to the first by phase correlation
+    (translation only) before it is accumulated.
+    """
+
+    def __init__(self, shape, max_frames, mode="mean"):
+        self.shape = tuple(shape)
+        self.max_frames = max_frames
+        self.mode = mode
+        if mode == "median":
+            self.stack = np.empty((max_frames,) + self.shape, dtype=np.uint8)
+        else:
+            self.sum = np.zeros(self.shape, dtype=np.float32)
+        self.window = cv2.createHanningWindow(self.shape[1::-1], cv2.CV_32F)
+        self.ref_gray = np.empty(self.shape[:2], dtype=np.float32)
+        self.gray = np.empty(self.shape[:2], dtype=np.float32)
+        self.warped = np.empty(self.shape, dtype=np.uint8)
+        self.count = 0
+
+    def fits(self, shape, max_frames, mode):
+        return self.shape == tuple(shape) and self.max_frames == max_frames and self.mode == mode
+
+    def reset(self):
+        self.count = 0
+        if self.mode != "median":
+            self.sum.fill(0)
+
+    def _gray(self, frame, out):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        out[...] = gray
+
+    def add(self, frame, min_response=0.05):
+        """Align and accumulate one frame; returns the (dx, dy) shift applied"""
+        if self.count >= self.max_frames:
+            raise ValueError("Accumulator is full")
+        shift = (0.0, 0.0)
+        if self.count == 0:
+            self._gray(frame, self.ref_gray)
+            aligned = frame
+        else:
+            self._gray(frame, self.gray)
+            (dx, dy), response = cv2.phaseCorrelate(self.ref_gray, self.gray, self.window)
+            if response >= min_response and (abs(dx) > 0.05 or abs(dy) > 0.05):
+                shift = (dx, dy)
+                M = np.float32([[1, 0, -dx], [0, 1, -dy]])
+                cv2.warpAffine(frame, M, self.shape[1::-1], dst=self.warped,
+                               flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+                aligned = self.warped
+            else:
+                aligned = frame
+        if self.mode == "median":
+            self.stack[self.count] = aligned
+        else:
+            cv2.accumulate(aligned, self.sum)
+        self.count += 1
+        return shift
+
+    def result(self):
+        """Combined uint8 image of the frames added so far"""
+        if self.count == 0:
+            raise ValueError("No frames accumulated")
+        if self.mode == "median":
+            return np.median(self.stack[:self.count], axis=0).astype(np.uint8)
+        return cv2.convertScaleAbs(self.sum, alpha=1.0 / self.count)
+
+
+class RunoutTracker:
+    """Edge position of a rotating tool in a fixed ROI, accumulated over frames for runout (TIR)"""
+
+    def __init__(self, roi, capacity=4096):
+        x0, y0, x1, y1 = (int(round(v)) for v in roi)
+        self.roi = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        self.axis = 0 if self.roi[2] - self.roi[0] >= self.roi[3] - self.roi[1] else 1
+        self.times = np.empty(capacity)
+        self.positions = np.empty(capacity)
+        self.capacity = capacity
+        self.count = 0
+        self.sign = 0.0  # Edge polarity, locked on the first frame
+
+    def reset(self):
+        self.count = 0
+        self.sign = 0.0
+
+    def add(self, frame, t):
+        """Track the edge in one frame; returns its position in frame px, or None"""
+        x0, y0, x1, y1 = self.roi
+        patch = frame[y0:y1, x0:x1]
+        if patch.size == 0:
+            raise ValueError("Runout ROI is outside the frame")
+        if patch.ndim == 3:
+            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+        profile = patch.mean(axis=self.axis)  # Along the longer ROI side
+        grad = np.diff(profile)
+        if len(grad) < 3:
+            raise ValueError("Runout ROI is too small")
+        if not self.sign:
+            self.sign = np.sign(grad[np.abs(grad).argmax()]) or 1.0
+        grad *= self.sign
+        i = int(np.clip(grad.argmax(), 1, len(grad) - 2))
+        if grad[i] <= 0:
+            return None
+        y0_, y1_, y2_ = grad[i - 1:i + 2]
+        denom = y0_ - 2 * y1_ + y2_
+        offset = float(np.clip(0.5 * (y0_ - y2_) / denom, -0.5, 0.5)) if denom < 0 else 0.0
+        position = i + 0.5 + offset + (x0 if self.axis == 0 else y0)
+        slot = self.count % self.capacity
+        self.times[slot], self.positions[slot] = t, position
+        self.count += 1
+        return position
+
+    def samples(self):
+        """(times, positions) of the buffered samples, oldest first"""
+        n = min(self.count, self.capacity)
+        order = (np.arange(n) + self.count - n) % self.capacity
+        return self.times[order], self.positions[order]
+
+    def fit(self, min_samples=32, scan=41, trim_pct=0.5, bootstrap=100):
+        """Runout of the edge track in px ('method': sinusoid or peak-to-peak), or None with too few samples"""
+        t, x = self.samples()
+        n = len(t)
+        if n < min_samples or t[-1] <= t[0]:
+            return None
+        t = t - t[0]
+        duration = t[-1]
+
+        # Coarse frequency: FFT of the detrended track resampled onto a uniform grid
+        grid = np.linspace(0.0, duration, n)
+        uniform = np.interp(grid, t, x)
+        uniform -= np.polyval(np.polyfit(grid, uniform, 1), grid)
+        spectrum = np.abs(np.fft.rfft(uniform * np.hanning(n)))
+        spectrum[0] = 0.0
+        k = int(np.clip(spectrum.argmax(), 1, len(spectrum) - 2))
+        y0, y1, y2 = spectrum[k - 1:k + 2]
+        denom = y0 - 2 * y1 + y2
+        k = k + (float(np.clip(0.5 * (y0 - y2) / denom, -0.5, 0.5)) if denom < 0 else 0.0)
+        bin_hz = (n - 1) / duration / n
+
+        # Fine frequency: least squares of [1, t, cos, sin] for a band of candidates at once
+        freqs = np.clip((k + np.linspace(-1.0, 1.0, scan)) * bin_hz, bin_hz * 0.5, None)
+        phase = 2 * np.pi * freqs[:, None] * t
+        A = np.stack([np.ones_like(phase), np.broadcast_to(t, phase.shape), np.cos(phase), np.sin(phase)], axis=2)
+        AtA = np.einsum('fni,fnj->fij', A, A)
+        Atx = np.einsum('fni,n->fi', A, x)
+        coef = np.linalg.solve(AtA + 1e-12 * np.eye(4), Atx[..., None])[..., 0]
+        residual = ((np.einsum('fni,fi->fn', A, coef) - x) ** 2).sum(axis=1)
+        best = int(residual.argmin())
+        amplitude = float(np.hypot(coef[best, 2], coef[best, 3]))
+        sigma = math.sqrt(residual[best] / max(n - 4, 1))
+
+        # Timing-free peak-to-peak of the track without its slow drift, with a bootstrap spread
+        detrended = x - np.polyval(np.polyfit(t, x, 1), t)
+        limits = (trim_pct, 100 - trim_pct)
+        low, high = np.percentile(detrended, limits)
+        resampled = detrended[np.random.default_rng(0).integers(0, n, (bootstrap, n))]
+        spread = np.diff(np.percentile(resampled, limits, axis=1), axis=0)[0]
+
+        periodic = sigma < amplitude / 3
+        tir, tir_std = ((2.0 * amplitude, 2.0 * sigma * math.sqrt(2.0 / n)) if periodic
+                        else (float(high - low), float(spread.std())))
+        return {
+            'frequency_hz': float(freqs[best]),
+            'rpm': float(freqs[best] * 60.0),
+            'eccentricity_px': tir / 2.0,
+            'tir_px': tir,
+            'tir_std_px': tir_std,
+            'method': "sinusoid" if periodic else "peak-to-peak",
+            'periodic': periodic,
+            'sine_tir_px': 2.0 * amplitude,
+            'peak_to_peak_px': float(high - low),
+            'residual_px': sigma,
+            'samples': n,
+            'duration_s': float(duration),
+        }
+
+
+class Metrics:
+    """In-process counters, gauges and histograms in Prometheus text format.
+
+    Series are keyed by metric name and a sorted label tuple. Updates take a
+    lock, so any thread may record. render() gives the exposition text, which
+    can be written to a file (node_exporter textfile collector) or served on
+    localhost with serve().
+    """
+
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.help = {}  # name -> (type, help text)
+        self.values = {}  # (name, labels) -> float, or [bucket counts, sum, count] for histograms
+        self.server = None
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [[0] * len(self.LATENCY_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def get(self, name, **labels):
+        with self.lock:
+            return self.values.get((name, tuple(sorted(labels.items()))))
+
+    @staticmethod
+    def _escape(value):
+        """Label value with backslash, quote and newline escaped as the text format requires"""
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @classmethod
+    def _labels(cls, labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{cls._escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items(), key=lambda item: item[0])
+            items = [(key, list(value) if isinstance(value, list) else value) for key, value in items]
+        lines = []
+        described = set()
+        for (name, labels), value in items:
+            if name not in described and name in self.help:
+                kind, text = self.help[name]
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                described.add(name)
+            if isinstance(value, list):
+                buckets, total, count = value
+                for bound, n in zip(self.LATENCY_BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {n}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {count}")
+            else:
+                lines.append(f"{name}{self._labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the exposition atomically, so a scraper never reads half a file"""
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics on a background thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Scrapes would flood the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task whose request was cancelled or superseded"""
+
+
+class TaskContext:
+    """Handed to every background task for progress reports and cancellation checks"""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.state = (None, None)  # (fraction, message), read by the Tk thread
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise TaskCancelled()
+
+    def progress(self, fraction=None, message=None):
+        self.check()
+        self.state = (fraction, message)
+
+
+class TaskExecutor:
+    """Run slow work on a thread pool and deliver results on the Tk thread.
+
+    Tasks are keyed by request kind. Submitting a key that is still running
+    with the same `signature` is coalesced (the click is ignored); a different
+    signature supersedes it: the old task is cancelled and its result dropped.
+    A cancelled task that was already running still counts as running(key)
+    until its worker returns, so callers sharing a resource (the camera) with
+    it wait for it. Results, errors and progress are marshalled back by polling from
+    root.after, so callbacks may touch widgets.
+    """
+
+    def __init__(self, root, status, on_error, workers=2, poll_ms=50, metrics=None):
+        self.root = root
+        self.metrics = metrics
+        self.status = status
+        self.on_error = on_error
+        self.workers = workers
+        self.poll_ms = poll_ms
+        self.pool = None
+        self.active = {}  # key -> dict(context, future, on_done, label, signature)
+        self.stopping = {}  # future -> key of cancelled tasks whose worker has not returned yet
+        self.lock = threading.Lock()
+        self.polling = False
+        self.last_status = None
+
+    def submit(self, key, fn, on_done, label, signature=None):
+        """Start fn(context) for key; returns the context, or None when coalesced"""
+        entry = self.active.get(key)
+        if entry is not None:
+            if entry['signature'] == signature:
+                return None
+            self.cancel(key)
+        if self.pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="task")
+        context = TaskContext()
+        future = self.pool.submit(self._timed, key, fn, context)
+        self.active[key] = {'context': context, 'future': future, 'on_done': on_done,
+                            'label': label, 'signature': signature}
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return context
+
+    def _timed(self, key, fn, context):
+        start = time.perf_counter()
+        try:
+            return fn(context)
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("toolfmm_stage_seconds", time.perf_counter() - start, stage=key)
+
+    def running(self, key):
+        if key in self.active:
+            return True
+        with self.lock:
+            return key in self.stopping.values()
+
+    def cancel(self, key):
+        entry = self.active.pop(key, None)
+        if entry is None:
+            return False
+        entry['context'].cancelled.set()
+        future = entry['future']
+        if not future.cancel():
+            with self.lock:
+                self.stopping[future] = key
+            future.add_done_callback(self._stopped)
+        if self.metrics is not None:
+            self.metrics.inc("toolfmm_cancelled_total", stage=key)
+        return True
+
+    def _stopped(self, future):
+        with self.lock:
+            self.stopping.pop(future, None)
+
+    def cancel_all(self):
+        return [key for key in list(self.active) if self.cancel(key)]
+
+    def shutdown(self):
+        self.cancel_all()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        try:
+            self._deliver()
+            if self.active:
+                self._show_progress()
+        finally:
+            # A failing callback must not end the poll chain while tasks are pending
+            if self.active:
+                self.root.after(self.poll_ms, self._poll)
+            else:
+                self.polling = False
+
+    def _deliver(self):
+        for key, entry in list(self.active.items()):
+            if not entry['future'].done():
+                continue
+            del self.active[key]
+            self.last_status = None
+            try:
+                result = entry['future'].result()
+            except TaskCancelled:
+                continue
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.inc("toolfmm_failures_total", stage=key)
+                self.on_error(entry['label'], e)
+            else:
+                try:
+                    entry['on_done'](result)
+                except Exception as e:
+                    if self.metrics is not None:
+                        self.metrics.inc("toolfmm_failures_total", stage=key)
+                    self.on_error(entry['label'], e)
+
+    def _show_progress(self):
+        entry = list(self.active.values())[-1]
+        fraction, message = entry['context'].state
+        text = entry['label'] + "..."
+        if fraction is not None:
+            text += f" {fraction:.0%}"
+        if message:
+            text += f" - {message}"
+        text += " (Esc to cancel)"
+        if text != self.last_status:
+            self.last_status = text
+            self.status(text)
+
+
+class SessionRecorder:
+    """Write camera frames with capture timestamps as chunked NPZ files.
+
+    Frames are buffered and every `chunk_frames` frames a compressed
+    chunk_NNNNN.npz (frames, timestamps) is written on a background thread,
+    so the live view keeps its frame rate. session.json describes the run.
+    """
+
+    def __init__(self, directory, chunk_frames=30):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_frames = chunk_frames
+        self.frames = []
+        self.timestamps = []
+        self.chunks = 0
+        self.total = 0
+        self.start = None
+        self.writer = None
+
+    def write(self, frame, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.start is None:
+            self.start = timestamp
+        self.frames.append(frame.copy())
+        self.timestamps.append(timestamp - self.start)
+        if len(self.frames) >= self.chunk_frames:
+            self._flush()
+
+    def _flush(self):
+        if not self.frames:
+            return
+        if self.writer is not None:
+            self.writer.join()
+        path = os.path.join(self.directory, f"chunk_{self.chunks:05d}.npz")
+        frames, timestamps = np.stack(self.frames), np.array(self.timestamps)
+        self.writer = threading.Thread(target=np.savez_compressed, args=(path,),
+                                       kwargs={'frames': frames, 'timestamps': timestamps})
+        self.writer.start()
+        self.chunks += 1
+        self.total += len(frames)
+        self.frames, self.timestamps = [], []
+
+    def close(self):
+        """Write the remaining frames and the session description"""
+        self._flush()
+        if self.writer is not None:
+            self.writer.join()
+        with open(os.path.join(self.directory, "session.json"), 'w') as f:
+            json.dump({'frames': self.total, 'chunks': self.chunks, 'started': self.start}, f)
+        return self.total
+
+
+class ReplayCapture:
+    """Recorded session that stands in for cv2.VideoCapture.
+
+    With `realtime` the original frame timing is reproduced (read() waits
+    for each frame's timestamp, and next_frame_delay() tells a poller how
+    long that wait would be); otherwise frames are returned as fast as they
+    are read. Chunks are loaded one at a time.
+    """
+
+    def __init__(self, directory, realtime=True, loop=False):
+        self.directory = directory
+        self.realtime = realtime
+        self.loop = loop
+        self.chunk_paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                                  if re.fullmatch(r"chunk_\d+\.npz", name))
+        self.frame_count = 0
+        for path in self.chunk_paths:
+            with np.load(path) as chunk:
+                self.frame_count += len(chunk['timestamps'])
+        self.opened = self.frame_count > 0
+        self._seek(0)
+
+    def _seek(self, frame):
+        self.chunk_index, self.offset, self.position = -1, 0, 0
+        self.frames = self.timestamps = None
+        realtime, self.realtime = self.realtime, False
+        while self.position < frame and self.read()[0]:
+            pass
+        self.realtime = realtime
+        self.clock_start = None
+
+    def _load(self, index):
+        with np.load(self.chunk_paths[index]) as chunk:
+            self.frames, self.timestamps = chunk['frames'], chunk['timestamps']
+        self.chunk_index, self.offset = index, 0
+
+    def isOpened(self):
+        return self.opened
+
+    def _advance(self):
+        """Load the chunk holding the next frame; False at the end of the recording"""
+        if self.frames is None or self.offset >= len(self.frames):
+            if self.chunk_index + 1 >= len(self.chunk_paths):
+                if not self.loop:
+                    return False
+                self._seek(0)
+            self._load(self.chunk_index + 1)
+        return True
+
+    def next_frame_delay(self):
+        """Seconds until the next frame is due in realtime mode (0 if it can be read now)"""
+        if not self.opened or not self.realtime or not self._advance():
+            return 0.0
+        now = time.perf_counter()
+        timestamp = float(self.timestamps[self.offset])
+        if self.clock_start is None:
+            self.clock_start = now - timestamp
+        return max(0.0, self.clock_start + timestamp - now)
+
+    def read(self):
+        if not self.opened or not self._advance():
+            return False, None
+        delay = self.next_frame_delay()
+        if delay > 0:
+            time.sleep(delay)
+        frame = self.frames[self.offset].copy()
+        self.offset += 1
+        self.position += 1
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_count)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FPS and self.frames is not None and len(self.timestamps) > 1:
+            return float((len(self.timestamps) - 1) / (self.timestamps[-1] - self.timestamps[0]))
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self._seek(int(value))
+            return True
+        return False
+
+    def release(self):
+        self.opened = False
+        self.frames = self.timestamps = None
+
+
+# X-bar/R chart constants by subgroup size: (A2, D3, D4, d2)
+SPC_CONSTANTS = {
+    2: (1.880, 0.0, 3.267, 1.128), 3: (1.023, 0.0, 2.574, 1.693),
+    4: (0.729, 0.0, 2.282, 2.059), 5: (0.577, 0.0, 2.114, 2.326),
+    6: (0.483, 0.0, 2.004, 2.534), 7: (0.419, 0.076, 1.924, 2.704),
+    8: (0.373, 0.136, 1.864, 2.847), 9: (0.337, 0.184, 1.816, 2.970),
+    10: (0.308, 0.223, 1.777, 3.078),
+}
+
+
+class WatchFolder:
+    """Feed settled images from a (network) folder to worker threads through a bounded queue"""
+
+    EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+    def __init__(self, directory, process, queue_size=8, workers=1, poll_interval=1.0):
+        self.directory = directory
+        self.process = process
+        self.poll_interval = poll_interval
+        self.done_dir = os.path.join(directory, "done")
+        self.failed_dir = os.path.join(directory, "failed")
+        os.makedirs(self.done_dir, exist_ok=True)
+        os.makedirs(self.failed_dir, exist_ok=True)
+        self.ledger_path = os.path.join(directory, "ingested.jsonl")
+        self.ledger = set()
+        if os.path.exists(self.ledger_path):
+            with open(self.ledger_path, 'r') as f:
+                self.ledger = {json.loads(line)['key'] for line in f if line.strip()}
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue()
+        self.in_flight = {}  # path -> ledger key, queued or being processed
+        self.sizes = {}  # path -> (size, mtime_ns) seen at the previous poll
+        self.counts = {'done': 0, 'failed': 0}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.threads = [threading.Thread(target=self._scan, daemon=True)]
+        self.threads += [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def _scan(self):
+        while not self.stopped.is_set():
+            try:
+                entries = [e for e in os.scandir(self.directory)
+                           if e.is_file() and e.name.lower().endswith(self.EXTENSIONS)]
+            except OSError:
+                entries = []  # Share unavailable; try again next poll
+            stats = []
+            for entry in entries:
+                try:
+                    stats.append((entry, entry.stat()))
+                except OSError:
+                    continue  # Deleted or renamed since the listing
+            sizes = {}
+            for entry, stat in sorted(stats, key=lambda item: item[1].st_mtime_ns):
+                sizes[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                with self.lock:
+                    if entry.path in self.in_flight or self.sizes.get(entry.path) != sizes[entry.path]:
+                        continue  # Queued already, or still being written
+                key = f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}"
+                if key in self.ledger:
+                    try:
+                        self._move(entry.path, self.done_dir)  # Stored before a restart, not yet moved
+                    except OSError:
+                        pass  # Gone already, or the share is busy; retried next poll
+                    continue
+                with self.lock:
+                    self.in_flight[entry.path] = key
+                while not self.stopped.is_set():
+                    try:
+                        self.queue.put(entry.path, timeout=self.poll_interval)  # Blocks while workers are busy
+                        break
+                    except queue.Full:
+                        continue
+            with self.lock:
+                self.sizes = sizes
+            self.stopped.wait(self.poll_interval)
+
+    def _work(self):
+        while not self.stopped.is_set():
+            try:
+                path = self.queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            try:
+                self.results.put((path, self.process(path), None))
+            except Exception as e:
+                self.results.put((path, None, e))
+
+    def complete(self, path, error=None):
+        """Ledger a persisted result and move the file out; OSError leaves it for a later poll"""
+        with self.lock:
+            key = self.in_flight.pop(path, None)
+        if error is None:
+            with open(self.ledger_path, 'a') as f:
+                f.write(json.dumps({'key': key, 'time': datetime.now().isoformat()}) + "\n")
+            self.ledger.add(key)
+            self._move(path, self.done_dir)
+            self.counts['done'] += 1
+        else:
+            target = self._move(path, self.failed_dir)
+            with open(target + ".error.txt", 'w') as f:
+                f.write(f"{type(error).__name__}: {error}\n")
+            self.counts['failed'] += 1
+
+    def _move(self, path, folder):
+        name, ext = os.path.splitext(os.path.basename(path))
+        target = os.path.join(folder, name + ext)
+        n = 1
+        while os.path.exists(target):
+            target = os.path.join(folder, f"{name}_{n}{ext}")
+            n += 1
+        os.replace(path, target)
+        return target
+
+    def pending(self):
+        with self.lock:
+            return len(self.in_flight)
+
+    def stop(self):
+        self.stopped.set()
+
+
+class MeasurementHistory:
+    """Saved measurements stored column by column, with NaN where a record lacks a feature"""
+
+    VIEWS = ('top_view', 'side_view')
+    TEXT_COLUMNS = ('tool_id', 'operator')
+    UNCERTAINTY_FIELDS = ('mean', 'std', 'low', 'high', 'coverage')
+
+    def __init__(self, records=(), capacity=64):
+        self.size = 0
+        self.capacity = capacity
+        self.timestamps = np.full(capacity, np.nan)
+        self.codes = {column: np.zeros(capacity, dtype=np.int32) for column in self.TEXT_COLUMNS}
+        self.tables = {column: [] for column in self.TEXT_COLUMNS}
+        self.lookup = {column: {} for column in self.TEXT_COLUMNS}
+        self.notes = []
+        self.features = {}  # (view, name) -> float64 column
+        self.intervals = {}  # (view, name) -> float64 (capacity, len(UNCERTAINTY_FIELDS)) block
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("history index out of range")
+        return self.record(index)
+
+    def __iter__(self):
+        return (self.record(i) for i in range(self.size))
+
+    def _intern(self, column, value):
+        value = value or ''
+        code = self.lookup[column].get(value)
+        if code is None:
+            code = self.lookup[column][value] = len(self.tables[column])
+            self.tables[column].append(value)
+        return code
+
+    def _grow(self):
+        self.capacity *= 2
+
+        def grown(array, fill):
+            new = np.full((self.capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            new[:self.size] = array[:self.size]
+            return new
+
+        self.timestamps = grown(self.timestamps, np.nan)
+        self.codes = {column: grown(codes, 0) for column, codes in self.codes.items()}
+        self.features = {key: grown(values, np.nan) for key, values in self.features.items()}
+        self.intervals = {key: grown(values, np.nan) for key, values in self.intervals.items()}
+
+    def append(self, record):
+        """Copy a record's metadata, numeric measurements and uncertainties into the columns"""
+        if self.size == self.capacity:
+            self._grow()
+        i = self.size
+        metadata = record.get('metadata', {})
+        try:
+            self.timestamps[i] = datetime.fromisoformat(metadata.get('timestamp')).timestamp()
+        except (TypeError, ValueError):
+            self.timestamps[i] = np.nan
+        for column in self.TEXT_COLUMNS:
+            self.codes[column][i] = self._intern(column, metadata.get(column))
+        self.notes.append(metadata.get('notes') or '')
+        for view in self.VIEWS:
+            for name, value in (record.get(view) or {}).get('measurements', {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    key = (view, name)
+                    if key not in self.features:
+                        self.features[key] = np.full(self.capacity, np.nan)
+                    self.features[key][i] = value
+            for name, result in (record.get(view) or {}).get('uncertainty', {}).items():
+                if isinstance(result, dict):
+                    key = (view, name)
+                    if key not in self.intervals:
+                        self.intervals[key] = np.full((self.capacity, len(self.UNCERTAINTY_FIELDS)), np.nan)
+                    self.intervals[key][i] = [result.get(field, np.nan) for field in self.UNCERTAINTY_FIELDS]
+        self.size += 1
+
+    def metadata(self, i):
+        timestamp = self.timestamps[i]
+        return {'timestamp': None if np.isnan(timestamp) else datetime.fromtimestamp(timestamp).isoformat(),
+                'tool_id': self.tables['tool_id'][self.codes['tool_id'][i]],
+                'operator': self.tables['operator'][self.codes['operator'][i]],
+                'notes': self.notes[i]}
+
+    def record(self, i):
+        record = {'metadata': self.metadata(i)}
+        for view in self.VIEWS:
+            record[view] = {'measurements': {name: float(values[i]) for (v, name), values in self.features.items()
+                                             if v == view and not np.isnan(values[i])},
+                            'uncertainty': {name: {field: float(x) for field, x in zip(self.UNCERTAINTY_FIELDS, rows[i])
+                                                   if not np.isnan(x)}
+                                            for (v, name), rows in self.intervals.items()
+                                            if v == view and not np.isnan(rows[i]).all()}}
+        return record
+
+    def column(self, view, name):
+        """Read-only values of one feature for all records, NaN where missing"""
+        values = self.features.get((view, name))
+        if values is None:
+            return np.full(self.size, np.nan)
+        values = values[:self.size]
+        values.flags.writeable = False
+        return values
+
+    def feature_names(self):
+        return sorted(self.features)
+
+    def mask(self, tool_id=None, operator=None, since=None, until=None):
+        """Boolean row filter; since/until are datetimes"""
+        keep = np.ones(self.size, dtype=bool)
+        for column, value in (('tool_id', tool_id), ('operator', operator)):
+            if value is not None:
+                code = self.lookup[column].get(value, -1)
+                keep &= self.codes[column][:self.size] == code
+        if since is not None:
+            keep &= self.timestamps[:self.size] >= since.timestamp()
+        if until is not None:
+            keep &= self.timestamps[:self.size] <= until.timestamp()
+        return keep
+
+    def aggregate(self, view, name, by='tool_id', mask=None):
+        """Count, mean, std, min and max of a feature per tool ID (or operator)"""
+        values = self.column(view, name)
+        keep = ~np.isnan(values) if mask is None else mask & ~np.isnan(values)
+        codes, values = self.codes[by][:self.size][keep], values[keep]
+        groups = len(self.tables[by])
+        n = np.bincount(codes, minlength=groups)
+        total = np.bincount(codes, weights=values, minlength=groups)
+        mean = np.divide(total, n, out=np.full(groups, np.nan), where=n > 0)
+        square = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=groups)
+        std = np.sqrt(np.divide(square, n - 1, out=np.zeros(groups), where=n > 1))
+        low, high = np.full(groups, np.inf), np.full(groups, -np.inf)
+        np.minimum.at(low, codes, values)
+        np.maximum.at(high, codes, values)
+        return [{by: self.tables[by][g], 'n': int(n[g]), 'mean': float(mean[g]), 'std': float(std[g]),
+                 'min': float(low[g]), 'max': float(high[g])} for g in np.flatnonzero(n)]
+
+    def to_records(self):
+        return list(self)
+
+
+class SPCTracker:
+    """Incremental X-bar/R process control per tool ID and feature, with state in a small JSON file"""
+
+    def __init__(self, path="spc_state.json", subgroup_size=5, recent=50, run_rule=7, min_groups=5):
+        self.path = path
+        self.subgroup_size = subgroup_size
+        self.recent = recent
+        self.run_rule = run_rule
+        self.min_groups = min_groups
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.state = json.load(f)
+
+    @staticmethod
+    def _key(tool_id, feature):
+        return f"{tool_id}|{feature}"
+
+    def keys(self):
+        return [tuple(k.split('|', 1)) for k in sorted(self.state)]
+
+    def _entry(self, tool_id, feature):
+        return self.state.setdefault(self._key(tool_id, feature), {
+            'n': 0, 'mean': 0.0, 'm2': 0.0, 'min': None, 'max': None,
+            'current': [], 'groups': 0, 'xbarbar': 0.0, 'rbar': 0.0,
+            'subgroups': [], 'run_side': 0, 'run_length': 0, 'lsl': None, 'usl': None,
+        })
+
+    def set_tolerance(self, tool_id, feature, lsl, usl):
+        entry = self._entry(tool_id, feature)
+        entry['lsl'], entry['usl'] = lsl, usl
+
+    def add(self, tool_id, feature, value):
+        """Record one measured value; returns a list of alert messages"""
+        e = self._entry(tool_id, feature)
+        alerts = []
+        value = float(value)
+
+        # Welford running mean and variance
+        e['n'] += 1
+        delta = value - e['mean']
+        e['mean'] += delta / e['n']
+        e['m2'] += delta * (value - e['mean'])
+        e['min'] = value if e['min'] is None else min(e['min'], value)
+        e['max'] = value if e['max'] is None else max(e['max'], value)
+        if (e['lsl'] is not None and value < e['lsl']) or (e['usl'] is not None and value > e['usl']):
+            alerts.append(f"{tool_id} {feature}: {value:.4f} outside tolerance")
+
+        e['current'].append(value)
+        if len(e['current']) < self.subgroup_size:
+            return alerts
+
+        # Subgroup complete: check it against the limits so far, then fold it in
+        xbar = sum(e['current']) / len(e['current'])
+        rng = max(e['current']) - min(e['current'])
+        e['current'] = []
+        limits = self.limits(e)
+        if limits and e['groups'] >= self.min_groups:
+            if not limits['lcl'] <= xbar <= limits['ucl']:
+                alerts.append(f"{tool_id} {feature}: subgroup mean {xbar:.4f} outside control limits")
+            if rng > limits['r_ucl']:
+                alerts.append(f"{tool_id} {feature}: subgroup range {rng:.4f} above control limit")
+            side = 1 if xbar > limits['center'] else -1
+            e['run_length'] = e['run_length'] + 1 if side == e['run_side'] else 1
+            e['run_side'] = side
+            if e['run_length'] == self.run_rule:
+                alerts.append(f"{tool_id} {feature}: drift - {self.run_rule} subgroup means "
+                              f"{'above' if side > 0 else 'below'} center line")
+
+        e['groups'] += 1
+        e['xbarbar'] += (xbar - e['xbarbar']) / e['groups']
+        e['rbar'] += (rng - e['rbar']) / e['groups']
+        e['subgroups'] = (e['subgroups'] + [[xbar, rng]])[-self.recent:]
+        return alerts
+
+    def limits(self, e):
+        """X-bar and R chart limits for a state entry, or None before the first subgroup"""
+        if e['groups'] == 0:
+            return None
+        a2, d3, d4, _ = SPC_CONSTANTS[self.subgroup_size]
+        return {'center': e['xbarbar'], 'ucl': e['xbarbar'] + a2 * e['rbar'],
+                'lcl': e['xbarbar'] - a2 * e['rbar'], 'r_center': e['rbar'],
+                'r_ucl': d4 * e['rbar'], 'r_lcl': d3 * e['rbar']}
+
+    def summary(self, tool_id, feature):
+        """Statistics, control limits and capability for one tool ID/feature"""
+        e = self.state.get(self._key(tool_id, feature))
+        if e is None or e['n'] == 0:
+            return None
+        std = math.sqrt(e['m2'] / (e['n'] - 1)) if e['n'] > 1 else 0.0
+        # Capability uses the within-subgroup sigma (R-bar / d2) once subgroups exist
+        sigma = e['rbar'] / SPC_CONSTANTS[self.subgroup_size][3] if e['groups'] else std
+        cp = cpk = None
+        if e['lsl'] is not None and e['usl'] is not None and sigma > 0:
+            cp = (e['usl'] - e['lsl']) / (6 * sigma)
+            cpk = min(e['usl'] - e['mean'], e['mean'] - e['lsl']) / (3 * sigma)
+        return {'n': e['n'], 'mean': e['mean'], 'std': std, 'min': e['min'], 'max': e['max'],
+                'sigma_within': sigma, 'cp': cp, 'cpk': cpk, 'lsl': e['lsl'], 'usl': e['usl'],
+                'limits': self.limits(e), 'subgroups': list(e['subgroups'])}
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+class PointLog:
+    """Undoable command log for manually placed points.
+
+    Commands are (kind, index, old, new) tuples for 'add', 'move' and
+    'remove'; applying or reverting one is O(1) and `points` is always the
+    current state, updated in place so callers can keep a reference to it.
+    """
+
+    def __init__(self):
+        self.points = []
+        self.done = []
+        self.undone = []
+
+    def clear(self):
+        self.points.clear()
+        self.done.clear()
+        self.undone.clear()
+
+    def _apply(self, command, forward=True):
+        kind, index, old, new = command
+        if kind == 'move':
+            self.points[index] = new if forward else old
+        elif (kind == 'add') == forward:
+            self.points.insert(index, new if forward else old)
+        else:
+            del self.points[index]
+
+    def _do(self, command):
+        self._apply(command)
+        self.done.append(command)
+        self.undone.clear()
+
+    def add(self, point):
+        self._do(('add', len(self.points), None, point))
+
+    def move(self, index, point, old=None):
+        """Move a point; `old` overrides the start position (after a live drag)"""
+        self._do(('move', index, self.points[index] if old is None else old, point))
+
+    def remove_last(self):
+        if self.points:
+            self._do(('remove', len(self.points) - 1, self.points[-1], None))
+
+    def undo(self):
+        if not self.done:
+            return False
+        command = self.done.pop()
+        self._apply(command, forward=False)
+        self.undone.append(command)
+        return True
+
+    def redo(self):
+        if not self.undone:
+            return False
+        command = self.undone.pop()
+        self._apply(command)
+        self.done.append(command)
+        return True
+
+    def nearest(self, point, radius):
+        """Index of the closest point within radius, or None"""
+        best, best_dist = None, radius
+        for i, (x, y) in enumerate(self.points):
+            dist = math.hypot(x - point[0], y - point[1])
+            if dist <= best_dist:
+                best, best_dist = i, dist
+        return best
+
+
+class PlaneRectifier:
+    """Homography from full-resolution image pixels to fixture-plane millimetres.
+
+    Only point sets (contours, clicked points) are mapped, so a tilted camera
+    costs a few microseconds per contour instead of a full-frame warp.
+    """
+
+    def __init__(self, homography, image_size, fiducials_mm=None):
+        self.H = np.asarray(homography, dtype=np.float64)
+        self.H_inv = np.linalg.inv(self.H)
+        self.image_size = tuple(image_size)  # (width, height) the fiducials were marked on
+        self.fiducials_mm = fiducials_mm
+
+    @classmethod
+    def from_fiducials(cls, image_points, width_mm, height_mm, image_size):
+        """Plane from the corners of a width x height rectangle, marked in order around it"""
+        image_points = np.asarray(image_points, dtype=np.float32)
+        if len(image_points) != 4 or not cv2.isContourConvex(image_points.reshape(-1, 1, 2)):
+            raise ValueError("Mark the 4 fiducials in order around the rectangle")
+        plane_points = np.float32([[0, 0], [width_mm, 0], [width_mm, height_mm], [0, height_mm]])
+        return cls(cv2.getPerspectiveTransform(image_points, plane_points), image_size,
+                   (width_mm, height_mm))
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data['homography'], data['image_size'], data.get('fiducials_mm'))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'homography': self.H.tolist(), 'image_size': list(self.image_size),
+                       'fiducials_mm': self.fiducials_mm}, f, indent=2)
+
+    def to_plane(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.H).reshape(-1, 2)
+
+    def to_image(self, points_mm):
+        points_mm = np.asarray(points_mm, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points_mm, self.H_inv).reshape(-1, 2)
+
+    def scale_at(self, point):
+        """Local pixels per mm at an image point (square root of the area ratio)"""
+        x, y = point
+        p = self.to_plane([(x, y), (x + 1, y), (x, y + 1)])
+        return 1.0 / math.sqrt(abs(np.linalg.det(np.column_stack((p[1] - p[0], p[2] - p[0])))))
+
+    def scale_range(self):
+        """Smallest and largest local scale over the calibrated image"""
+        w, h = self.image_size
+        scales = [self.scale_at((x, y)) for x in (0, w / 2, w - 1) for y in (0, h / 2, h - 1)]
+        return min(scales), max(scales)
+
+
+class FlatField:
+    """Illumination gain map from one frame of the empty, evenly lit fixture.
+
+    The flat frame is smoothed and stored at low resolution (illumination
+    varies slowly, and a per-pixel gain from a single frame would imprint its
+    sensor noise onto every image). apply() multiplies a grayscale image by the
+    gain resampled to its size, so backlight or ring-light falloff no longer
+    moves Canny edges and thresholds. Full-size gain maps are cached per image
+    shape; the float and output buffers are allocated once per thread.
+    """
+
+    def __init__(self, gain, image_size):
+        self.gain = np.asarray(gain, dtype=np.float32)
+        self.image_size = tuple(int(v) for v in image_size)  # (width, height) of the flat frame
+        self._maps = OrderedDict()  # (height, width) -> full-size gain
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_frame(cls, frame, max_side=256, sigma=0.02, max_gain=4.0):
+        """Gain that lifts every part of the frame to its bright (95th percentile) level"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        h, w = gray.shape
+        f = min(1.0, max_side / max(h, w))
+        small = cv2.resize(gray, (max(1, round(w * f)), max(1, round(h * f))),
+                           interpolation=cv2.INTER_AREA).astype(np.float32)
+        small = cv2.GaussianBlur(small, (0, 0), max(1.0, sigma * max(small.shape)))
+        target = float(np.percentile(small, 95))
+        if target < 16:
+            raise ValueError("Flat-field frame is too dark; switch the light on and clear the fixture")
+        gain = np.clip(target / np.maximum(small, 1.0), 1.0 / max_gain, max_gain)
+        return cls(gain, (w, h))
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data['gain'], data['image_size'])
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(f, gain=self.gain, image_size=np.array(self.image_size))
+
+    def gain_range(self):
+        """Brightest-to-darkest illumination ratio that the gain corrects"""
+        return float(self.gain.max() / self.gain.min())
+
+    def gain_map(self, full_shape, window=None):
+        """Gain for window=(x0, y0, x1, y1) of an image of full_shape (default: all of it)"""
+        h, w = full_shape[:2]
+        fw, fh = self.image_size
+        if abs(w * fh - h * fw) > 0.01 * w * fh:
+            raise ValueError(f"Flat field was captured on {fw}x{fh} images, this one is {w}x{h}. "
+                             "Recapture or clear the flat field.")
+        x0, y0, x1, y1 = window or (0, 0, w, h)
+        gh, gw = self.gain.shape
+        sx, sy = gw / w, gh / h
+        # Pixel centres of the window in gain-map coordinates
+        M = np.float32([[sx, 0, (x0 + 0.5) * sx - 0.5], [0, sy, (y0 + 0.5) * sy - 0.5]])
+        return cv2.warpAffine(self.gain, M, (x1 - x0, y1 - y0), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                              borderMode=cv2.BORDER_REPLICATE)
+
+    def _full_map(self, shape):
+        with self._lock:
+            gain = self._maps.get(shape)
+            if gain is None:
+                gain = self._maps[shape] = self.gain_map(shape)
+                while len(self._maps) > 4:
+                    self._maps.popitem(last=False)
+            return gain
+
+    def apply(self, gray, origin=(0, 0), full_shape=None):
+        """Flat-fielded copy of a uint8 grayscale image, or of a tile at origin=(x, y)
+        of an image of full_shape. The result is reused by the next call on this thread."""
+        h, w = gray.shape[:2]
+        if full_shape is None or tuple(full_shape[:2]) == (h, w):
+            gain = self._full_map((h, w))
+        else:
+            x0, y0 = origin
+            gain = self.gain_map(full_shape, (x0, y0, x0 + w, y0 + h))
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers[0].shape != (h, w):
+            buffers = self._local.buffers = (np.empty((h, w), np.float32), np.empty((h, w), np.uint8))
+        scaled, out = buffers
+        cv2.multiply(gray, gain, dst=scaled, dtype=cv2.CV_32F)
+        return cv2.convertScaleAbs(scaled, dst=out)
+
+
+class MarkerReference:
+    """Printed ArUco marker used as the scale reference.
+
+    One detector pass gives the four sub-pixel marker corners, hence scale and
+    orientation. While the image under the marker is unchanged the previous
+    corners are reused; a moved marker is looked for around its old position
+    before the whole frame is searched.
+    """
+
+    def __init__(self, dictionary="DICT_4X4_50", still_threshold=4.0, margin=1.0):
+        self.dictionary = dictionary
+        self.still_threshold = still_threshold  # mean grey-level change of a stationary marker
+        self.margin = margin  # local search window around the old marker, in marker sizes
+        self.detector = None
+        self.corners = None
+        self.marker_id = None
+        self.window = None
+        self.patch = None
+
+    def copy(self):
+        """Copy with the cached corners for use on another thread (the detector is not shared)"""
+        other = copy.copy(self)
+        other.detector = None
+        return other
+
+    def _detect(self, gray, window=None):
+        if self.detector is None:
+            aruco = cv2.aruco
+            params = aruco.DetectorParameters()
+            params.cornerRefinementMethod = aruco.CORNER_REFINE_SUBPIX
+            self.detector = aruco.ArucoDetector(aruco.getPredefinedDictionary(getattr(aruco, self.dictionary)),
+                                                params)
+        x0, y0 = 0, 0
+        if window is not None:
+            x0, y0, x1, y1 = window
+            gray = gray[y0:y1, x0:x1]
+        corners, ids, _ = self.detector.detectMarkers(gray)
+        if ids is None:
+            return None
+        ids = np.asarray(ids).reshape(-1)
+        # Several markers in view: the largest is the reference
+        best = max(range(len(ids)), key=lambda i: cv2.contourArea(corners[i].reshape(-1, 1, 2)))
+        return corners[best].reshape(4, 2).astype(np.float64) + (x0, y0), int(ids[best])
+
+    def _window(self, shape, corners, margin):
+        h, w = shape[:2]
+        (x0, y0), (x1, y1) = corners.min(axis=0), corners.max(axis=0)
+        pad = margin * max(x1 - x0, y1 - y0)
+        return (max(0, int(x0 - pad)), max(0, int(y0 - pad)),
+                min(w, int(math.ceil(x1 + pad)) + 1), min(h, int(math.ceil(y1 + pad)) + 1))
+
+    def _patch(self, img):
+        x0, y0, x1, y1 = self.window
+        return img[y0:y1, x0:x1]
+
+    def locate(self, img, side_mm):
+        """Marker corners, id, pixels_per_mm and orientation in img; ValueError when absent"""
+        cached = False
+        found = None
+        if self.corners is not None and self.window[2] <= img.shape[1] and self.window[3] <= img.shape[0]:
+            # Compare the raw pixels under the marker; only a changed patch costs a detection
+            patch = self._patch(img)
+            if patch.shape == self.patch.shape and cv2.absdiff(patch, self.patch).mean() < self.still_threshold:
+                found, cached = (self.corners, self.marker_id), True
+        gray = None
+        if not cached:
+            gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if self.corners is not None:
+                found = self._detect(gray, self._window(gray.shape, self.corners, self.margin))
+        if found is None and gray is not None:
+            found = self._detect(gray)
+        if found is None:
+            self.corners = None
+            raise ValueError(f"No ArUco marker ({self.dictionary}) found in the image")
+
+        corners, marker_id = found
+        if not cached:
+            self.corners, self.marker_id = corners, marker_id
+            self.window = self._window(img.shape, corners, 0.1)
+            self.patch = self._patch(img).copy()
+        sides = np.linalg.norm(corners - np.roll(corners, -1, axis=0), axis=1)
+        top = corners[1] - corners[0]
+        return {'corners': corners, 'id': marker_id, 'cached': cached,
+                'pixels_per_mm': float(sides.mean()) / side_mm,
+                'angle_deg': math.degrees(math.atan2(top[1], top[0])),
+                'scale_rel_std': float(sides.std() / sides.mean()) / 2.0}
+
+
+class EdgeSnapper:
+    """Snap image positions to the nearest strong edge with sub-pixel accuracy.
+
+    Gradients are computed once per image. With precompute=False (tiled,
+    memory-mapped images) nothing is computed up front; gradients are taken
+    lazily from a small window around each query, so memory stays bounded by
+    the window size.
+    """
+
+    def __init__(self, img, sigma=1.0, precompute=True):
+        self.img = img
+        self.sigma = sigma
+        self.shape = img.shape[:2]
+        self.grads = None
+        if precompute:
+            self.grads = self._gradients(img)
+            mag = self.grads[2]
+            self.threshold = max(0.2 * float(np.percentile(mag[::4, ::4], 99.5)), 10.0)
+
+    def _gradients(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        blurred = cv2.GaussianBlur(gray.astype(np.float32), (0, 0), self.sigma)
+        gx = cv2.Sobel(blurred, cv2.CV_32F, 1, 0, ksize=3)
+        gy = cv2.Sobel(blurred, cv2.CV_32F, 0, 1, ksize=3)
+        return gx, gy, cv2.magnitude(gx, gy)
+
+    def _window(self, x0, y0, x1, y1):
+        if self.grads is not None:
+            return [g[y0:y1, x0:x1] for g in self.grads], None
+        m = 4  # context so the blur matches a whole-image pass
+        cx0, cy0 = max(x0 - m, 0), max(y0 - m, 0)
+        grads = self._gradients(np.ascontiguousarray(self.img[cy0:min(y1 + m, self.shape[0]),
+                                                              cx0:min(x1 + m, self.shape[1])]))
+        grads = [g[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0] for g in grads]
+        return grads, max(0.3 * float(grads[2].max()), 10.0)
+
+    def snap(self, point, radius):
+        """Nearest strong edge point within radius as float (x, y), or None"""
+        h, w = self.shape
+        r = max(int(math.ceil(radius)), 1)
+        x, y = int(round(point[0])), int(round(point[1]))
+        x0, y0, x1, y1 = max(x - r - 1, 0), max(y - r - 1, 0), min(x + r + 2, w), min(y + r + 2, h)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        (gx, gy, mag), threshold = self._window(x0, y0, x1, y1)
+        threshold = threshold or self.threshold
+        ys, xs = np.mgrid[y0:y1, x0:x1]
+        dist = np.hypot(xs - point[0], ys - point[1])
+        strong = (mag >= max(threshold, 0.5 * float(mag[dist <= radius].max(initial=0)))) & (dist <= radius)
+        if not strong.any():
+            return None
+        iy, ix = np.unravel_index(np.argmin(np.where(strong, dist, np.inf)), dist.shape)
+
+        # Climb to the gradient-magnitude ridge, then fit a parabola across it
+        for _ in range(r):
+            nx, ny = gx[iy, ix] / (mag[iy, ix] + 1e-9), gy[iy, ix] / (mag[iy, ix] + 1e-9)
+            sx, sy = int(round(nx)), int(round(ny))
+            moved = False
+            for step in (1, -1):
+                jx, jy = ix + step * sx, iy + step * sy
+                if 0 <= jx < mag.shape[1] and 0 <= jy < mag.shape[0] and mag[jy, jx] > mag[iy, ix]:
+                    ix, iy, moved = jx, jy, True
+                    break
+            if not moved:
+                break
+        nx, ny = gx[iy, ix] / (mag[iy, ix] + 1e-9), gy[iy, ix] / (mag[iy, ix] + 1e-9)
+        before = cv2.getRectSubPix(mag, (1, 1), (float(ix - nx), float(iy - ny)))[0, 0]
+        after = cv2.getRectSubPix(mag, (1, 1), (float(ix + nx), float(iy + ny)))[0, 0]
+        denom = before - 2 * mag[iy, ix] + after
+        t = 0.0 if denom >= 0 else float(np.clip((before - after) / (2 * denom), -0.5, 0.5))
+        return (x0 + ix + t * nx, y0 + iy + t * ny)
+
+
+class Loupe:
+    """Magnified patch drawn in a corner of a canvas, independent of zoom and pan"""
+
+    def __init__(self, canvas, zoom=4, half=20):
+        self.canvas = canvas
+        self.zoom = zoom
+        self.half = half
+        self.item = None
+        self.photo = None
+
+    def show(self, img, center, target=None, avoid=None):
+        """Show img around center (image px); target is marked, e.g. a snapped point"""
+        size = 2 * self.half + 1
+        patch = cv2.getRectSubPix(img, (size, size), (float(center[0]), float(center[1])))
+        big = cv2.resize(patch, None, fx=self.zoom, fy=self.zoom, interpolation=cv2.INTER_NEAREST)
+        mid = big.shape[0] // 2
+        cv2.line(big, (mid, 0), (mid, big.shape[0]), (255, 255, 0), 1)
+        cv2.line(big, (0, mid), (big.shape[1], mid), (255, 255, 0), 1)
+        if target is not None:
+            tx = int(round(mid + (target[0] - center[0]) * self.zoom))
+            ty = int(round(mid + (target[1] - center[1]) * self.zoom))
+            cv2.circle(big, (tx, ty), 4, (0, 255, 0), 2)
+        if big.ndim == 2:
+            big = cv2.cvtColor(big, cv2.COLOR_GRAY2BGR)
+        self.photo = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(big, cv2.COLOR_BGR2RGB)))
+
+        # Top-right corner, or top-left when the pointer is over that corner
+        cw = self.canvas.winfo_width()
+        x = cw - big.shape[1] - 5
+        if avoid is not None and avoid[0] > x and avoid[1] < big.shape[0] + 5:
+            x = 5
+        if self.item is None or not self.canvas.find_withtag(self.item):
+            self.item = self.canvas.create_image(x, 5, anchor=tk.NW, image=self.photo, tags=("loupe",))
+        else:
+            self.canvas.itemconfigure(self.item, image=self.photo)
+            self.canvas.coords(self.item, x, 5)
+        self.canvas.tag_raise(self.item)
+
+    def hide(self):
+        self.canvas.delete("loupe")
+        self.item = self.photo = None
+
+
+def bgr_to_hex(color):
+    """Convert an OpenCV BGR color tuple to a Tk color string"""
+    b, g, r = (int(c) for c in color)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+class CanvasOverlay:
+    """Base bitmap plus vector annotations for one Tk canvas.
+
+    Annotations are native canvas items whose coordinates are stored in image
+    pixels; zooming or panning only moves them. The base bitmap is converted and
+    resampled only when the image, the visible region or the canvas size changes.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.base = None
+        self.view = None  # (x0, y0, x1, y1) region of the base image shown
+        self.size = None
+        self.image_item = None
+        self.photo = None
+        self.scale = 1.0
+        self.offset = (0.0, 0.0)
+        self.items = {}  # canvas item id -> flat list of image coordinates
+        canvas.bind("<Configure>", lambda e: self.set_base(self.base, self.view), add="+")
+
+    def set_base(self, cv_image, view=None):
+        """Show a BGR image, optionally limited to view=(x0, y0, x1, y1)"""
+        if cv_image is None:
+            return
+        h, w = cv_image.shape[:2]
+        view = tuple(view) if view else (0, 0, w, h)
+        cw, ch = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if cw <= 1 or ch <= 1:
+            # Not mapped yet; <Configure> renders it once the canvas has a size
+            self.base, self.view = cv_image, view
+            return
+        if cv_image is self.base and view == self.view and (cw, ch) == self.size:
+            return
+
+        x0, y0, x1, y1 = view
+        scale = min(cw / (x1 - x0), ch / (y1 - y0))
+        new_w, new_h = max(1, int((x1 - x0) * scale)), max(1, int((y1 - y0) * scale))
+        img_rgb = cv2.cvtColor(np.ascontiguousarray(cv_image[y0:y1, x0:x1]), cv2.COLOR_BGR2RGB)
+        img_pil = Image.fromarray(img_rgb).resize((new_w, new_h), Image.Resampling.LANCZOS)
+        self.photo = ImageTk.PhotoImage(image=img_pil)
+
+        if self.image_item is None:
+            self.image_item = self.canvas.create_image(cw // 2, ch // 2, anchor=tk.CENTER, image=self.photo)
+        else:
+            self.canvas.itemconfigure(self.image_item, image=self.photo)
+            self.canvas.coords(self.image_item, cw // 2, ch // 2)
+        self.canvas.tag_lower(self.image_item)
+        self.canvas.image = self.photo  # Keep reference to prevent garbage collection
+
+        self.base, self.view, self.size = cv_image, view, (cw, ch)
+        self.scale = new_w / (x1 - x0)
+        self.offset = (cw // 2 - new_w / 2 - x0 * self.scale, ch // 2 - new_h / 2 - y0 * self.scale)
+        for item, coords in self.items.items():
+            self.canvas.coords(item, *self.to_canvas(coords))
+
+    def to_canvas(self, coords):
+        ox, oy = self.offset
+        return [v * self.scale + (ox if i % 2 == 0 else oy) for i, v in enumerate(coords)]
+
+    def to_image(self, x, y):
+        """Map a canvas position (e.g. a click) to base image coordinates"""
+        ox, oy = self.offset
+        return (x - ox) / self.scale, (y - oy) / self.scale
+
+    def _add(self, kind, coords, tags, **options):
+        coords = [float(v) for v in coords]
+        item = getattr(self.canvas, f"create_{kind}")(*self.to_canvas(coords),
+                                                       tags=("overlay",) + tuple(tags), **options)
+        self.items[item] = coords
+        return item
+
+    def circle(self, center, radius, color, width=2, tags=()):
+        cx, cy = center
+        return self._add("oval", (cx - radius, cy - radius, cx + radius, cy + radius), tags,
+                         outline=bgr_to_hex(color), width=width)
+
+    def dot(self, center, radius, color, tags=()):
+        cx, cy = center
+        return self._add("oval", (cx - radius, cy - radius, cx + radius, cy + radius), tags,
+                         outline=bgr_to_hex(color), fill=bgr_to_hex(color))
+
+    def line(self, p1, p2, color, width=2, tags=()):
+        return self._add("line", (p1[0], p1[1], p2[0], p2[1]), tags, fill=bgr_to_hex(color), width=width)
+
+    def contour(self, contour, color, width=2, tags=()):
+        pts = np.asarray(contour).reshape(-1, 2)
+        if len(pts) < 2:
+            return None
+        return self.polyline(np.vstack([pts, pts[:1]]), color, width, tags)
+
+    def polyline(self, points, color, width=2, tags=()):
+        pts = np.asarray(points).reshape(-1, 2)
+        if len(pts) < 2:
+            return None
+        return self._add("line", pts.ravel().tolist(), tags, fill=bgr_to_hex(color), width=width)
+
+    def text(self, pos, text, color, font_scale=0.8, tags=()):
+        """Label anchored at its bottom-left corner, like cv2.putText"""
+        return self._add("text", pos, tags, text=text, anchor=tk.SW, fill=bgr_to_hex(color),
+                         font=('Helvetica', max(7, int(14 * font_scale)), 'bold'))
+
+    def clear(self, tag="overlay"):
+        """Delete annotation items with the given tag (all annotations by default)"""
+        for item in self.canvas.find_withtag(tag):
+            self.items.pop(item, None)
+        self.canvas.delete(tag)
+
+    def reset(self):
+        """Remove the base image and all annotations"""
+        self.canvas.delete("all")
+        self.items.clear()
+        self.base = self.view = self.size = None
+        self.image_item = None
+        self.photo = None
+        self.canvas.image = None
+
 
 class CNCToolMeasurerPro:
-    def __init__(self, root):
+    def __init__(self, root, show_guidance=True):
         self.root = root
         self.root.title("AI-Assisted CNC Tool Measurement System Pro")
         self.root.geometry("1600x1000")
@@ -22,12 +2636,31 @@ class CNCToolMeasurerPro:
         # Initialize variables
         self.initialize_variables()
         
-        # Create GUI
+        # Throughput and latency over the whole shift (kept across resets)
+        self.metrics = self.create_metrics()
+        self.camera_frame_time = None
+        
+        # Unattended watch-folder ingestion (kept across resets)
+        self.watch_folder = None
+        self.watch_unsaved = []  # (file, record) pairs stored in the history but not yet on disk
+        
+        # Detection, measurement and capture run off the Tk thread
+        self.tasks = TaskExecutor(root, self.update_status, self.task_failed, metrics=self.metrics)
+        
+        # Create GUI (the history table is built when it is first shown)
         self.create_enterprise_gui()
+        if show_guidance:
+            self.root.after(200, self.show_initial_guidance)
         
         # Initialize camera (but don't start yet)
         self.cap = None
         self.camera_active = False
+        self.camera_poll = None  # after() id of the pending live-view poll
+        
+        # Camera session recording/replay (kept across resets)
+        self.recorder = None
+        self.replay_path = None
+        self.replay_realtime = True
 
         # Keyboard shortcuts
         self.root.bind('<Control-o>', lambda e: self.load_image('top_view'))
@@ -36,6 +2669,9 @@ class CNCToolMeasurerPro:
         self.root.bind('<Control-plus>', lambda e: self.zoom_in())
         self.root.bind('<Control-minus>', lambda e: self.zoom_out())
         self.root.bind('<F1>', lambda e: self.show_help())
+        self.root.bind('<Escape>', lambda e: self.cancel_tasks())
+        self.root.bind('<Control-z>', lambda e: self.undo_manual_point())
+        self.root.bind('<Control-y>', lambda e: self.redo_manual_point())
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     def initialize_variables(self):
@@ -44,15 +2680,17 @@ class CNCToolMeasurerPro:
             "Indian ₹5 Coin": 23.0,
             "Indian ₹10 Coin": 27.0,
             "Standard Credit Card": 85.6,
+            "ArUco Marker 20mm": 20.0,  # printed DICT_4X4_50 marker, size = black square side
+            "ArUco Marker 50mm": 50.0,
             "Custom": None
         }
         self.current_reference = "Indian ₹5 Coin"
         self.reference_diameter = 23.0
         self.pixels_per_mm = None
-        self.measurement_history = []
+        self.measurement_history = MeasurementHistory()
         self.current_measurement = {
-            'top_view': {'image': None, 'original_image': None, 'measurements': {}},
-            'side_view': {'image': None, 'original_image': None, 'measurements': {}},
+            'top_view': {'image': None, 'original_image': None, 'measurements': {}, 'uncertainty': {}},
+            'side_view': {'image': None, 'original_image': None, 'measurements': {}, 'uncertainty': {}},
             'metadata': {
                 'timestamp': None,
                 'tool_id': '',
@@ -68,7 +2706,6 @@ class CNCToolMeasurerPro:
         self.dark_mode = False
         self.full_img = None
         self.selection_points = []
-        self.overlay_img = None
         self.selection_stage = 0
         self.zoom_level = 1.0
         self.pan_start_x = 0
@@ -83,12 +2720,88 @@ class CNCToolMeasurerPro:
         self.calibration_data = None
         self.measurement_strategy = "automatic"  # or "manual"
         
+        # Robust circle fitting
+        self.ransac_threshold_px = 1.5  # inlier distance from the fitted circle
+        self.ransac_max_iterations = 500
+        self.ransac_time_budget = 0.05  # seconds
+        self.roundness_trim_pct = 0.5  # radial percentiles dropped at each end (burrs, chips)
+        self.concentric_max_spread = 0.1  # robust radial spread, relative to the radius, of a real edge
+        
+        # Detection parameter recipes, tuned per fixture
+        self.recipes_path = "detection_recipes.json"
+        self.recipe_name = "default"
+        self.detection_recipe = json.loads(json.dumps(DEFAULT_DETECTION_RECIPE))
+        self.tuning_samples = []
+        
+        # Narrow detection to the sizes expected at the current scale
+        self.scale_aware_detection = True
+        self.scale_tolerance = 0.15
+        self.scale_frame = 1.0  # image scale pixels_per_mm was measured at (1.0 = full resolution)
+        
+        # Fixture-plane perspective correction from marked fiducials
+        self.plane_path = "plane_calibration.json"
+        self.plane = PlaneRectifier.load(self.plane_path)
+        
+        # Illumination flat field applied before edge detection
+        self.flat_field_path = "flat_field.npz"
+        self.flat_field = FlatField.load(self.flat_field_path)
+        
+        # Fiducial marker reference, cached while the marker stays put
+        self.markers = MarkerReference()
+        self.history_on_disk = None  # Records in measurement_history.json, None if it differs from memory
+        self.history_journaled = 0  # Records appended to measurement_history.jsonl since then
+        
+        # Multi-frame capture
+        self.average_frames = 8
+        self.average_mode = "mean"  # or "median"
+        self.frame_accumulator = None
+        
+        # Monte-Carlo measurement uncertainty
+        self.scale_rel_std = 0.0  # relative std dev of pixels_per_mm
+        self.click_sigma_px = 0.5  # manual point placement
+        self.uncertainty_samples = 200
+        self.uncertainty_coverage = 0.95
+        self.last_circle_fit = None
+        
+        # Spindle runout from live video
+        self.runout = None  # RunoutTracker while runout mode is on
+        self.runout_points = []
+        self.runout_fit_interval = 0.5  # seconds between live fits
+        self.runout_last_fit = 0.0
+        self.runout_device_clock = False  # Frames stamped with CAP_PROP_POS_MSEC
+        self.tool_profile = None  # Last side-view profile from measure_profile
+        
+        # Wear comparison against new-tool baselines
+        self.baselines = BaselineLibrary()
+        self.wear_tolerance_mm = 0.05  # region deviation flagged as wear
+        self.last_wear = None
+        
+        # Tool catalog lookup (loaded on first use)
+        self.catalog_path = "tool_catalog.csv"
+        self.catalog = None
+        self.catalog_matches = 3
+        
+        # Statistical process control over saved measurements
+        self.spc = SPCTracker()
+        
         # Manual measurement variables
         self.manual_measurement_mode = False
-        self.manual_measurement_points = []
+        self.manual_log = PointLog()
+        self.manual_measurement_points = self.manual_log.points  # Current state of the log
+        self.manual_drag = None  # (index, start point) while a point is dragged
+        self.edge_snap = True
+        self.snap_radius = 8  # screen pixels
+        self.edge_snapper = None  # gradients of the working image, built on first use
         self.image_scale = 1.0  # Track scaling between displayed and original image
         self.working_img = None  # Working copy of image for processing
-        self.display_img = None  # Display copy of image
+
+        # Tiled processing for very large images
+        self.tiled_processing = "auto"  # "auto", "on" or "off"
+        self.tiled_threshold_px = 25_000_000  # auto mode switches to tiles above this
+        self.tile_size = 2048
+        self.tile_overlap = 32
+        self.tiled_active = False  # True while the loaded image is processed in tiles
+        self.memmap_paths = {}  # view_type -> temp file backing a memory-mapped original
 
         # Tooltip tracking
         self.tooltip_window = None
@@ -174,8 +2887,7 @@ class CNCToolMeasurerPro:
         content_frame.columnconfigure(1, weight=1)
         content_frame.rowconfigure(0, weight=1)
 
-        # Add AI guidance prompts
-        self.show_initial_guidance()
+        self.update_status("Please capture/load TOP VIEW image first")
 
     def create_menu_bar(self):
         self.menubar = tk.Menu(self.root)
@@ -187,7 +2899,13 @@ class CNCToolMeasurerPro:
         filemenu.add_command(label="Export Report", command=self.export_report)
         filemenu.add_command(label="Export All Data", command=self.export_all_data)
         filemenu.add_separator()
+        filemenu.add_command(label="Record Camera Session...", command=self.toggle_session_recording)
+        filemenu.add_command(label="Replay Camera Session...", command=self.open_replay_session)
+        filemenu.add_command(label="Watch Folder...", command=self.toggle_watch_folder)
+        filemenu.add_separator()
         filemenu.add_command(label="Reset/Start New (Ctrl+N)", command=self.reset_measurement)
+        filemenu.add_command(label="Undo Manual Point (Ctrl+Z)", command=self.undo_manual_point)
+        filemenu.add_command(label="Redo Manual Point (Ctrl+Y)", command=self.redo_manual_point)
         filemenu.add_separator()
         filemenu.add_command(label="Exit", command=self.on_closing)
         self.menubar.add_cascade(label="File", menu=filemenu)
@@ -198,6 +2916,9 @@ class CNCToolMeasurerPro:
         viewmenu.add_command(label="Zoom In (Ctrl++)", command=self.zoom_in)
         viewmenu.add_command(label="Zoom Out (Ctrl+-)", command=self.zoom_out)
         viewmenu.add_command(label="Reset Zoom", command=self.reset_pan_zoom)
+        viewmenu.add_separator()
+        viewmenu.add_command(label="Tiled Processing (Large Images)", command=self.set_tiled_processing)
+        viewmenu.add_command(label="Toggle Edge Snapping", command=self.toggle_edge_snap)
         self.menubar.add_cascade(label="View", menu=viewmenu)
         
         # CMM menu
@@ -205,10 +2926,34 @@ class CNCToolMeasurerPro:
         cmm_menu.add_command(label="Enable CMM Mode", command=self.toggle_cmm_mode)
         cmm_menu.add_command(label="Calibrate System", command=self.run_calibration)
         cmm_menu.add_command(label="Set Measurement Strategy", command=self.set_measurement_strategy)
+        cmm_menu.add_command(label="Multi-Frame Averaging...", command=self.set_frame_averaging)
+        cmm_menu.add_command(label="Toggle Scale-Aware Detection", command=self.toggle_scale_aware_detection)
+        cmm_menu.add_command(label="Calibrate Plane from Points...", command=self.calibrate_plane)
+        cmm_menu.add_command(label="Clear Plane Calibration", command=self.clear_plane_calibration)
+        cmm_menu.add_command(label="Capture Flat Field", command=self.capture_flat_field)
+        cmm_menu.add_command(label="Clear Flat Field", command=self.clear_flat_field)
+        cmm_menu.add_command(label="Runout Mode (Video)", command=self.toggle_runout_mode)
+        cmm_menu.add_separator()
+        cmm_menu.add_command(label="Add Frame to Tuning Set", command=self.add_tuning_frame)
+        cmm_menu.add_command(label="Auto-Tune Detection...", command=self.auto_tune_detection)
+        cmm_menu.add_command(label="Select Detection Recipe...", command=self.select_detection_recipe)
         cmm_menu.add_separator()
         cmm_menu.add_command(label="Ultima M 450 Simulation", command=self.enable_ultima_simulation)
         self.menubar.add_cascade(label="CMM", menu=cmm_menu)
         
+        # Analysis menu
+        analysis_menu = tk.Menu(self.menubar, tearoff=0)
+        analysis_menu.add_command(label="Save Tool as Wear Baseline", command=self.save_wear_baseline)
+        analysis_menu.add_command(label="Compare with Wear Baseline", command=self.compare_with_baseline)
+        analysis_menu.add_separator()
+        analysis_menu.add_command(label="Load Tool Catalog...", command=self.load_tool_catalog)
+        analysis_menu.add_separator()
+        analysis_menu.add_command(label="SPC Charts", command=self.show_spc_charts)
+        analysis_menu.add_command(label="Set SPC Tolerances", command=self.set_spc_tolerances)
+        analysis_menu.add_command(label="History Statistics", command=self.show_history_statistics)
+        analysis_menu.add_command(label="Performance Metrics", command=self.show_metrics)
+        self.menubar.add_cascade(label="Analysis", menu=analysis_menu)
+        
         # Help menu
         helpmenu = tk.Menu(self.menubar, tearoff=0)
         helpmenu.add_command(label="User Guide", command=self.show_help)
@@ -231,6 +2976,7 @@ class CNCToolMeasurerPro:
         self.ref_frame.grid(row=0, column=0, padx=5, pady=5, sticky="nsew")
         self.ref_canvas = tk.Canvas(self.ref_frame, bg="#222" if self.dark_mode else "#fff")
         self.ref_canvas.image = None  # Initialize image reference
+        self.ref_canvas.overlay = CanvasOverlay(self.ref_canvas)
         self.ref_canvas.pack(fill=tk.BOTH, expand=True)
         self.ref_canvas.bind("<Button-1>", self.on_ref_canvas_click)
         self.ref_canvas.bind("<B1-Motion>", self.on_ref_canvas_drag)
@@ -241,6 +2987,7 @@ class CNCToolMeasurerPro:
         self.tool_frame.grid(row=0, column=1, padx=5, pady=5, sticky="nsew")
         self.tool_canvas = tk.Canvas(self.tool_frame, bg="#222" if self.dark_mode else "#fff")
         self.tool_canvas.image = None  # Initialize image reference
+        self.tool_canvas.overlay = CanvasOverlay(self.tool_canvas)
         self.tool_canvas.pack(fill=tk.BOTH, expand=True)
         self.tool_canvas.bind("<Button-1>", self.on_tool_canvas_click)
         self.tool_canvas.bind("<B1-Motion>", self.on_tool_canvas_drag)
@@ -251,9 +2998,15 @@ class CNCToolMeasurerPro:
         self.overlay_frame.grid(row=0, column=2, padx=5, pady=5, sticky="nsew")
         self.overlay_canvas = tk.Canvas(self.overlay_frame, bg="#222" if self.dark_mode else "#fff")
         self.overlay_canvas.image = None  # Initialize image reference
+        self.overlay_canvas.overlay = CanvasOverlay(self.overlay_canvas)
         self.overlay_canvas.pack(fill=tk.BOTH, expand=True)
         self.overlay_canvas.bind("<Button-1>", self.on_overlay_canvas_click)
         self.overlay_canvas.bind("<B1-Motion>", self.on_overlay_canvas_drag)
+        self.overlay_canvas.bind("<ButtonRelease-1>", self.on_overlay_canvas_release)
+        self.overlay_canvas.bind("<Motion>", self.on_overlay_canvas_motion)
+        self.overlay_canvas.bind("<Leave>", lambda e: self.loupe.hide())
+        self.loupe = Loupe(self.overlay_canvas)
+        self.overlay_canvas.bind("<Button-3>", self.manual_measurement_clear_last)  # Right-click to clear last point
         self.overlay_canvas.bind("<Double-Button-1>", lambda e: self.reset_pan_zoom('overlay'))
 
         # View indicator
@@ -290,9 +3043,11 @@ class CNCToolMeasurerPro:
         ttk.Label(measure_type_frame, text="Measurement Type:").pack(side=tk.LEFT)
         self.measure_type_var = tk.StringVar(value="Diameter")
         self.measure_type_combo = ttk.Combobox(measure_type_frame, textvariable=self.measure_type_var, 
-                                              values=["Diameter", "Inner Diameter", "Height"])
+                                              values=list(MEASUREMENT_PLUGINS) + [ALL_FEATURES])
         self.measure_type_combo.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
-        self.create_tooltip(self.measure_type_combo, "Select what dimension to measure:\n- Diameter: Outer diameter\n- Inner Diameter: Inner hole diameter\n- Height: Tool height from side view")
+        self.create_tooltip(self.measure_type_combo, "Select what dimension to measure:\n" + "\n".join(
+            f"- {name}: {plugin['description']}" for name, plugin in MEASUREMENT_PLUGINS.items())
+            + f"\n- {ALL_FEATURES}: every feature above from one detection")
 
         # Measurement buttons
         measure_frame = ttk.Frame(control_frame)
@@ -366,6 +3121,11 @@ class CNCToolMeasurerPro:
                                command=self.capture_current_view)
         capture_btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         self.create_tooltip(capture_btn, "Capture new image from connected camera")
+        
+        average_btn = ttk.Button(source_frame, text="Capture Averaged",
+                                 command=self.capture_averaged_view)
+        average_btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.create_tooltip(average_btn, "Average several aligned camera frames to reduce noise (CMM > Multi-Frame Averaging)")
 
         # Export buttons
         export_frame = ttk.Frame(control_frame)
@@ -420,8 +3180,33 @@ class CNCToolMeasurerPro:
             scrollbar.config(command=text_widget.yview)
 
     def create_history_panel(self, parent):
-        history_frame = ttk.LabelFrame(parent, text="Measurement History")
-        history_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        # Only the header is created at startup; see build_history_panel
+        self.history_frame = ttk.LabelFrame(parent, text="Measurement History")
+        self.history_frame.pack(fill=tk.X, pady=5)
+        self.history_toggle = ttk.Button(self.history_frame, text="Show History",
+                                         command=self.toggle_history_panel)
+        self.history_toggle.pack(fill=tk.X, padx=5, pady=2)
+        self.history_body = None
+        self.history_tree = None
+        self.history_shown = False
+
+    def toggle_history_panel(self):
+        """Show or hide the history table, building it the first time it is shown"""
+        if self.history_shown:
+            self.history_body.pack_forget()
+            self.history_frame.pack_configure(fill=tk.X, expand=False)
+            self.history_toggle.config(text="Show History")
+        else:
+            self.build_history_panel()
+            self.history_body.pack(fill=tk.BOTH, expand=True)
+            self.history_frame.pack_configure(fill=tk.BOTH, expand=True)
+            self.history_toggle.config(text="Hide History")
+        self.history_shown = not self.history_shown
+
+    def build_history_panel(self):
+        if self.history_tree is not None:
+            return
+        history_frame = self.history_body = ttk.Frame(self.history_frame)
         
         # Create treeview for history
         self.history_tree = ttk.Treeview(history_frame, columns=('timestamp', 'tool_id', 'operator', 'diameter'))
@@ -458,6 +3243,7 @@ class CNCToolMeasurerPro:
                             command=self.view_history_details)
         view_btn.pack(side=tk.LEFT, padx=5, expand=True)
         self.create_tooltip(view_btn, "View detailed information about selected measurement")
+        self.update_history_tree()
 
     def create_tool_info_panel(self, parent):
         info_frame = ttk.LabelFrame(parent, text="Tool Information")
@@ -467,6 +3253,7 @@ class CNCToolMeasurerPro:
         self.tool_tips = {
             'tool_id': "Unique identifier for the tool being measured",
             'operator': "Name of person performing the measurement",
+            'nominal': "Optional nominal tool diameter; once the scale is set, detection only looks for circles near this size",
             'notes': "Any observations or special conditions during measurement"
         }
         
@@ -482,10 +3269,16 @@ class CNCToolMeasurerPro:
         self.operator_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=2)
         self.create_tooltip(self.operator_entry, self.tool_tips['operator'])
         
+        # Nominal diameter
+        ttk.Label(info_frame, text="Nominal Ø (mm):").grid(row=2, column=0, sticky="w", padx=5, pady=2)
+        self.tool_nominal_entry = ttk.Entry(info_frame)
+        self.tool_nominal_entry.grid(row=2, column=1, sticky="ew", padx=5, pady=2)
+        self.create_tooltip(self.tool_nominal_entry, self.tool_tips['nominal'])
+        
         # Notes
-        ttk.Label(info_frame, text="Notes:").grid(row=2, column=0, sticky="nw", padx=5, pady=2)
+        ttk.Label(info_frame, text="Notes:").grid(row=3, column=0, sticky="nw", padx=5, pady=2)
         self.notes_text = tk.Text(info_frame, height=4, width=30)
-        self.notes_text.grid(row=2, column=1, sticky="ew", padx=5, pady=2)
+        self.notes_text.grid(row=3, column=1, sticky="ew", padx=5, pady=2)
         self.create_tooltip(self.notes_text, self.tool_tips['notes'])
         
         # Configure grid weights
@@ -615,32 +3408,94 @@ class CNCToolMeasurerPro:
         if file_path:
             self.current_view = view_type
             self.update_view_indicator()
-            img = cv2.imread(file_path)
+            img, memmap_path = read_image(file_path, self.should_use_tiles)
             if img is None:
                 messagebox.showerror("Error", "Failed to load image. Please select a valid image file.")
                 return
             
-            # Store original image and create working copy
-            self.current_measurement[view_type]['original_image'] = img.copy()
-            
-            # Resize for display while maintaining aspect ratio
-            self.full_img = self.resize_for_display(img)
-            self.working_img = img.copy()  # Keep full resolution for measurements
+            self.set_working_image(view_type, img, memmap_path)
             
             # Update all canvases
-            self.display_image(self.overlay_canvas, self.full_img)
-            self.display_image(self.ref_canvas, self.full_img)
-            self.display_image(self.tool_canvas, self.full_img)
+            self.show_base_images()
             
-            self.update_status(f"{os.path.basename(file_path)} loaded as {view_type.replace('_', ' ')}")
+            status = f"{os.path.basename(file_path)} loaded as {view_type.replace('_', ' ')}"
+            if self.tiled_active:
+                status += f" (tiled processing, {img.shape[1]}x{img.shape[0]})"
+            self.update_status(status)
             self.unsaved_changes = True
 
+    def set_working_image(self, view_type, img, memmap_path=None):
+        """Store a newly loaded/captured image as original, working and display copies.
+
+        `memmap_path` is the temporary file behind `img` when it is already a
+        memory-mapped copy from read_image().
+        """
+        self.release_memmap(view_type)
+        self.metrics.inc("toolfmm_images_total", source="interactive")
+        self.manual_measurement_mode = False  # Placed points belong to the previous image
+        self.manual_log.clear()
+        self.edge_snapper = None
+        for key in ('circles', 'objects', 'measure'):
+            self.tasks.cancel(key)  # Results would belong to the previous image
+        self.tiled_active = memmap_path is not None or self.should_use_tiles(img.shape)
+        
+        if self.tiled_active:
+            # Keep a single memory-mapped copy; the OS pages tiles in and out on demand
+            if memmap_path is None:
+                img, memmap_path = spill_to_memmap(img)
+            self.memmap_paths[view_type] = memmap_path
+            self.current_measurement[view_type]['original_image'] = img
+            self.working_img = img
+        else:
+            # Store original image and create working copy
+            self.current_measurement[view_type]['original_image'] = img.copy()
+            self.working_img = img.copy()  # Keep full resolution for measurements
+        
+        # Resize for display while maintaining aspect ratio
+        self.full_img = self.resize_for_display(self.working_img)
+
+    def should_use_tiles(self, shape):
+        """Decide whether an image of the given shape is processed in tiles"""
+        if self.tiled_processing == "on":
+            return True
+        if self.tiled_processing == "off":
+            return False
+        return shape[0] * shape[1] > self.tiled_threshold_px
+
+    def release_memmap(self, view_type=None):
+        """Delete temporary files backing memory-mapped images (one view or all)"""
+        views = [view_type] if view_type else list(self.memmap_paths)
+        for view in views:
+            path = self.memmap_paths.pop(view, None)
+            if path is None:
+                continue
+            if self.working_img is self.current_measurement[view]['original_image']:
+                self.working_img = None
+            self.current_measurement[view]['original_image'] = None
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Still mapped on some platforms; the OS temp cleanup will handle it
+
+    def set_tiled_processing(self):
+        """Choose when large images are processed in tiles"""
+        mode = simpledialog.askstring("Tiled Processing",
+                                      "Tiled processing mode (auto/on/off):\n"
+                                      f"auto = tiles above {self.tiled_threshold_px / 1e6:.0f} MP",
+                                      initialvalue=self.tiled_processing)
+        if mode and mode.lower() in ['auto', 'on', 'off']:
+            self.tiled_processing = mode.lower()
+            self.update_status(f"Tiled processing set to {self.tiled_processing} "
+                               f"(tile {self.tile_size}px, overlap {self.tile_overlap}px) - applies to next image")
+
     def resize_for_display(self, img):
         """Resize image for display while maintaining aspect ratio"""
         max_size = 800
         h, w = img.shape[:2]
         self.image_scale = min(max_size / w, max_size / h, 1.0)
         new_w, new_h = int(w * self.image_scale), int(h * self.image_scale)
+        if self.tiled_active:
+            return resize_tiled(img, self.image_scale)
         return cv2.resize(img, (new_w, new_h))
 
     def capture_current_view(self):
@@ -648,85 +3503,397 @@ class CNCToolMeasurerPro:
             messagebox.showwarning("No View Selected", "Please select a view type first (Top or Side)")
             return
             
+        if self.tasks.running('capture'):
+            # The averaging worker owns the camera until it returns
+            self.update_status("Frame averaging is still using the camera, try again when it finishes")
+            return
+            
         if not self.camera_active:
             self.init_camera()
             
         ret, frame = self.cap.read()
         if ret:
             # Store original and create display version
-            self.current_measurement[self.current_view]['original_image'] = frame.copy()
-            self.full_img = self.resize_for_display(frame)
-            self.working_img = frame.copy()
+            self.set_working_image(self.current_view, frame)
             
             # Update all canvases
-            self.display_image(self.overlay_canvas, self.full_img)
-            self.display_image(self.ref_canvas, self.full_img)
-            self.display_image(self.tool_canvas, self.full_img)
+            self.show_base_images()
             
             self.update_status(f"Image captured for {self.current_view.replace('_', ' ')} view")
             self.unsaved_changes = True
 
+    def load_detection_recipes(self):
+        if os.path.exists(self.recipes_path):
+            with open(self.recipes_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def add_tuning_frame(self):
+        """Label the current image for tuning with the 4 manual points (reference, then tool)"""
+        if self.working_img is None or len(self.manual_measurement_points) != 4:
+            messagebox.showinfo("Tuning Set", "Load an image and mark the reference and tool diameters "
+                                              "with Manual Measurement (4 points) first")
+            return
+        points = self.manual_measurement_points
+        labels = []
+        for p1, p2 in ((points[0], points[1]), (points[2], points[3])):
+            labels.append(((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2, math.hypot(p1[0] - p2[0], p1[1] - p2[1]) / 2))
+        self.tuning_samples.append({'image': np.array(self.working_img), 'scale': self.image_scale,
+                                    'labels': labels})
+        self.update_status(f"Tuning set: {len(self.tuning_samples)} labelled frame(s)")
+
+    def auto_tune_detection(self):
+        """Search detection parameters on the tuning set in the background"""
+        if not self.tuning_samples:
+            messagebox.showinfo("Auto-Tune", "Add at least one labelled frame first (CMM > Add Frame to Tuning Set)")
+            return
+        if self.tasks.running('tune'):
+            return
+        name = simpledialog.askstring("Auto-Tune Detection", "Recipe name for this fixture:",
+                                      initialvalue=self.recipe_name if self.recipe_name != "default" else "")
+        if not name:
+            return
+            
+        samples, flat = list(self.tuning_samples), self.flat_field
+        self.tasks.submit('tune', lambda context: tune_detection(samples, flat=flat),
+                          lambda result: self.finish_auto_tune(name, result),
+                          f"Tuning detection on {len(samples)} frame(s)")
+
+    def finish_auto_tune(self, name, result):
+        recipe, report = result
+        recipes = self.load_detection_recipes()
+        recipes[name] = recipe
+        try:
+            with open(self.recipes_path, 'w') as f:
+                json.dump(recipes, f, indent=2)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save recipe: {str(e)}")
+        self.detection_recipe, self.recipe_name = recipe, name
+        messagebox.showinfo("Auto-Tune",
+                            f"Recipe '{name}' saved and active ({report['candidates']} settings, {report['frames']} frames)\n\n"
+                            f"Hough: error {report['hough_error']:.3f}, {report['hough_ms']:.1f} ms/frame\n"
+                            f"Canny: error {report['canny_error']:.3f}, {report['canny_ms']:.1f} ms/frame\n"
+                            f"(error is center + radius offset relative to radius)")
+        self.update_status(f"Detection recipe: {name}")
+
+    def select_detection_recipe(self):
+        """Activate a saved per-fixture detection recipe"""
+        recipes = self.load_detection_recipes()
+        names = ["default"] + sorted(recipes)
+        name = simpledialog.askstring("Detection Recipe", "Recipe name:\n" + "\n".join(names),
+                                      initialvalue=self.recipe_name)
+        if not name:
+            return
+        if name == "default":
+            recipe = json.loads(json.dumps(DEFAULT_DETECTION_RECIPE))
+        elif name in recipes:
+            recipe = recipes[name]
+        else:
+            messagebox.showerror("Error", f"No recipe named '{name}'")
+            return
+        self.detection_recipe, self.recipe_name = recipe, name
+        self.update_status(f"Detection recipe: {name}")
+
+    def create_metrics(self):
+        metrics = Metrics()
+        metrics.describe("toolfmm_images_total", "counter", "Images loaded, captured or ingested")
+        metrics.describe("toolfmm_measurements_saved_total", "counter", "Measurements stored in the history")
+        metrics.describe("toolfmm_failures_total", "counter", "Detection and measurement failures per stage")
+        metrics.describe("toolfmm_cancelled_total", "counter", "Superseded or cancelled tasks per stage")
+        metrics.describe("toolfmm_stage_seconds", "histogram", "Worker time per pipeline stage")
+        metrics.describe("toolfmm_camera_fps", "gauge", "Camera frames read per second (smoothed)")
+        metrics.describe("toolfmm_watch_queue_depth", "gauge", "Watch-folder files queued or in progress")
+        return metrics
+
+    def start_metrics_export(self, port=None, path=None, interval_ms=15000):
+        """Serve metrics on localhost:port and/or rewrite a text file every interval"""
+        if port:
+            self.metrics.serve(int(port))
+        if path:
+            def write():
+                try:
+                    self.metrics.write(path)
+                except OSError as e:
+                    self.update_status(f"Could not write metrics: {str(e)}")
+                self.root.after(interval_ms, write)
+            write()
+
+    def show_metrics(self):
+        """Current metrics as scraped by Prometheus"""
+        window = tk.Toplevel(self.root)
+        window.title("Performance Metrics")
+        text = tk.Text(window, wrap=tk.NONE, width=100, height=30)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert(tk.END, self.metrics.render())
+        text.configure(state='disabled')
+
+    def task_failed(self, label, error):
+        """Error from a background task, reported on the Tk thread"""
+        messagebox.showerror("Error", str(error))
+        self.update_status(f"{label} failed")
+
+    def cancel_tasks(self):
+        if self.tasks.cancel_all():
+            self.update_status("Cancelled")
+
+    def set_frame_averaging(self):
+        """Number of frames and combine mode for averaged capture"""
+        value = simpledialog.askstring("Multi-Frame Averaging",
+                                       "Frames and mode (mean/median), e.g. '8 mean':",
+                                       initialvalue=f"{self.average_frames} {self.average_mode}")
+        if not value:
+            return
+        parts = value.split()
+        try:
+            frames = int(parts[0])
+        except (IndexError, ValueError):
+            messagebox.showerror("Error", "Enter a frame count, optionally followed by mean or median")
+            return
+        mode = parts[1].lower() if len(parts) > 1 else self.average_mode
+        if frames < 1 or mode not in ("mean", "median"):
+            messagebox.showerror("Error", "Frame count must be at least 1 and mode mean or median")
+            return
+        self.average_frames, self.average_mode = frames, mode
+        self.update_status(f"Averaged capture: {frames} frames ({mode})")
+
+    def capture_averaged_view(self):
+        """Capture several frames on a worker thread and use their aligned average"""
+        if self.current_view is None:
+            messagebox.showwarning("No View Selected", "Please select a view type first (Top or Side)")
+            return
+        if not self.camera_active:
+            self.init_camera()
+        if not self.camera_active:
+            return
+            
+        if self.tasks.running('capture') and self.tasks.active.get('capture') is None:
+            self.update_status("The cancelled capture is still finishing its frame, try again")
+            return
+            
+        view = self.current_view
+        self.tasks.submit('capture', self.accumulate_frames,
+                          lambda result: self.finish_averaged_capture(view, result),
+                          f"Capturing {self.average_frames} frames")
+
+    def accumulate_frames(self, context):
+        """Worker: read frames into the preallocated accumulator (no Tk calls here)"""
+        shifts = []
+        for i in range(self.average_frames):
+            context.progress(i / self.average_frames)
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            acc = self.frame_accumulator
+            if acc is None or not acc.fits(frame.shape, self.average_frames, self.average_mode):
+                acc = self.frame_accumulator = FrameAccumulator(frame.shape, self.average_frames,
+                                                                self.average_mode)
+            if not shifts:
+                acc.reset()
+            shifts.append(acc.add(frame))
+        if not shifts:
+            raise RuntimeError("Camera returned no frames")
+        max_shift = max(math.hypot(dx, dy) for dx, dy in shifts)
+        return self.frame_accumulator.result(), len(shifts), max_shift
+
+    def finish_averaged_capture(self, view, result):
+        """Install the averaged image (Tk thread)"""
+        img, frames, max_shift = result
+        self.set_working_image(view, img)
+        self.show_base_images()
+        self.update_status(f"Averaged {frames} frames ({self.average_mode}) for {view.replace('_', ' ')} view, "
+                           f"max alignment shift {max_shift:.2f}px")
+        self.unsaved_changes = True
+
+    def toggle_session_recording(self):
+        """Start recording the live camera stream to a folder, or stop recording"""
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            frames = recorder.close()
+            self.update_status(f"Recorded {frames} frames to {recorder.directory}")
+            return
+            
+        directory = filedialog.askdirectory(title="Folder for recorded session")
+        if not directory:
+            return
+        self.recorder = SessionRecorder(directory)
+        if not self.camera_active:
+            self.init_camera()
+        self.update_status(f"Recording camera session to {directory} (File menu to stop)")
+
+    def toggle_watch_folder(self, directory=None):
+        """Measure every image dropped into a folder without operator involvement, or stop"""
+        if self.watch_folder is not None:
+            watcher, self.watch_folder = self.watch_folder, None
+            watcher.stop()
+            self.update_status(f"Stopped watching {watcher.directory} ({watcher.counts['done']} done, "
+                               f"{watcher.counts['failed']} failed)")
+            return
+            
+        directory = directory or filedialog.askdirectory(title="Folder to watch for new images")
+        if not directory:
+            return
+        # The worker measures with the settings of this moment and its own marker cache
+        settings = self.circle_settings(markers=MarkerReference())
+        self.watch_folder = WatchFolder(directory, lambda path: self.ingest_image(path, settings))
+        self.update_status(f"Watching {directory} for new images (File menu to stop)")
+        self.root.after(200, self.drain_watch_folder)
+
+    def ingest_image(self, path, settings):
+        """Watch-folder worker: measure one image file into a history record (no Tk calls)"""
+        start = time.perf_counter()
+        try:
+            return self.measure_image_file(path, settings)
+        finally:
+            self.metrics.inc("toolfmm_images_total", source="watch")
+            self.metrics.observe("toolfmm_stage_seconds", time.perf_counter() - start, stage="watch")
+
+    def measure_image_file(self, path, settings):
+        """Top-view diameter of one image file with a circle_settings() snapshot"""
+        img = cv2.imread(path)
+        if img is None:
+            raise ValueError("Not a readable image")
+        reference, tool = self.locate_circles(TaskContext(), settings, img)
+        quantization = 1.0 / math.sqrt(12.0)  # Hough radii are whole pixels
+        if isinstance(reference, dict):
+            ppm, scale_rel_std = reference['pixels_per_mm'], reference['scale_rel_std']
+        else:
+            ppm = float(reference[2]) * 2 / settings['reference_diameter']
+            scale_rel_std = quantization / float(reference[2])
+        tool_px_diameter = float(tool[2]) * 2
+        spread = monte_carlo_uncertainty([[0, 0], [tool_px_diameter, 0]], batch_distance, ppm, quantization,
+                                         scale_rel_std, settings['uncertainty_samples'],
+                                         settings['uncertainty_coverage'])
+        name = os.path.basename(path)
+        return {
+            'top_view': {'measurements': {'diameter_mm': tool_px_diameter / ppm, 'pixels_per_mm': ppm,
+                                          'diameter_mm_std_dev': spread['std']},
+                         'uncertainty': {'diameter_mm': spread}},
+            'side_view': {'measurements': {}, 'uncertainty': {}},
+            'metadata': {'timestamp': datetime.now().isoformat(), 'tool_id': os.path.splitext(name)[0],
+                         'operator': "watch folder", 'notes': f"Ingested from {name}"}
+        }
+
+    def drain_watch_folder(self):
+        """Store finished watch-folder results in the history (Tk thread)"""
+        watcher = self.watch_folder
+        if watcher is None:
+            return
+        stored = 0
+        finished = []
+        while not watcher.results.empty():
+            path, record, error = watcher.results.get()
+            if error is None:
+                self.measurement_history.append(record)
+                self.update_spc(record)
+                self.metrics.inc("toolfmm_measurements_saved_total", source="watch")
+                self.watch_unsaved.append((path, record))
+                stored += 1
+            else:
+                self.metrics.inc("toolfmm_failures_total", stage="watch")
+                finished.append((path, error))
+        if self.watch_unsaved:
+            # Files leave the folder only once their measurement is on disk
+            try:
+                self.append_history_journal([record for _, record in self.watch_unsaved])
+            except Exception as e:
+                self.update_status(f"Could not save watch-folder results, retrying: {str(e)}")
+            else:
+                finished += [(path, None) for path, _ in self.watch_unsaved]
+                self.watch_unsaved = []
+        for path, error in finished:
+            try:
+                watcher.complete(path, error)
+            except OSError as e:
+                self.metrics.inc("toolfmm_failures_total", stage="watch_complete")
+                self.update_status(f"Could not move {os.path.basename(path)}: {str(e)}")
+        if stored and self.history_tree is not None:
+            self.update_history_tree()
+        self.metrics.set("toolfmm_watch_queue_depth", watcher.pending())
+        if stored or watcher.pending():
+            self.update_status(f"Watching {watcher.directory}: {watcher.counts['done']} done, "
+                               f"{watcher.counts['failed']} failed, {watcher.pending()} queued")
+        self.root.after(200, self.drain_watch_folder)
+
+    def open_replay_session(self):
+        """Use a recorded session instead of the camera"""
+        directory = filedialog.askdirectory(title="Recorded session folder")
+        if not directory:
+            return
+        self.replay_realtime = messagebox.askyesno("Replay Session", "Replay at recorded speed?\n"
+                                                   "(No = as fast as frames are read)")
+        if self.camera_active and self.cap:
+            self.cap.release()
+            self.camera_active = False
+        self.replay_path = directory
+        self.init_camera()
+
     def init_camera(self):
         try:
-            self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-            if not self.cap.isOpened():
-                self.cap = cv2.VideoCapture(0)
+            if self.replay_path:
+                self.cap = ReplayCapture(self.replay_path, realtime=self.replay_realtime)
+                if not self.cap.isOpened():
+                    raise RuntimeError(f"No recorded frames in {self.replay_path}")
+            else:
+                self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+                if not self.cap.isOpened():
+                    self.cap = cv2.VideoCapture(0)
             self.camera_active = True
+            if self.camera_poll is not None:
+                self.root.after_cancel(self.camera_poll)  # One live-view loop per camera
             self.update_camera_view()
-            self.update_status("Camera initialized - Live view active")
+            source = f"replaying {os.path.basename(self.replay_path)}" if self.replay_path else "live view active"
+            self.update_status(f"Camera initialized - {source}")
         except Exception as e:
             messagebox.showerror("Camera Error", f"Could not initialize camera: {str(e)}")
             self.update_status("Camera initialization failed")
 
     def update_camera_view(self):
+        self.camera_poll = None
         if self.camera_active and self.cap:
-            ret, frame = self.cap.read()
+            # The averaging worker owns the camera while it runs; a replayed frame
+            # that is not due yet is read on a later poll instead of waited for here
+            ret, frame, wait = False, None, 0.0
+            if not self.tasks.running('capture'):
+                if isinstance(self.cap, ReplayCapture):
+                    wait = self.cap.next_frame_delay()
+                if wait <= 0:
+                    ret, frame = self.cap.read()
             if ret:
+                now = time.perf_counter()
+                if self.camera_frame_time is not None and now > self.camera_frame_time:
+                    fps = 1.0 / (now - self.camera_frame_time)
+                    previous = self.metrics.get("toolfmm_camera_fps")
+                    self.metrics.set("toolfmm_camera_fps", fps if previous is None else 0.9 * previous + 0.1 * fps)
+                self.camera_frame_time = now
                 self.image = frame.copy()
-                self.display_image(self.overlay_canvas, self.image)
-            self.root.after(30, self.update_camera_view)
+                if self.recorder is not None:
+                    self.recorder.write(frame)
+                if self.runout is not None:
+                    self.track_runout(frame, now, self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+                current_time = time.time()
+                if current_time - self.last_update_time >= self.min_update_interval:
+                    self.last_update_time = current_time
+                    self.display_image(self.overlay_canvas, self.image)
+            self.camera_poll = self.root.after(max(1, min(30, math.ceil(wait * 1000))) if wait > 0 else 30,
+                                               self.update_camera_view)
 
-    def display_image(self, canvas, cv_image):
+    def display_image(self, canvas, cv_image, view=None):
+        """Show cv_image as the canvas base bitmap; annotation items are kept"""
         # Check if canvas exists before trying to display
         if not canvas.winfo_exists():
             return
             
-        current_time = time.time()
-        if current_time - self.last_update_time < self.min_update_interval:
-            return
-            
-        self.last_update_time = current_time
-        
         try:
-            if cv_image is None:
-                return
-                
-            img_rgb = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
-            img_pil = Image.fromarray(img_rgb)
-            
-            canvas_width = canvas.winfo_width()
-            canvas_height = canvas.winfo_height()
-            
-            if canvas_width > 1 and canvas_height > 1:
-                img_ratio = img_pil.width / img_pil.height
-                canvas_ratio = canvas_width / canvas_height
-                
-                if img_ratio > canvas_ratio:
-                    new_width = canvas_width
-                    new_height = int(canvas_width / img_ratio)
-                else:
-                    new_height = canvas_height
-                    new_width = int(canvas_height * img_ratio)
-                
-                img_pil = img_pil.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                img_tk = ImageTk.PhotoImage(image=img_pil)
-                
-                canvas.delete("all")
-                canvas.create_image(canvas_width//2, canvas_height//2, anchor=tk.CENTER, image=img_tk)
-                canvas.image = img_tk  # Keep reference to prevent garbage collection
+            canvas.overlay.set_base(cv_image, view)
         except Exception as e:
             print(f"Error displaying image: {e}")
 
+    def show_base_images(self):
+        """Show the display image on all canvases and drop old annotations"""
+        for canvas in (self.overlay_canvas, self.ref_canvas, self.tool_canvas):
+            canvas.overlay.clear()
+            self.display_image(canvas, self.full_img, self.current_zoom_view())
+
     def on_ref_canvas_click(self, event):
         self.pan_start_x = event.x
         self.pan_start_y = event.y
@@ -749,16 +3916,29 @@ class CNCToolMeasurerPro:
             self.pan_start_y = event.y
 
     def on_overlay_canvas_drag(self, event):
-        if not self.manual_measurement_mode:
+        if self.manual_measurement_mode:
+            self.manual_measurement_drag(event)
+        else:
             self.pan_image(event, 'overlay')
 
+    def on_overlay_canvas_release(self, event):
+        if self.manual_measurement_mode:
+            self.manual_measurement_release(event)
+
+    def on_overlay_canvas_motion(self, event):
+        if self.manual_measurement_mode:
+            self.update_loupe(event)
+        elif self.loupe.item is not None:
+            self.loupe.hide()
+
     def pan_image(self, event, canvas_type):
         dx = event.x - self.pan_start_x
         dy = event.y - self.pan_start_y
         
-        # Update pan offset (scaled by zoom level)
-        self.pan_offset_x += int(dx / self.zoom_level)
-        self.pan_offset_y += int(dy / self.zoom_level)
+        # Update pan offset in image pixels so the content follows the pointer
+        scale = event.widget.overlay.scale if hasattr(event.widget, 'overlay') else self.zoom_level
+        self.pan_offset_x -= dx / scale
+        self.pan_offset_y -= dy / scale
         
         self.pan_start_x = event.x
         self.pan_start_y = event.y
@@ -786,101 +3966,370 @@ class CNCToolMeasurerPro:
             messagebox.showwarning("No Image", "Please load or capture an image first")
             return
             
+        self.manual_measurement_mode = False
         self.selection_points = []
         self.selection_stage = 0  # 0: waiting for reference, 1: waiting for tool
         self.overlay_canvas.bind("<Button-1>", self.on_canvas_click)
         self.update_status("Click on the REFERENCE object in the image.")
 
-    def on_canvas_click(self, event):
-        canvas = self.overlay_canvas
-        img = self.full_img
-        if img is None:
+    def on_canvas_click(self, event):
+        if self.full_img is None:
+            return
+            
+        x_img, y_img = self.overlay_canvas.overlay.to_image(event.x, event.y)
+        self.selection_points.append((int(x_img), int(y_img)))
+        
+        if len(self.selection_points) == 1:
+            self.selection_stage = 1
+            self._highlight_selection(self.selection_points[0], color=(0,255,0), label="REFERENCE")
+            self.update_status("Reference selected. Now click on the TOOL to measure.")
+        elif len(self.selection_points) == 2:
+            self.overlay_canvas.unbind("<Button-1>")
+            settings = self.object_settings()
+            self.tasks.submit('objects', lambda context: self.find_selected_objects(context, settings),
+                              self.selected_objects_detected,
+                              "Detecting objects", signature=(id(self.working_img), tuple(self.selection_points)))
+
+    def selected_objects_detected(self, objects):
+        self.show_detected_objects(objects)
+        self.update_status("Reference and tool selected. Now set reference scale and measure.")
+
+    def _highlight_selection(self, point, color=(0,255,0), label=""):
+        overlay = self.overlay_canvas.overlay
+        overlay.clear()
+        overlay.circle(point, 15, color, 3, tags=("selection",))
+        if label:
+            overlay.text((point[0]+10, point[1]-10), label, color, tags=("selection",))
+
+    def detect_reference_and_object(self):
+        if self.full_img is None:
+            return
+        settings = self.object_settings()
+        self.tasks.submit('objects', lambda context: self.find_selected_objects(context, settings),
+                          self.show_detected_objects,
+                          "Detecting objects", signature=(id(self.working_img), tuple(self.selection_points)))
+
+    def object_settings(self):
+        """Snapshot of the image and settings find_selected_objects uses, taken on the Tk thread"""
+        tiled = self.tiled_active
+        if tiled:
+            # Detection runs at full resolution; clicks are in display pixels
+            points = [(x / self.image_scale, y / self.image_scale) for x, y in self.selection_points]
+        else:
+            points = list(self.selection_points)
+        return {
+            'image': self.working_img if tiled else self.full_img,
+            'tiled': tiled,
+            'points': points,
+            'canny': dict(self.detection_recipe['canny']),
+            'flat_field': self.flat_field,
+            'tile_size': self.tile_size,
+            'tile_overlap': self.tile_overlap,
+            'min_extent': self.min_object_extent(1.0 if tiled else self.image_scale),
+        }
+
+    def find_selected_objects(self, context, settings):
+        """Worker: contours of the reference and tool nearest the selection clicks,
+        using only the object_settings() snapshot"""
+        img = settings['image']
+        if settings['tiled']:
+            # Detect at full resolution tile by tile; contours stay in full-res pixels
+            contours = find_contours_tiled(img, settings['tile_size'], settings['tile_overlap'],
+                                           settings['canny'], settings['flat_field'])
+        else:
+            edges = detect_edges(img, flat=settings['flat_field'], **settings['canny'])
+            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        points = settings['points']
+        
+        if len(contours) == 0:
+            raise ValueError("No objects detected in the image")
+        context.progress(0.5, "Matching selection")
+            
+        # Drop edge fragments too small to be the reference or the tool at this scale
+        min_extent = settings['min_extent']
+        if min_extent:
+            large = [cnt for cnt in contours if max(cv2.boundingRect(cnt)[2:]) >= min_extent]
+            contours = large or contours
+            
+        selected_objs = []
+        for pt in points:
+            min_dist = float('inf')
+            closest = None
+            for cnt in contours:
+                dist = cv2.pointPolygonTest(cnt, pt, True)
+                if abs(dist) < min_dist:
+                    min_dist = abs(dist)
+                    closest = cnt
+            if closest is not None:
+                selected_objs.append(closest)
+            
+        if len(selected_objs) < 2:
+            raise ValueError("Could not detect both reference and tool objects")
+        ref_cnt, tool_cnt = selected_objs[0], selected_objs[1]
+        return [
+            {'type': 'reference', 'contour': ref_cnt, 'bbox': cv2.boundingRect(ref_cnt)},
+            {'type': 'tool', 'contour': tool_cnt, 'bbox': cv2.boundingRect(tool_cnt)}
+        ]
+
+    def show_detected_objects(self, objects):
+        """Adopt detected objects and outline them (Tk thread)"""
+        self.detected_objects = objects
+        ref_cnt, tool_cnt = objects[0]['contour'], objects[1]['contour']
+            
+        # Overlays are drawn in display image coordinates
+        ref_cnt, tool_cnt = self.contour_to_display(ref_cnt), self.contour_to_display(tool_cnt)
+        x_ref, y_ref = cv2.boundingRect(ref_cnt)[:2]
+        x_tool, y_tool = cv2.boundingRect(tool_cnt)[:2]
+        
+        self.show_base_images()
+        overlay = self.overlay_canvas.overlay
+        overlay.contour(ref_cnt, (0, 255, 0), 4, tags=("detection",))
+        overlay.contour(tool_cnt, (0, 0, 255), 4, tags=("detection",))
+        overlay.text((x_ref, y_ref-10), "REFERENCE", (0, 255, 0), 1, tags=("detection",))
+        overlay.text((x_tool, y_tool-10), "TOOL", (0, 0, 255), 1, tags=("detection",))
+        
+        # Update reference and tool canvases
+        self.ref_canvas.overlay.contour(ref_cnt, (0, 255, 0), 4, tags=("detection",))
+        self.tool_canvas.overlay.contour(tool_cnt, (0, 0, 255), 4, tags=("detection",))
+        self.update_status("Reference and tool detected")
+
+    def find_circles(self, gray, min_radius, max_radius, settings, img=None):
+        """HoughCircles with the recipe in settings in a radius range, strongest first"""
+        params = dict(settings['recipe']['hough'], minRadius=int(min_radius), maxRadius=int(max_radius))
+        params['minDist'] = max(params['minDist'], min_radius)
+        if gray is None:
+            # Large image: grayscale, blur and Hough run per overlapping tile
+            circles = hough_circles_tiled(img, settings['tile_size'], settings['flat_field'], **params)
+        else:
+            circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, **params)
+        return [] if circles is None else [tuple(c) for c in circles[0]]
+
+    def capture_flat_field(self):
+        """Calibrate the illumination gain from the live frame (or loaded image) of the empty fixture"""
+        frame = self.image if self.camera_active and self.image is not None else self.working_img
+        if frame is None:
+            messagebox.showinfo("Flat Field", "Start the camera or load an image of the empty, lit fixture first")
+            return
+        if not messagebox.askyesno("Flat Field", "Use the current image as the flat field? "
+                                                 "The fixture must be empty with the lights on."):
+            return
+        try:
+            flat = FlatField.from_frame(frame)
+        except ValueError as e:
+            messagebox.showerror("Flat Field", str(e))
+            return
+            
+        self.flat_field = flat
+        self.flat_field.save(self.flat_field_path)
+        w, h = flat.image_size
+        self.update_status(f"Flat field captured at {w}x{h}: corrects {flat.gain_range():.2f}:1 "
+                           "illumination falloff before detection")
+
+    def clear_flat_field(self):
+        self.flat_field = None
+        if os.path.exists(self.flat_field_path):
+            os.remove(self.flat_field_path)
+        self.update_status("Flat field cleared")
+
+    def toggle_runout_mode(self):
+        """Track the edge of a spinning tool in the live view, or stop and report the runout"""
+        if self.runout is not None or self.runout_points:
+            self.stop_runout_mode()
+            return
+        if not self.pixels_per_mm:
+            messagebox.showwarning("Runout", "Set the reference scale before measuring runout")
+            return
+        if not self.camera_active:
+            self.init_camera()
+        if not self.camera_active:
+            return
+        self.runout_points = []
+        self.overlay_canvas.bind("<Button-1>", self.runout_roi_click)
+        self.update_status("Runout: click two corners of a narrow box across the tool edge")
+
+    def runout_roi_click(self, event):
+        self.runout_points.append(self.overlay_canvas.overlay.to_image(event.x, event.y))
+        if len(self.runout_points) < 2:
+            return
+        self.overlay_canvas.bind("<Button-1>", self.on_overlay_canvas_click)
+        (x0, y0), (x1, y1) = self.runout_points
+        h, w = self.image.shape[:2]
+        roi = (max(0, min(x0, x1)), max(0, min(y0, y1)), min(w, max(x0, x1)), min(h, max(y0, y1)))
+        if min(roi[2] - roi[0], roi[3] - roi[1]) < 2 or max(roi[2] - roi[0], roi[3] - roi[1]) < 8:
+            self.runout_points = []
+            messagebox.showwarning("Runout", "The box is too small, try again from Runout Mode")
+            return
+        self.runout = RunoutTracker(roi)
+        self.runout_last_fit = time.perf_counter()
+        x0, y0, x1, y1 = self.runout.roi
+        self.overlay_canvas.overlay.clear("runout")
+        self.overlay_canvas.overlay.polyline([(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)],
+                                             (0, 255, 255), 2, tags=("runout",))
+        self.update_status("Runout: tracking, spin the tool (CMM menu to stop)")
+
+    def runout_scale(self, roi):
+        """pixels_per_mm of camera frames at the runout ROI"""
+        x0, y0, x1, y1 = roi
+        h, w = self.image.shape[:2]
+        if self.plane is not None and self.plane.image_size == (w, h):
+            return self.plane.scale_at(((x0 + x1) / 2, (y0 + y1) / 2))
+        return self.px_per_mm_at(1.0)
+
+    def track_runout(self, frame, now, device_time=0.0):
+        """Add one frame, stamped by the camera driver when it reports frame
+        times (closer to exposure) and by the polling clock otherwise"""
+        start = time.perf_counter()
+        if self.runout.count == 0:
+            self.runout_device_clock = device_time > 0
+        try:
+            self.runout.add(frame, device_time if self.runout_device_clock else now)
+        except ValueError as e:
+            self.runout = None
+            self.runout_points = []
+            self.overlay_canvas.overlay.clear("runout")
+            messagebox.showerror("Runout", str(e))
+            return
+        self.metrics.observe("toolfmm_stage_seconds", time.perf_counter() - start, stage="runout_track")
+        if now - self.runout_last_fit >= self.runout_fit_interval:
+            self.runout_last_fit = now
+            fit = self.runout.fit()
+            if fit is not None:
+                speed = f"@ {fit['rpm']:.0f} rpm" if fit['periodic'] else "(peak-to-peak, no clean sinusoid)"
+                self.update_status(f"Runout: TIR {fit['tir_px'] / self.runout_scale(self.runout.roi):.4f} mm "
+                                   f"{speed} ({fit['samples']} frames)")
+
+    def stop_runout_mode(self):
+        tracker, self.runout = self.runout, None
+        self.runout_points = []
+        self.overlay_canvas.bind("<Button-1>", self.on_overlay_canvas_click)
+        self.overlay_canvas.overlay.clear("runout")
+        fit = tracker.fit() if tracker is not None else None
+        if fit is None:
+            self.update_status("Runout mode stopped (not enough frames for a fit)")
             return
             
-        canvas_width = canvas.winfo_width()
-        canvas_height = canvas.winfo_height()
-        img_height, img_width = img.shape[:2]
-        scale_x = img_width / canvas_width
-        scale_y = img_height / canvas_height
-        x_img = int(event.x * scale_x)
-        y_img = int(event.y * scale_y)
-        
-        self.selection_points.append((x_img, y_img))
-        
-        if len(self.selection_points) == 1:
-            self.selection_stage = 1
-            self._highlight_selection(self.selection_points[0], color=(0,255,0), label="REFERENCE")
-            self.update_status("Reference selected. Now click on the TOOL to measure.")
-        elif len(self.selection_points) == 2:
-            self.overlay_canvas.unbind("<Button-1>")
-            self.detect_reference_and_object()
-            self.update_status("Reference and tool selected. Now set reference scale and measure.")
+        ppm = self.runout_scale(tracker.roi)
+        view = self.current_view or 'side_view'
+        record = self.current_measurement[view]
+        record['measurements'].update({
+            'runout_tir_mm': fit['tir_px'] / ppm,
+            'runout_tir_mm_std_dev': fit['tir_std_px'] / ppm,
+            'eccentricity_mm': fit['eccentricity_px'] / ppm,
+        })
+        self.display_measurements()
+        self.update_status(f"Runout TIR {fit['tir_px'] / ppm:.4f} mm ({fit['method']}) from {fit['samples']} frames")
+        if fit['periodic']:
+            detail = f"Spindle: {fit['rpm']:.0f} rpm (apparent, may be aliased)"
+        else:
+            detail = (f"The track is not a clean sinusoid (sine fit {fit['sine_tir_px'] / ppm:.4f} mm, "
+                      f"residual {fit['residual_px'] / ppm:.4f} mm): the spindle is probably faster than "
+                      "half the frame rate, so the timing-independent peak-to-peak is reported")
+        messagebox.showinfo("Runout", f"TIR: {fit['tir_px'] / ppm:.4f} ± {fit['tir_std_px'] / ppm:.4f} mm "
+                                      f"({fit['method']})\n"
+                                      f"Eccentricity: {fit['eccentricity_px'] / ppm:.4f} mm\n"
+                                      f"{detail}\n"
+                                      f"Frames: {fit['samples']} over {fit['duration_s']:.1f} s")
 
-    def _highlight_selection(self, point, color=(0,255,0), label=""):
-        img = self.full_img.copy()
-        cv2.circle(img, point, 15, color, 3)
-        if label:
-            cv2.putText(img, label, (point[0]+10, point[1]-10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 3)
-        self.display_image(self.overlay_canvas, img)
+    def px_per_mm_at(self, image_scale):
+        """pixels_per_mm for an image resized by image_scale from full resolution"""
+        return self.pixels_per_mm * image_scale / self.scale_frame
 
-    def detect_reference_and_object(self):
-        if self.full_img is None:
+    def tool_nominal_mm(self):
+        try:
+            value = float(self.tool_nominal_entry.get())
+        except (AttributeError, ValueError):
+            return None
+        return value if value > 0 else None
+
+    def min_object_extent(self, image_scale):
+        """Smallest plausible reference/tool extent in px, or None without a scale"""
+        if not (self.scale_aware_detection and self.pixels_per_mm):
+            return None
+        smallest = min(filter(None, (self.reference_diameter, self.tool_nominal_mm())))
+        return smallest * self.px_per_mm_at(image_scale) * (1 - self.scale_tolerance)
+
+    def toggle_scale_aware_detection(self):
+        self.scale_aware_detection = not self.scale_aware_detection
+        self.update_status("Scale-aware detection " + ("enabled" if self.scale_aware_detection else "disabled"))
+
+    def calibrate_plane(self):
+        """Fit the fixture-plane homography to 4 manual points on a known rectangle"""
+        if self.working_img is None or len(self.manual_measurement_points) != 4:
+            messagebox.showinfo("Plane Calibration", "Mark the 4 corner fiducials of a known rectangle in "
+                                                     "order around it with Manual Measurement (4 points) first")
             return
-            
-        img = self.full_img.copy()
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (9, 9), 2)
-        edges = cv2.Canny(blurred, 50, 150)
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        if len(contours) == 0:
-            messagebox.showerror("Error", "No objects detected in the image")
+        size = simpledialog.askstring("Plane Calibration", "Fiducial rectangle width x height (mm):",
+                                      initialvalue="100 x 100")
+        if not size:
+            return
+        try:
+            width_mm, height_mm = (float(v) for v in size.lower().split('x'))
+            h, w = self.working_img.shape[:2]
+            plane = PlaneRectifier.from_fiducials(self.manual_measurement_points, width_mm, height_mm, (w, h))
+        except ValueError as e:
+            messagebox.showerror("Plane Calibration", f"Invalid calibration: {str(e)}")
             return
             
-        selected_objs = []
-        for pt in self.selection_points:
-            min_dist = float('inf')
-            closest = None
-            for cnt in contours:
-                dist = cv2.pointPolygonTest(cnt, pt, True)
-                if abs(dist) < min_dist:
-                    min_dist = abs(dist)
-                    closest = cnt
-            if closest is not None:
-                selected_objs.append(closest)
-            
-        if len(selected_objs) >= 2:
-            ref_cnt, tool_cnt = selected_objs[0], selected_objs[1]
-            x_ref, y_ref, w_ref, h_ref = cv2.boundingRect(ref_cnt)
-            x_tool, y_tool, w_tool, h_tool = cv2.boundingRect(tool_cnt)
-            
-            self.detected_objects = [
-                {'type': 'reference', 'contour': ref_cnt, 'bbox': (x_ref, y_ref, w_ref, h_ref)},
-                {'type': 'tool', 'contour': tool_cnt, 'bbox': (x_tool, y_tool, w_tool, h_tool)}
-            ]
-            
-            overlay = img.copy()
-            cv2.drawContours(overlay, [ref_cnt], -1, (0, 255, 0), 4)
-            cv2.drawContours(overlay, [tool_cnt], -1, (0, 0, 255), 4)
-            cv2.putText(overlay, "REFERENCE", (x_ref, y_ref-10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
-            cv2.putText(overlay, "TOOL", (x_tool, y_tool-10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
-            
-            self.overlay_img = overlay
-            self.display_image(self.overlay_canvas, self.overlay_img)
-            
-            # Update reference and tool canvases
-            ref_img = img.copy()
-            cv2.drawContours(ref_img, [ref_cnt], -1, (0, 255, 0), 4)
-            self.display_image(self.ref_canvas, ref_img)
-            
-            tool_img = img.copy()
-            cv2.drawContours(tool_img, [tool_cnt], -1, (0, 0, 255), 4)
-            self.display_image(self.tool_canvas, tool_img)
-        else:
-            messagebox.showerror("Error", "Could not detect both reference and tool objects")
+        self.plane = plane
+        self.plane.save(self.plane_path)
+        self.scale_from_plane()
+        self.scale_rel_std = self.click_sigma_px * math.sqrt(2) / (min(width_mm, height_mm) * self.pixels_per_mm
+                                                                    / self.scale_frame)
+        low, high = plane.scale_range()
+        messagebox.showinfo("Plane Calibration",
+                            f"Plane calibrated from a {width_mm:g} x {height_mm:g} mm rectangle\n"
+                            f"Scale across the field: {low:.2f} - {high:.2f} pixels/mm "
+                            f"({(high - low) / low:.1%} perspective variation)")
+        self.update_status(f"Plane calibrated: {self.pixels_per_mm:.2f} pixels/mm at image centre")
+
+    def clear_plane_calibration(self):
+        self.plane = None
+        if os.path.exists(self.plane_path):
+            os.remove(self.plane_path)
+        self.update_status("Plane calibration cleared; measurements use the reference scale")
+
+    def active_plane(self):
+        """The plane calibration for the working image, or None when uncalibrated"""
+        if self.plane is None or self.working_img is None:
+            return None
+        h, w = self.working_img.shape[:2]
+        if (w, h) != self.plane.image_size:
+            raise ValueError(f"Plane was calibrated on {self.plane.image_size[0]}x{self.plane.image_size[1]} "
+                             f"images, this one is {w}x{h}. Recalibrate or clear the plane calibration.")
+        return self.plane
+
+    def scale_from_plane(self):
+        """Set pixels_per_mm to the plane scale at the image centre, in the detection frame"""
+        h, w = self.working_img.shape[:2]
+        frame = 1.0 if self.tiled_active else self.image_scale
+        self.pixels_per_mm = self.plane.scale_at((w / 2, h / 2)) * frame
+        self.scale_frame = frame
+
+    def rectify_contour(self, contour):
+        """Map a detected contour onto the fixture plane, at a uniform pixels_per_mm"""
+        plane = self.active_plane()
+        if plane is None:
+            return contour
+        frame = 1.0 if self.tiled_active else self.image_scale
+        rectified = plane.to_plane(contour.reshape(-1, 2) / frame) * self.pixels_per_mm
+        return rectified.astype(np.float32).reshape(-1, 1, 2)
+
+    def unrectify_points(self, points):
+        """Inverse of rectify_contour for (N, 2) points, back in the detection frame"""
+        frame = 1.0 if self.tiled_active else self.image_scale
+        return self.plane.to_image(np.asarray(points) / self.pixels_per_mm) * frame
+
+    def contour_to_display(self, contour):
+        """Map a detected contour into display image coordinates"""
+        if not self.tiled_active:
+            return contour
+        return np.round(contour * self.image_scale).astype(np.int32)
+
+    def detection_bbox_to_display(self, bbox):
+        """Map a detected bounding box into display image coordinates"""
+        if not self.tiled_active:
+            return bbox
+        return tuple(int(v * self.image_scale) for v in bbox)
 
     def auto_detect_circles(self):
         """Improved circle detection based on the provided code"""
@@ -892,38 +4341,120 @@ class CNCToolMeasurerPro:
             messagebox.showwarning("No Image", "Please load or capture an image first")
             return
             
-        # Work on the original resolution image
-        img = self.working_img.copy()
-        
-        # Convert to grayscale and blur
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        gray = cv2.medianBlur(gray, 5)
-        
-        # Detect circles with optimized parameters
-        circles = cv2.HoughCircles(
-            gray, cv2.HOUGH_GRADIENT, dp=1.2, minDist=20,
-            param1=50, param2=30, minRadius=10, maxRadius=150
-        )
-        
-        if circles is None:
-            messagebox.showerror("Error", "No circles detected. Try manual mode.")
-            return
-            
-        # Process detected circles
-        circles = np.uint16(np.around(circles[0, :]))
-        circles = sorted(circles, key=lambda c: c[2])  # Sort by radius
-        
-        if len(circles) < 2:
-            messagebox.showerror("Error", "Need at least 2 circles (reference and tool)")
-            return
+        settings = self.circle_settings(tiled=self.tiled_active)
+        img = self.working_img
+        
+        def detected(circles):
+            self.markers = settings['markers']  # Keep the corners found by the worker's copy
+            self.show_detected_circles(circles)
+        
+        self.tasks.submit('circles', lambda context: self.locate_circles(context, settings, img),
+                          detected, "Detecting circles",
+                          signature=(id(self.working_img), self.pixels_per_mm, self.current_reference,
+                                     self.reference_diameter, json.dumps(self.detection_recipe),
+                                     settings['nominal'], settings['scale_aware']))
+
+    def circle_settings(self, markers=None, tiled=False):
+        """Snapshot of the settings locate_circles uses, taken on the Tk thread"""
+        return {
+            'recipe': json.loads(json.dumps(self.detection_recipe)),
+            'reference': self.current_reference,
+            'reference_diameter': self.reference_diameter,
+            'scale_aware': self.scale_aware_detection,
+            'pixels_per_mm': self.px_per_mm_at(1.0) if self.pixels_per_mm else None,
+            'nominal': self.tool_nominal_mm(),
+            'tolerance': self.scale_tolerance,
+            'flat_field': self.flat_field,
+            'markers': markers or self.markers.copy(),
+            'tiled': tiled,
+            'tile_size': self.tile_size,
+            'uncertainty_samples': self.uncertainty_samples,
+            'uncertainty_coverage': self.uncertainty_coverage,
+        }
+
+    def locate_circles(self, context, settings, img):
+        """Worker: reference and tool circles (x, y, r) in full-resolution pixels of img,
+        using only the circle_settings() snapshot"""
+        hough_params = settings['recipe']['hough']
+        gray = None
+        if not settings['tiled']:
+            # Work on the original resolution image
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if settings['flat_field'] is not None:
+                gray = settings['flat_field'].apply(gray)
+            gray = cv2.medianBlur(gray, 5)
+        
+        if settings['reference'].startswith("ArUco"):
+            # The marker gives the scale directly; only the tool needs a Hough search
+            marker = settings['markers'].locate(img, settings['reference_diameter'])
+            context.progress(0.3, "Searching for the tool")
+            nominal = settings['nominal'] if settings['scale_aware'] else None
+            tool_band = (scale_bounds(marker['pixels_per_mm'], nominal, settings['tolerance']) if nominal
+                         else (hough_params['minRadius'], hough_params['maxRadius']))
+            outline = marker['corners'].astype(np.float32)
+            others = [c for c in self.find_circles(gray, *tool_band, settings, img)
+                      if cv2.pointPolygonTest(outline, (float(c[0]), float(c[1])), False) < 0]
+            if not others:
+                raise ValueError(f"No tool circle of radius {tool_band[0]}-{tool_band[1]}px found")
+            tool = others[0] if nominal else max(others, key=lambda c: c[2])
+            return marker, np.uint16(np.around(tool))
+        
+        if settings['scale_aware'] and settings['pixels_per_mm']:
+            # Search only the radius bands the reference and tool can have at this scale
+            ppm = settings['pixels_per_mm']
+            ref_band = scale_bounds(ppm, settings['reference_diameter'], settings['tolerance'])
+            nominal = settings['nominal']
+            tool_band = (scale_bounds(ppm, nominal, settings['tolerance']) if nominal
+                         else (hough_params['minRadius'], hough_params['maxRadius']))
+            references = self.find_circles(gray, *ref_band, settings, img)
+            if not references:
+                raise ValueError(f"No reference circle of radius {ref_band[0]}-{ref_band[1]}px "
+                                 "found. Re-set the scale or disable scale-aware detection.")
+            reference = references[0]  # strongest accumulator peak
+            context.progress(0.5, "Searching for the tool")
+            # The tool is any other circle in its band; without a nominal, the largest
+            others = [c for c in self.find_circles(gray, *tool_band, settings, img)
+                      if math.hypot(c[0] - reference[0], c[1] - reference[1]) > reference[2]]
+            if not others:
+                raise ValueError(f"No tool circle of radius {tool_band[0]}-{tool_band[1]}px found")
+            tool = others[0] if nominal else max(others, key=lambda c: c[2])
+            reference, tool = np.uint16(np.around(reference)), np.uint16(np.around(tool))
+        else:
+            circles = self.find_circles(gray, hough_params['minRadius'], hough_params['maxRadius'],
+                                        settings, img)
+            if not circles:
+                raise ValueError("No circles detected. Try manual mode, or tune detection "
+                                 "for this fixture (CMM > Auto-Tune Detection).")
+                
+            # Process detected circles
+            circles = np.uint16(np.around(circles))
+            circles = sorted(circles, key=lambda c: c[2])  # Sort by radius
             
-        # Assume smallest is reference, largest is tool
-        reference = circles[0]
-        tool = circles[-1]
+            if len(circles) < 2:
+                raise ValueError("Need at least 2 circles (reference and tool)")
+                
+            # Assume smallest is reference, largest is tool
+            reference = circles[0]
+            tool = circles[-1]
+        return reference, tool
+
+    def show_detected_circles(self, circles):
+        """Set the scale from the reference circle and report the tool diameter (Tk thread)"""
+        reference, tool = circles
+        marker = reference if isinstance(reference, dict) else None
+        # Hough radii are whole pixels
+        quantization = 1.0 / math.sqrt(12.0)
         
         # Calculate scale factor
-        reference_px_diameter = reference[2] * 2
-        self.pixels_per_mm = reference_px_diameter / self.reference_diameter
+        if marker is not None:
+            self.apply_marker_scale(marker, 1.0)
+            centre, corners = marker['corners'].mean(axis=0), marker['corners']
+            reference = (centre[0], centre[1], np.linalg.norm(corners - centre, axis=1).max())
+        else:
+            reference_px_diameter = reference[2] * 2
+            self.pixels_per_mm = reference_px_diameter / self.reference_diameter
+            self.scale_frame = 1.0
+            self.scale_rel_std = quantization / float(reference[2])
         
         # Calculate tool diameter in mm
         tool_px_diameter = tool[2] * 2
@@ -935,11 +4466,8 @@ class CNCToolMeasurerPro:
             'pixels_per_mm': self.pixels_per_mm
         }
         
-        if self.cmm_mode:
-            self.current_measurement[self.current_view]['measurements']['diameter_std_dev'] = self.cmm_accuracy / 1000
-        
-        # Draw circles on display image
-        display_img = self.full_img.copy()
+        self.attach_uncertainty(self.current_measurement[self.current_view]['measurements'], {
+            'diameter_mm': self.run_uncertainty([[0, 0], [tool_px_diameter, 0]], batch_distance, quantization)})
         
         # Scale circle coordinates to display size
         ref_x = int(reference[0] * self.image_scale)
@@ -950,30 +4478,28 @@ class CNCToolMeasurerPro:
         tool_y = int(tool[1] * self.image_scale)
         tool_r = int(tool[2] * self.image_scale)
         
-        cv2.circle(display_img, (ref_x, ref_y), ref_r, (0, 255, 0), 3)
-        cv2.circle(display_img, (tool_x, tool_y), tool_r, (0, 0, 255), 3)
+        # Draw circles as overlay items on the display image
+        self.show_base_images()
+        overlay = self.overlay_canvas.overlay
+        if marker is not None:
+            outline = np.round(marker['corners'] * self.image_scale).astype(np.int32).reshape(-1, 1, 2)
+            overlay.contour(outline, (0, 255, 0), 3, tags=("detection",))
+            self.ref_canvas.overlay.contour(outline, (0, 255, 0), 3, tags=("detection",))
+        else:
+            overlay.circle((ref_x, ref_y), ref_r, (0, 255, 0), 3, tags=("detection",))
+            self.ref_canvas.overlay.circle((ref_x, ref_y), ref_r, (0, 255, 0), 3, tags=("detection",))
+        overlay.circle((tool_x, tool_y), tool_r, (0, 0, 255), 3, tags=("detection",))
         
         # Label circles
-        cv2.putText(display_img, "REFERENCE", (ref_x - ref_r, ref_y - ref_r - 10),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-        cv2.putText(display_img, "TOOL", (tool_x - tool_r, tool_y - tool_r - 10),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        overlay.text((ref_x - ref_r, ref_y - ref_r - 10), "REFERENCE", (0, 255, 0), tags=("detection",))
+        overlay.text((tool_x - tool_r, tool_y - tool_r - 10), "TOOL", (0, 0, 255), tags=("detection",))
         
         # Show measurements
         text = f"Tool Diameter: {tool_mm_diameter:.2f} mm"
-        cv2.putText(display_img, text, (20, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        
-        self.display_image(self.overlay_canvas, display_img)
+        self.show_result_label(text)
         
-        # Update reference and tool canvases
-        ref_img = self.full_img.copy()
-        cv2.circle(ref_img, (ref_x, ref_y), ref_r, (0, 255, 0), 3)
-        self.display_image(self.ref_canvas, ref_img)
-        
-        tool_img = self.full_img.copy()
-        cv2.circle(tool_img, (tool_x, tool_y), tool_r, (0, 0, 255), 3)
-        self.display_image(self.tool_canvas, tool_img)
+        # Update tool canvas
+        self.tool_canvas.overlay.circle((tool_x, tool_y), tool_r, (0, 0, 255), 3, tags=("detection",))
         
         self.display_measurements()
         self.update_status(f"Auto-detected tool diameter: {tool_mm_diameter:.2f} mm")
@@ -988,108 +4514,138 @@ class CNCToolMeasurerPro:
             messagebox.showwarning("No Image", "Please load or capture an image first")
             return
             
+        measure_type = self.measure_type_var.get()
+        if MEASUREMENT_PLUGINS.get(measure_type, {}).get('manual_key') is None:
+            messagebox.showwarning("Not Available", f"{measure_type} needs detected contours. Use 'Measure Tool' instead.")
+            return
+            
         self.manual_measurement_mode = True
-        self.manual_measurement_points = []
-        
-        # Create fresh display image
-        self.display_img = self.full_img.copy()
-        self.display_image(self.overlay_canvas, self.display_img)
+        self.manual_log.clear()
         
-        measure_type = self.measure_type_var.get()
+        # Start from the plain display image
+        self.show_base_images()
         
-        if measure_type == "Diameter":
-            self.update_status("Manual mode: Click 2 points on reference (for scale), then 2 points on tool diameter")
-        elif measure_type == "Inner Diameter":
-            self.update_status("Manual mode: Click 2 points on reference (for scale), then 2 points on tool inner diameter")
-        elif measure_type == "Height":
-            self.update_status("Manual mode: Click 2 points on reference (for scale), then 2 points on tool height")
+        self.update_status(f"Manual mode: Click 2 points on reference (for scale), "
+                           f"then 2 points on tool {measure_type.lower()}")
             
-        self.overlay_canvas.bind("<Button-1>", self.manual_measurement_click)
-        self.overlay_canvas.bind("<Button-3>", self.manual_measurement_clear_last)  # Right-click to clear last point
+        # Interactive selection may have taken over the left button
+        self.overlay_canvas.bind("<Button-1>", self.on_overlay_canvas_click)
 
     def manual_measurement_clear_last(self, event):
         if self.manual_measurement_mode and len(self.manual_measurement_points) > 0:
-            self.manual_measurement_points.pop()
-            self.display_img = self.full_img.copy()
-            self.display_image(self.overlay_canvas, self.display_img)
-            
-            # Redraw existing points
-            for i, (x, y) in enumerate(self.manual_measurement_points):
-                x_img = int(x * self.image_scale)
-                y_img = int(y * self.image_scale)
-                color = (0, 255, 0) if i < 2 else (0, 0, 255)  # Green for reference, red for tool
-                cv2.circle(self.display_img, (x_img, y_img), 5, color, -1)
-                
-                # Draw lines if we have pairs
-                if len(self.manual_measurement_points) >= 2:
-                    p1 = (int(self.manual_measurement_points[0][0] * self.image_scale),
-                          int(self.manual_measurement_points[0][1] * self.image_scale))
-                    p2 = (int(self.manual_measurement_points[1][0] * self.image_scale),
-                          int(self.manual_measurement_points[1][1] * self.image_scale))
-                    cv2.line(self.display_img, p1, p2, (0, 255, 0), 2)
-                    cv2.putText(self.display_img, "Reference", 
-                               (p1[0] + 10, p1[1] - 10),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                
-            self.display_image(self.overlay_canvas, self.display_img)
-            self.update_status("Last point removed. Click to add new points.")
+            self.manual_log.remove_last()
+            self.manual_points_changed("Last point removed (Ctrl+Z to restore). Click to add new points.")
+
+    def undo_manual_point(self):
+        if self.manual_measurement_mode and self.manual_log.undo():
+            self.manual_points_changed("Undone")
+
+    def redo_manual_point(self):
+        if self.manual_measurement_mode and self.manual_log.redo():
+            self.manual_points_changed("Redone")
+
+    def manual_points_changed(self, message):
+        """Redraw the point overlay and recalculate once all 4 points are placed"""
+        self.draw_manual_points()
+        if len(self.manual_measurement_points) == 4:
+            self.finish_manual_measurement()
+            return
+        # An incomplete set has no result
+        self.overlay_canvas.overlay.clear("result")
+        self.ref_canvas.overlay.clear("manual")
+        self.tool_canvas.overlay.clear("manual")
+        self.update_status(f"{message} - {len(self.manual_measurement_points)}/4 points placed")
+
+    def draw_manual_points(self):
+        """Redraw manual measurement points and lines as overlay items"""
+        overlay = self.overlay_canvas.overlay
+        overlay.clear("manual")
+        points = [(x * self.image_scale, y * self.image_scale) for x, y in self.manual_measurement_points]
+        
+        for i, point in enumerate(points):
+            color = (0, 255, 0) if i < 2 else (0, 0, 255)  # Green for reference, red for tool
+            overlay.dot(point, 5, color, tags=("manual",))
+        
+        # Draw lines for completed pairs
+        if len(points) >= 2:
+            overlay.line(points[0], points[1], (0, 255, 0), 2, tags=("manual",))
+            overlay.text((points[0][0] + 10, points[0][1] - 10), "Reference", (0, 255, 0), tags=("manual",))
+        if len(points) >= 4:
+            overlay.line(points[2], points[3], (0, 0, 255), 2, tags=("manual",))
+            overlay.text((points[2][0] + 10, points[2][1] - 10), "Tool", (0, 0, 255), tags=("manual",))
+
+    def event_to_original(self, event, snap=False):
+        """Canvas event position in original image coordinates, optionally edge-snapped"""
+        x_img, y_img = self.overlay_canvas.overlay.to_image(event.x, event.y)
+        point = (x_img / self.image_scale, y_img / self.image_scale)
+        if snap and self.edge_snap:
+            snapped = self.snap_to_edge(point)
+            if snapped is not None:
+                return snapped
+        return int(point[0]), int(point[1])
+
+    def snap_to_edge(self, point):
+        if self.working_img is None:
+            return None
+        if self.edge_snapper is None:
+            # Tiled images never get whole-image gradients; memory stays bounded by the window
+            h, w = self.working_img.shape[:2]
+            self.edge_snapper = EdgeSnapper(self.working_img,
+                                            precompute=not self.tiled_active and h * w <= self.tiled_threshold_px)
+        radius = self.snap_radius / (self.overlay_canvas.overlay.scale * self.image_scale)
+        return self.edge_snapper.snap(point, radius)
+
+    def update_loupe(self, event):
+        """Magnified full-resolution view around the pointer with the snap target"""
+        if self.working_img is None:
+            return
+        x_img, y_img = self.overlay_canvas.overlay.to_image(event.x, event.y)
+        center = (x_img / self.image_scale, y_img / self.image_scale)
+        target = self.snap_to_edge(center) if self.edge_snap else None
+        self.loupe.show(self.working_img, center, target, avoid=(event.x, event.y))
+
+    def toggle_edge_snap(self):
+        self.edge_snap = not self.edge_snap
+        self.update_status("Edge snapping " + ("enabled" if self.edge_snap else "disabled"))
 
     def manual_measurement_click(self, event):
         if not self.manual_measurement_mode:
             return
             
-        # Get click coordinates in display image
-        canvas = self.overlay_canvas
-        display_img = self.display_img
-        canvas_width = canvas.winfo_width()
-        canvas_height = canvas.winfo_height()
-        img_height, img_width = display_img.shape[:2]
-        
-        # Calculate scaling factors
-        scale_x = img_width / canvas_width
-        scale_y = img_height / canvas_height
-        
-        # Get image coordinates
-        x_img = int(event.x * scale_x)
-        y_img = int(event.y * scale_y)
-        
         # Store point (in original image coordinates)
-        x_orig = int(x_img / self.image_scale)
-        y_orig = int(y_img / self.image_scale)
-        self.manual_measurement_points.append((x_orig, y_orig))
-        
-        # Draw point on display image
-        color = (0, 255, 0) if len(self.manual_measurement_points) <= 2 else (0, 0, 255)  # Green for reference, red for tool
-        cv2.circle(display_img, (x_img, y_img), 5, color, -1)
-        
-        # Draw line if we have pairs of points
-        if len(self.manual_measurement_points) >= 2:
-            if len(self.manual_measurement_points) == 2:
-                # Reference line
-                p1 = (int(self.manual_measurement_points[0][0] * self.image_scale),
-                      int(self.manual_measurement_points[0][1] * self.image_scale))
-                p2 = (int(self.manual_measurement_points[1][0] * self.image_scale),
-                      int(self.manual_measurement_points[1][1] * self.image_scale))
-                cv2.line(display_img, p1, p2, (0, 255, 0), 2)
-                cv2.putText(display_img, "Reference", 
-                           (p1[0] + 10, p1[1] - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-            elif len(self.manual_measurement_points) == 4:
-                # Tool measurement line
-                p1 = (int(self.manual_measurement_points[2][0] * self.image_scale),
-                      int(self.manual_measurement_points[2][1] * self.image_scale))
-                p2 = (int(self.manual_measurement_points[3][0] * self.image_scale),
-                      int(self.manual_measurement_points[3][1] * self.image_scale))
-                cv2.line(display_img, p1, p2, (0, 0, 255), 2)
-                cv2.putText(display_img, "Tool", 
-                           (p1[0] + 10, p1[1] - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-        
-        self.display_image(self.overlay_canvas, display_img)
-        
-        # Check if we have all needed points
-        if len(self.manual_measurement_points) == 4:
-            self.finish_manual_measurement()
+        point = self.event_to_original(event, snap=True)
+        
+        # Pressing on an existing point starts moving it
+        grab_radius = 8 / (self.overlay_canvas.overlay.scale * self.image_scale)
+        index = self.manual_log.nearest(point, grab_radius)
+        if index is not None:
+            self.manual_drag = (index, self.manual_measurement_points[index])
+            return
+            
+        if len(self.manual_measurement_points) >= 4:
+            self.update_status("All 4 points placed - drag a point to adjust it, Ctrl+Z/Ctrl+Y to undo/redo")
+            return
+        self.manual_log.add(point)
+        self.manual_points_changed("Point added")
+
+    def manual_measurement_drag(self, event):
+        """Follow the pointer with the grabbed point (overlay only, not logged yet)"""
+        if self.manual_drag is None:
+            return
+        self.manual_measurement_points[self.manual_drag[0]] = self.event_to_original(event, snap=True)
+        self.draw_manual_points()
+        self.update_loupe(event)
+
+    def manual_measurement_release(self, event):
+        """Log a finished drag as a single move command"""
+        if self.manual_drag is None:
+            return
+        index, start = self.manual_drag
+        self.manual_drag = None
+        end = self.manual_measurement_points[index]
+        if end != start:
+            self.manual_log.move(index, end, old=start)
+            self.manual_points_changed("Point moved")
 
     def finish_manual_measurement(self):
         """Complete manual measurement and calculate dimensions"""
@@ -1113,34 +4669,33 @@ class CNCToolMeasurerPro:
             messagebox.showerror("Error", "Reference points are the same")
             return
             
+        try:
+            plane = self.active_plane()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+            
         # Calculate scale factor
         self.pixels_per_mm = ref_dist_px / self.reference_diameter
+        self.scale_frame = 1.0
+        self.scale_rel_std = self.click_sigma_px * math.sqrt(2) / ref_dist_px
+        if plane is not None:
+            # Tool span measured on the fixture plane, expressed at the reference scale
+            tool_p1, tool_p2 = plane.to_plane([tool_p1, tool_p2]) * self.pixels_per_mm
+            tool_dist_px = math.hypot(tool_p1[0] - tool_p2[0], tool_p1[1] - tool_p2[1])
         
         # Calculate tool measurement based on selected type
         measure_type = self.measure_type_var.get()
         measurements = {}
-        
-        if measure_type == "Diameter":
-            tool_mm = tool_dist_px / self.pixels_per_mm
-            measurements['diameter_mm'] = tool_mm
-            if self.cmm_mode:
-                measurements['diameter_std_dev'] = self.cmm_accuracy / 1000
-        elif measure_type == "Inner Diameter":
-            tool_mm = tool_dist_px / self.pixels_per_mm
-            measurements['inner_diameter_mm'] = tool_mm
-            if self.cmm_mode:
-                measurements['inner_diameter_std_dev'] = self.cmm_accuracy / 1000
-        elif measure_type == "Height":
-            tool_mm = tool_dist_px / self.pixels_per_mm
-            measurements['height_mm'] = tool_mm
-            if self.cmm_mode:
-                measurements['height_std_dev'] = self.cmm_accuracy / 1000
+        name = MEASUREMENT_PLUGINS.get(measure_type, {}).get('manual_key')
+        if name is not None:
+            measurements[name] = tool_dist_px / self.pixels_per_mm
         
         # Store measurements
         self.current_measurement[self.current_view]['measurements'] = measurements
-        
-        # Draw lines on display image
-        display_img = self.full_img.copy()
+        if name is not None:
+            self.attach_uncertainty(measurements, {
+                name: self.run_uncertainty([tool_p1, tool_p2], batch_distance, self.click_sigma_px)})
         
         # Scale points to display size
         ref_p1_disp = (int(self.manual_measurement_points[0][0] * self.image_scale),
@@ -1152,46 +4707,23 @@ class CNCToolMeasurerPro:
         tool_p2_disp = (int(self.manual_measurement_points[3][0] * self.image_scale),
                        int(self.manual_measurement_points[3][1] * self.image_scale))
         
-        # Draw reference line
-        cv2.line(display_img, ref_p1_disp, ref_p2_disp, (0, 255, 0), 2)
-        cv2.putText(display_img, "Reference", 
-                   (ref_p1_disp[0] + 10, ref_p1_disp[1] - 10),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-        
-        # Draw tool line
-        cv2.line(display_img, tool_p1_disp, tool_p2_disp, (0, 0, 255), 2)
-        cv2.putText(display_img, "Tool", 
-                   (tool_p1_disp[0] + 10, tool_p1_disp[1] - 10),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        # Draw reference and tool lines
+        self.draw_manual_points()
         
         # Show measurement
-        if measure_type == "Diameter":
-            text = f"Tool Diameter: {measurements['diameter_mm']:.2f} mm"
-        elif measure_type == "Inner Diameter":
-            text = f"Tool Inner Diameter: {measurements['inner_diameter_mm']:.2f} mm"
-        elif measure_type == "Height":
-            text = f"Tool Height: {measurements['height_mm']:.2f} mm"
+        text = f"Tool {measure_type}: {measurements[name]:.2f} mm" if name is not None else "No manual feature"
             
-        cv2.putText(display_img, text, (20, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        
-        self.display_image(self.overlay_canvas, display_img)
+        self.show_result_label(text)
         
         # Update reference and tool canvases
-        ref_img = self.full_img.copy()
-        cv2.line(ref_img, ref_p1_disp, ref_p2_disp, (0, 255, 0), 2)
-        self.display_image(self.ref_canvas, ref_img)
-        
-        tool_img = self.full_img.copy()
-        cv2.line(tool_img, tool_p1_disp, tool_p2_disp, (0, 0, 255), 2)
-        self.display_image(self.tool_canvas, tool_img)
+        self.ref_canvas.overlay.clear("manual")
+        self.ref_canvas.overlay.line(ref_p1_disp, ref_p2_disp, (0, 255, 0), 2, tags=("manual",))
+        self.tool_canvas.overlay.clear("manual")
+        self.tool_canvas.overlay.line(tool_p1_disp, tool_p2_disp, (0, 0, 255), 2, tags=("manual",))
         
         self.display_measurements()
         
-        self.manual_measurement_mode = False
-        self.overlay_canvas.unbind("<Button-1>")
-        self.overlay_canvas.unbind("<Button-3>")
-        self.update_status(f"Manual measurement complete: {text}")
+        self.update_status(f"Manual measurement complete: {text} (drag points to adjust, Ctrl+Z/Ctrl+Y to undo/redo)")
 
     def zoom_in(self):
         """Zoom in on the image"""
@@ -1212,17 +4744,33 @@ class CNCToolMeasurerPro:
         self.update_zoom('all')
 
     def update_zoom(self, canvas_type='all'):
-        """Update the displayed image with current zoom level"""
+        """Update the visible image region for the current zoom and pan"""
         if self.full_img is None:
             return
             
+        view = self.current_zoom_view()
+        if view is None:
+            return
+            
+        # Only the base bitmap is re-rendered; overlay items are moved with it
+        if canvas_type == 'all' or canvas_type == 'overlay':
+            self.display_image(self.overlay_canvas, self.full_img, view)
+        if canvas_type == 'all' or canvas_type == 'ref':
+            self.display_image(self.ref_canvas, self.full_img, view)
+        if canvas_type == 'all' or canvas_type == 'tool':
+            self.display_image(self.tool_canvas, self.full_img, view)
+        
+        self.update_status(f"Zoom: {self.zoom_level:.1f}x")
+
+    def current_zoom_view(self):
+        """Visible (x0, y0, x1, y1) region of the display image for zoom and pan"""
         h, w = self.full_img.shape[:2]
-        new_w = int(w * self.zoom_level)
-        new_h = int(h * self.zoom_level)
+        new_w = int(w / self.zoom_level)
+        new_h = int(h / self.zoom_level)
         
         # Calculate center point
-        center_x = w // 2 + self.pan_offset_x
-        center_y = h // 2 + self.pan_offset_y
+        center_x = w // 2 + int(self.pan_offset_x)
+        center_y = h // 2 + int(self.pan_offset_y)
         
         # Calculate crop area
         crop_x1 = max(0, center_x - new_w // 2)
@@ -1230,19 +4778,9 @@ class CNCToolMeasurerPro:
         crop_x2 = min(w, center_x + new_w // 2)
         crop_y2 = min(h, center_y + new_h // 2)
         
-        # Crop and resize
         if crop_x2 > crop_x1 and crop_y2 > crop_y1:
-            zoomed_img = self.full_img[crop_y1:crop_y2, crop_x1:crop_x2]
-            zoomed_img = cv2.resize(zoomed_img, (w, h))
-            
-            if canvas_type == 'all' or canvas_type == 'overlay':
-                self.display_image(self.overlay_canvas, zoomed_img)
-            if canvas_type == 'all' or canvas_type == 'ref':
-                self.display_image(self.ref_canvas, zoomed_img)
-            if canvas_type == 'all' or canvas_type == 'tool':
-                self.display_image(self.tool_canvas, zoomed_img)
-            
-            self.update_status(f"Zoom: {self.zoom_level:.1f}x")
+            return (crop_x1, crop_y1, crop_x2, crop_y2)
+        return None
 
     def reset_pan_zoom(self, canvas_type='all'):
         """Reset pan and zoom to default"""
@@ -1261,6 +4799,10 @@ class CNCToolMeasurerPro:
             self.update_status("Zoom and pan reset")
 
     def set_reference_scale(self):
+        if self.current_reference.startswith("ArUco"):
+            self.set_marker_scale()
+            return
+            
         if len(self.detected_objects) < 2:
             messagebox.showerror("Error", "Could not detect both reference and tool")
             return
@@ -1276,14 +4818,48 @@ class CNCToolMeasurerPro:
         x, y, w, h = ref_obj['bbox']
         ref_pixel_size = max(w, h)
         self.pixels_per_mm = ref_pixel_size / self.reference_diameter
+        self.scale_frame = 1.0 if self.tiled_active else self.image_scale
+        ref_spread = monte_carlo_uncertainty(ref_obj['contour'], batch_extent(), 1.0,
+                                             estimate_edge_noise(ref_obj['contour']),
+                                             samples=self.uncertainty_samples)
+        self.scale_rel_std = ref_spread['std'] / ref_pixel_size
         
         messagebox.showinfo("Scale Set", 
                           f"Reference scale established: {self.pixels_per_mm:.2f} pixels/mm\n"
                           f"Reference size: {self.reference_diameter}mm = {ref_pixel_size} pixels")
         self.update_status(f"Scale set: {self.pixels_per_mm:.2f} pixels/mm")
 
+    def set_marker_scale(self):
+        """Scale and orientation from the ArUco marker alone, without object detection"""
+        if self.working_img is None:
+            messagebox.showwarning("No Image", "Please load or capture an image first")
+            return
+        try:
+            marker = self.markers.locate(self.working_img, self.reference_diameter)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+            
+        self.apply_marker_scale(marker, 1.0 if self.tiled_active else self.image_scale)
+        outline = np.round(marker['corners'] * self.image_scale).astype(np.int32).reshape(-1, 1, 2)
+        self.overlay_canvas.overlay.clear("detection")
+        self.overlay_canvas.overlay.contour(outline, (0, 255, 0), 3, tags=("detection",))
+        messagebox.showinfo("Scale Set",
+                            f"Reference scale established: {self.pixels_per_mm:.2f} pixels/mm\n"
+                            f"ArUco marker {marker['id']}, {self.reference_diameter}mm, "
+                            f"rotated {marker['angle_deg']:.1f}°")
+        self.update_status(f"Scale set: {self.pixels_per_mm:.2f} pixels/mm")
+
+    def apply_marker_scale(self, marker, frame):
+        """Adopt a located marker's scale, expressed for contours found at image scale frame"""
+        self.pixels_per_mm = marker['pixels_per_mm'] * frame
+        self.scale_frame = frame
+        self.scale_rel_std = marker['scale_rel_std']
+
     def measure_tool(self):
         """Enhanced measurement with CMM-like precision"""
+        if self.pixels_per_mm is None and self.plane is not None and self.working_img is not None:
+            self.scale_from_plane()
         if self.pixels_per_mm is None:
             messagebox.showerror("Error", "Please set reference scale first")
             return
@@ -1300,73 +4876,122 @@ class CNCToolMeasurerPro:
             messagebox.showerror("Error", "No image available for measurement. Please capture or load an image first.")
             return
             
-        # Re-detect objects to ensure we have fresh contours
-        self.detect_reference_and_object()
-        
-        if len(self.detected_objects) < 2:
-            messagebox.showerror("Error", "Tool detection failed. Please try selecting objects again.")
-            return
-            
-        tool_obj = next(obj for obj in self.detected_objects if obj['type'] == 'tool')
-        cnt = tool_obj['contour']
-        measurements = {}
         measure_type = self.measure_type_var.get()
+        settings, snapshot = self.object_settings(), self.worker_snapshot()
+        self.tasks.submit('measure', lambda context: snapshot.compute_tool_measurements(context, measure_type,
+                                                                                        settings),
+                          lambda result: self.show_tool_measurements(measure_type, result),
+                          f"Measuring {measure_type.lower()}",
+                          signature=(measure_type, id(self.working_img), self.pixels_per_mm,
+                                     self.cmm_mode, tuple(self.selection_points)))
+
+    def worker_snapshot(self):
+        """Shallow copy of the app taken on the Tk thread, for a worker that calls its methods.
+
+        Scale, images, modes and the plane are rebound, never edited in place,
+        on the Tk thread, so the copy keeps the values of this moment; the
+        containers that are edited in place are copied as well.
+        """
+        snapshot = copy.copy(self)
+        snapshot.selection_points = list(self.selection_points)
+        snapshot.detection_recipe = json.loads(json.dumps(self.detection_recipe))
+        return snapshot
+
+    def compute_tool_measurements(self, context, measure_type, settings):
+        """Worker: detect once, then run the selected plugin (or all of them) on the shared contour.
+
+        Called on a worker_snapshot() with an object_settings() snapshot. Returns
+        the objects, the combined measurements, their uncertainty, the plugins
+        that failed during an all-features pass and the fit details.
+        """
+        objects = self.find_selected_objects(context, settings)
+        cnt = self.rectify_contour(objects[1]['contour'])
+        points = cnt.reshape(-1, 2).astype(np.float64)
+        sigma = estimate_edge_noise(points)
+        names = list(MEASUREMENT_PLUGINS) if measure_type == ALL_FEATURES else [measure_type]
+        measurements, uncertainty, failed = {}, {}, []
+        fit = {}  # Fit details of this pass only; the Tk thread adopts them with the result
+        
+        for i, name in enumerate(names):
+            context.progress(0.4 + 0.6 * i / len(names), name)
+            plugin = MEASUREMENT_PLUGINS[name]
+            try:
+                values = plugin['measure'](self, cnt, fit)
+            except Exception as e:
+                if len(names) == 1:
+                    raise
+                failed.append(f"{name}: {str(e)}")
+                continue
+            # Earlier plugins own a feature key (e.g. Height before the profile's height)
+            values = {key: value for key, value in values.items() if key not in measurements}
+            measurements.update(values)
+            if plugin['uncertainty'] is not None:
+                results = plugin['uncertainty'](self, points, sigma, values, fit)
+                uncertainty.update({key: result for key, result in results.items() if key in values})
+            if name == "Full Profile" and cnt is not objects[1]['contour']:
+                for edge in ('left_edge', 'right_edge'):
+                    fit['profile'][edge] = self.unrectify_points(fit['profile'][edge])
+        return objects, measurements, uncertainty, failed, fit
+
+    def show_tool_measurements(self, measure_type, result):
+        """Store and draw a finished tool measurement (Tk thread)"""
+        objects, measurements, uncertainty, failed, fit = result
+        self.last_circle_fit = fit.get('circle')
+        if 'profile' in fit:
+            self.tool_profile = fit['profile']
+        self.show_detected_objects(objects)
+        if measure_type in ("Full Profile", ALL_FEATURES) and not any(f.startswith("Full Profile") for f in failed):
+            self.draw_profile_edges(self.tool_profile)
         
-        try:
-            if measure_type == "Diameter":
-                diameter = self.measure_diameter(cnt)
-                measurements['diameter_mm'] = diameter
-                if self.cmm_mode:
-                    measurements['diameter_std_dev'] = self.cmm_accuracy / 1000  # Convert µm to mm
-            
-            elif measure_type == "Inner Diameter":
-                inner_diameter = self.measure_inner_diameter(cnt)
-                measurements['inner_diameter_mm'] = inner_diameter
-                if self.cmm_mode:
-                    measurements['inner_diameter_std_dev'] = self.cmm_accuracy / 1000
-            
-            elif measure_type == "Height":
-                height = self.measure_height(cnt)
-                measurements['height_mm'] = height
-                if self.cmm_mode:
-                    measurements['height_std_dev'] = self.cmm_accuracy / 1000
-            
-            self.current_measurement[self.current_view]['measurements'] = measurements
-            self.display_measurements()
-            self.update_overlay_with_measurements(measurements)
-            
-            status_msg = f"{measure_type} measured in {self.current_view.replace('_', ' ')} view"
-            if self.cmm_mode:
-                status_msg += f" (CMM precision: ±{self.cmm_accuracy}µm)"
-            self.update_status(status_msg)
-            self.unsaved_changes = True
-            
-        except Exception as e:
-            messagebox.showerror("Measurement Error", f"Failed to measure: {str(e)}")
-            self.update_status("Measurement failed")
+        self.current_measurement[self.current_view]['measurements'] = measurements
+        self.attach_uncertainty(measurements, uncertainty)
+        self.display_measurements()
+        self.update_overlay_with_measurements(measurements)
+        
+        status_msg = f"{measure_type} measured in {self.current_view.replace('_', ' ')} view"
+        if measure_type == "Diameter" and self.last_circle_fit:
+            status_msg += (f" (fit inliers {self.last_circle_fit['inlier_ratio']:.0%}, "
+                           f"confidence {self.last_circle_fit['confidence']:.2f})")
+        if self.cmm_mode:
+            status_msg += f" (CMM precision: ±{self.cmm_accuracy}µm)"
+        if failed:
+            status_msg += " - skipped " + "; ".join(failed)
+        self.update_status(status_msg)
+        self.unsaved_changes = True
     
-    def measure_diameter(self, contour):
-        """Precise outer diameter measurement using circle fitting"""
+    def measure_diameter(self, contour, fit=None):
+        """Precise outer diameter measurement using circle fitting; the robust fit's
+        inliers and confidence go into fit['circle'] when a fit dict is given"""
+        fit = {} if fit is None else fit
+        fit['circle'] = None
         if len(contour) < 5:  # Need at least 5 points to fit a circle
             x, y, w, h = cv2.boundingRect(contour)
             return max(w, h) / self.pixels_per_mm
             
         if self.measurement_strategy == "automatic":
-            # Fit circle to contour points
-            (x, y), radius = cv2.minEnclosingCircle(contour)
+            # Robust fit that ignores burrs and chips; fall back to the enclosing circle
+            points = contour.reshape(-1, 2).astype(np.float64)
+            try:
+                (x, y), radius, inliers, confidence = fit_circle_ransac(
+                    points, threshold=self.ransac_threshold_px,
+                    max_iterations=self.ransac_max_iterations,
+                    time_budget=self.ransac_time_budget)
+                fit['circle'] = {'inlier_ratio': float(inliers.mean()), 'confidence': confidence,
+                                 'inliers': inliers}
+            except ValueError:
+                (x, y), radius = cv2.minEnclosingCircle(contour)
+                inliers = np.ones(len(points), dtype=bool)
             
             # For CMM mode, use more precise fitting
             if self.cmm_mode:
+                from scipy import optimize
+
                 def circle_residuals(params, points):
                     x0, y0, r = params
-                    residuals = []
-                    for x, y in points:
-                        residuals.append(abs(math.sqrt((x-x0)**2 + (y-y0)**2) - r))
-                    return residuals
+                    return np.hypot(points[:, 0] - x0, points[:, 1] - y0) - r
                 
-                points = contour.reshape(-1, 2)
                 initial_guess = (x, y, radius)
-                result = optimize.least_squares(circle_residuals, initial_guess, args=(points,))
+                result = optimize.least_squares(circle_residuals, initial_guess, args=(points[inliers],))
                 x, y, radius = result.x
             
             diameter = (radius * 2) / self.pixels_per_mm
@@ -1376,25 +5001,32 @@ class CNCToolMeasurerPro:
             diameter = max(w, h) / self.pixels_per_mm
         
         return diameter
-    
-    def measure_inner_diameter(self, contour):
-        """Precise inner diameter measurement using inscribed circle"""
+
+    def measure_inner_diameter(self, contour, fit=None):
+        """Precise inner diameter measurement using inscribed circle (centre in fit['inscribed_center'])"""
+        fit = {} if fit is None else fit
         if len(contour) < 5:  # Need at least 5 points for good measurement
             x, y, w, h = cv2.boundingRect(contour)
             return min(w, h) / self.pixels_per_mm
             
         if self.measurement_strategy == "automatic":
-            # Create distance transform to find largest inscribed circle
-            mask = np.zeros(self.full_img.shape[:2], dtype=np.uint8)
-            cv2.drawContours(mask, [contour], -1, 255, -1)
+            # Create distance transform to find largest inscribed circle; the mask only
+            # covers the contour's bounding box so memory is bounded by the object size
+            bx, by, bw, bh = cv2.boundingRect(contour)
+            mask = np.zeros((bh + 2, bw + 2), dtype=np.uint8)
+            cv2.drawContours(mask, [np.round(contour).astype(np.int32)], -1, 255, -1, offset=(1 - bx, 1 - by))
             dist_transform = cv2.distanceTransform(mask, cv2.DIST_L2, 5)
             
             # Find the maximum distance (radius of largest inscribed circle)
             min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(dist_transform)
             radius = max_val
+            max_loc = (max_loc[0] + bx - 1, max_loc[1] + by - 1)
+            fit['inscribed_center'] = max_loc
             
             # For CMM mode, use more precise calculation
             if self.cmm_mode:
+                from scipy.spatial import distance
+
                 # Sample points on the contour
                 points = contour.reshape(-1, 2)
                 
@@ -1434,35 +5066,156 @@ class CNCToolMeasurerPro:
         
         return height
 
+    def measure_concentric(self, contour, fit=None):
+        """Outer and bore diameters, concentricity and roundness from one polar unwrap.
+
+        The unwrap runs on the full-resolution image around the robust circle fit
+        of the contour, and is repeated once around the refined outer centre.
+        Edge points are mapped back into the contour's frame (plane-rectified when
+        calibrated) before the circles are fitted, and left in fit['polar'].
+        """
+        fit = {} if fit is None else fit
+        frame = 1.0 if self.tiled_active else self.image_scale
+        rectified = self.active_plane() is not None
+        points = contour.reshape(-1, 2).astype(np.float64)
+        if rectified:
+            points = self.unrectify_points(points)
+        if len(points) < 5:
+            raise ValueError("Concentric measurement needs at least 5 contour points")
+        (cx, cy), radius, _, _ = fit_circle_ransac(points / frame, threshold=self.ransac_threshold_px / frame,
+                                                   max_iterations=self.ransac_max_iterations,
+                                                   time_budget=self.ransac_time_budget)
+        
+        img = self.working_img
+        fits = {}
+        for _ in range(2):
+            # Unwrap only a window around the part
+            reach = radius * 1.25 + 4
+            x0, y0 = max(0, int(cx - reach)), max(0, int(cy - reach))
+            x1, y1 = min(img.shape[1], int(cx + reach) + 2), min(img.shape[0], int(cy + reach) + 2)
+            roi = img[y0:y1, x0:x1]
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+            angles, outer_r, bore_r = polar_edges(gray, (cx - x0, cy - y0), reach, radius)
+            
+            fits = {}
+            for edge, radii in (('outer', outer_r), ('bore', bore_r)):
+                ok = ~np.isnan(radii)
+                if ok.sum() < 0.25 * len(radii):
+                    continue
+                edge_points = np.column_stack([cx + radii[ok] * np.cos(angles[ok]),
+                                               cy + radii[ok] * np.sin(angles[ok])]) * frame
+                if rectified:
+                    edge_points = self.rectify_contour(edge_points).reshape(-1, 2).astype(np.float64)
+                (ex, ey), er, kept = fit_form_circle(edge_points, threshold=self.ransac_threshold_px,
+                                                     max_iterations=self.ransac_max_iterations,
+                                                     time_budget=self.ransac_time_budget)
+                residual = np.hypot(edge_points[kept, 0] - ex, edge_points[kept, 1] - ey) - er
+                spread = 1.4826 * np.median(np.abs(residual - np.median(residual)))
+                if kept.mean() < 0.5 or spread > self.concentric_max_spread * er:
+                    continue  # Scattered responses (flutes, texture), not a closed edge
+                fits[edge] = (ex, ey, er, edge_points[kept])
+            if 'outer' not in fits:
+                raise ValueError("No circular outer edge found in the polar unwrap")
+            
+            # Re-centre on the fitted outer circle, in full-resolution image pixels
+            ex, ey, _, outer_points = fits['outer']
+            centre = np.array([[ex, ey]])
+            if rectified:
+                outer_points, centre = self.unrectify_points(outer_points), self.unrectify_points(centre)
+            outer_points, (cx, cy) = outer_points / frame, centre[0] / frame
+            radius = float(np.median(np.hypot(outer_points[:, 0] - cx, outer_points[:, 1] - cy)))
+            
+        fit['polar'] = {edge: fits[edge][3] if edge in fits else None for edge in ('outer', 'bore')}
+        
+        def roundness(fit):
+            ex, ey, _, edge_points = fit
+            return radial_spread(edge_points, (ex, ey), self.roundness_trim_pct) / self.pixels_per_mm
+        
+        ox, oy, outer_radius, _ = fits['outer']
+        measurements = {'diameter_mm': 2 * outer_radius / self.pixels_per_mm,
+                        'roundness_mm': roundness(fits['outer'])}
+        if 'bore' in fits:
+            bx, by, bore_radius, _ = fits['bore']
+            measurements.update({'bore_diameter_mm': 2 * bore_radius / self.pixels_per_mm,
+                                 'concentricity_mm': math.hypot(ox - bx, oy - by) / self.pixels_per_mm,
+                                 'bore_roundness_mm': roundness(fits['bore'])})
+        return measurements
+
+    def measure_profile(self, contour, fit=None):
+        """Full side-view profile: overall length, shank, flutes, taper and corner radius
+        (the profile itself goes into fit['profile'])"""
+        profile = extract_tool_profile(contour)
+        if fit is not None:
+            fit['profile'] = profile
+        
+        measurements = {
+            'height_mm': profile['overall_length'] / self.pixels_per_mm,
+            'shank_diameter_mm': profile['shank_diameter'] / self.pixels_per_mm,
+            'flute_length_mm': profile['flute_length'] / self.pixels_per_mm,
+            'corner_radius_mm': profile['corner_radius'] / self.pixels_per_mm,
+            'taper_deg': profile['taper_deg'],
+        }
+        return measurements
+
+    def run_uncertainty(self, points, estimator, edge_sigma):
+        """Monte-Carlo uncertainty with the current scale and settings"""
+        return monte_carlo_uncertainty(points, estimator, self.pixels_per_mm, edge_sigma,
+                                       self.scale_rel_std, self.uncertainty_samples,
+                                       self.uncertainty_coverage)
+
+    def attach_uncertainty(self, measurements, results):
+        """Store std dev next to each measurement and the coverage interval per view"""
+        uncertainty = self.current_measurement[self.current_view]['uncertainty']
+        uncertainty.clear()
+        for name, result in results.items():
+            # Extreme-value estimators are biased under noise; keep the spread, centred on the reported value
+            shift = measurements[name] - result['mean']
+            measurements[f"{name}_std_dev"] = result['std']
+            uncertainty[name] = dict(result, low=result['low'] + shift, high=result['high'] + shift)
+
+    def format_measurement(self, view, name, value, interval=True):
+        """One result line: value, ±std dev, unit and coverage interval when known"""
+        measurements = self.current_measurement[view]['measurements']
+        text = f"{name.replace('_', ' ').title()}: {value:.4f}"
+        if f"{name}_std_dev" in measurements:
+            text += f" ±{measurements[f'{name}_std_dev']:.4f}"
+        text += f" {measurement_unit(name)}"
+        result = self.current_measurement[view].get('uncertainty', {}).get(name)
+        if interval and result:
+            text += f"  [{result['low']:.4f}, {result['high']:.4f}] {result['coverage']:.0%}"
+        return text
+
+    def draw_profile_edges(self, profile):
+        """Overlay the extracted silhouette edges on the tool canvas"""
+        overlay = self.tool_canvas.overlay
+        overlay.clear("profile")
+        for edge, color in ((profile['left_edge'], (255, 128, 0)), (profile['right_edge'], (0, 128, 255))):
+            step = max(1, len(edge) // 200)
+            overlay.polyline(self.contour_to_display(edge[::step]), color, 2, tags=("profile",))
+
     def update_overlay_with_measurements(self, measurements):
-        if not hasattr(self, 'overlay_img'):
+        if not self.detected_objects:
             return
             
-        overlay = self.overlay_img.copy()
+        overlay = self.overlay_canvas.overlay
+        overlay.clear("result")
         tool_obj = next(obj for obj in self.detected_objects if obj['type'] == 'tool')
-        x, y, w, h = tool_obj['bbox']
+        x, y, w, h = self.detection_bbox_to_display(tool_obj['bbox'])
         text_y = y
         
         for name, value in measurements.items():
             if name.endswith('_std_dev'):
                 continue  # Skip standard deviation for overlay
                 
-            if name in self.current_measurement[self.current_view]['measurements'] and f"{name}_std_dev" in self.current_measurement[self.current_view]['measurements']:
-                std_dev = self.current_measurement[self.current_view]['measurements'][f"{name}_std_dev"]
-                text = f"{name.replace('_', ' ').title()}: {value:.4f} ±{std_dev:.4f} mm"
-            else:
-                text = f"{name.replace('_', ' ').title()}: {value:.4f} mm"
-                
-            cv2.putText(overlay, text, (x, text_y), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+            text = self.format_measurement(self.current_view, name, value, interval=False)
+            overlay.text((x, text_y), text, (255, 255, 0), 0.5, tags=("result",))
             text_y += 20
-            
-        self.overlay_img = overlay
-        self.display_analysis()
 
-    def display_analysis(self):
-        if hasattr(self, 'overlay_img'):
-            self.display_image(self.overlay_canvas, self.overlay_img)
+    def show_result_label(self, text):
+        """Show the headline result in the top-left corner of the overlay canvas"""
+        overlay = self.overlay_canvas.overlay
+        overlay.clear("result")
+        overlay.text((20, 30), text, (255, 255, 255), tags=("result",))
 
     def display_measurements(self):
         """Enhanced measurement display with CMM-like reporting"""
@@ -1473,13 +5226,7 @@ class CNCToolMeasurerPro:
             if name.endswith('_std_dev'):
                 continue  # Skip std dev for main display
                 
-            if name in self.current_measurement['top_view']['measurements'] and f"{name}_std_dev" in self.current_measurement['top_view']['measurements']:
-                std_dev = self.current_measurement['top_view']['measurements'][f"{name}_std_dev"]
-                self.top_results_text.insert(tk.END, 
-                    f"{name.replace('_', ' ').title()}: {value:.4f} ±{std_dev:.4f} mm\n")
-            else:
-                self.top_results_text.insert(tk.END, 
-                    f"{name.replace('_', ' ').title()}: {value:.4f} mm\n")
+            self.top_results_text.insert(tk.END, self.format_measurement('top_view', name, value) + "\n")
         
         self.side_results_text.delete(1.0, tk.END)
         self.side_results_text.insert(tk.END, "=== Side View Measurements ===\n\n")
@@ -1488,16 +5235,10 @@ class CNCToolMeasurerPro:
             if name.endswith('_std_dev'):
                 continue
                 
-            if name in self.current_measurement['side_view']['measurements'] and f"{name}_std_dev" in self.current_measurement['side_view']['measurements']:
-                std_dev = self.current_measurement['side_view']['measurements'][f"{name}_std_dev"]
-                self.side_results_text.insert(tk.END, 
-                    f"{name.replace('_', ' ').title()}: {value:.4f} ±{std_dev:.4f} mm\n")
-            else:
-                self.side_results_text.insert(tk.END, 
-                    f"{name.replace('_', ' ').title()}: {value:.4f} mm\n")
+            self.side_results_text.insert(tk.END, self.format_measurement('side_view', name, value) + "\n")
         
         if self.pixels_per_mm:
-            precision = f" ±{self.cmm_accuracy/1000:.4f} mm" if self.cmm_mode else ""
+            precision = f" ±{self.pixels_per_mm * self.scale_rel_std:.4f}" if self.scale_rel_std else ""
             self.top_results_text.insert(tk.END, f"\nScale: {self.pixels_per_mm:.4f}{precision} pixels/mm")
             self.side_results_text.insert(tk.END, f"\nScale: {self.pixels_per_mm:.4f}{precision} pixels/mm")
         
@@ -1509,6 +5250,49 @@ class CNCToolMeasurerPro:
             self.side_results_text.insert(tk.END, "\n\n=== CMM Measurement Report ===")
             self.side_results_text.insert(tk.END, f"\nProbe Type: {self.cmm_probe_type}")
             self.side_results_text.insert(tk.END, f"\nNominal Accuracy: ±{self.cmm_accuracy} µm")
+        
+        self.display_catalog_matches()
+
+    def load_tool_catalog(self):
+        """Choose the CSV of nominal tool specs used for catalog matching"""
+        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+        if file_path:
+            self.catalog_path = file_path
+            self.catalog = None
+            if self.get_tool_catalog() is not None:
+                messagebox.showinfo("Catalog Loaded", f"Loaded {len(self.catalog)} catalog entries")
+                self.display_measurements()
+
+    def get_tool_catalog(self):
+        """Catalog for nearest-neighbour lookups, loaded once from catalog_path"""
+        if self.catalog is None and self.catalog_path and os.path.exists(self.catalog_path):
+            try:
+                self.catalog = ToolCatalog(self.catalog_path)
+                self.update_status(f"Tool catalog: {len(self.catalog)} entries from {os.path.basename(self.catalog_path)}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not load tool catalog: {str(e)}")
+                self.catalog_path = None
+        return self.catalog
+
+    def display_catalog_matches(self):
+        """Show the nearest catalog items for the combined top/side measurements"""
+        measured = {}
+        for view in ('top_view', 'side_view'):
+            for name, value in self.current_measurement[view]['measurements'].items():
+                if name in CATALOG_FEATURES:
+                    measured.setdefault(name, value)
+        if not measured or self.get_tool_catalog() is None:
+            return
+            
+        matches = self.catalog.match(measured, k=self.catalog_matches)
+        if not matches:
+            return
+        self.top_results_text.insert(tk.END, "\n\n=== Catalog Matches ===")
+        for match in matches:
+            self.top_results_text.insert(tk.END, f"\n{match['item']} {match['description']}".rstrip()
+                                         + f" (distance {match['distance_mm']:.3f} mm)")
+            for name, dev in match['deviations'].items():
+                self.top_results_text.insert(tk.END, f"\n  {name.replace('_', ' ').title()} deviation: {dev:+.4f} mm")
 
     def save_current_measurement(self):
         """Save the current measurement to history"""
@@ -1521,18 +5305,171 @@ class CNCToolMeasurerPro:
         self.current_measurement['metadata']['operator'] = self.operator_entry.get()
         self.current_measurement['metadata']['notes'] = self.notes_text.get("1.0", tk.END).strip()
         
-        self.measurement_history.append(self.current_measurement.copy())
+        self.measurement_history.append(self.current_measurement)
+        self.metrics.inc("toolfmm_measurements_saved_total", source="interactive")
         self.update_history_tree()
         self.save_history_to_file()
+        alerts = self.update_spc(self.current_measurement)
         
         messagebox.showinfo("Saved", "Measurement saved to history")
-        self.update_status("Measurement saved to history")
+        self.update_status("Measurement saved to history" + (f" - SPC: {alerts[0]}" if alerts else ""))
         self.unsaved_changes = False
+        if alerts:
+            messagebox.showwarning("SPC Alert", "\n".join(alerts))
+
+    def update_spc(self, measurement):
+        """Feed a saved measurement into the SPC statistics; returns alerts"""
+        tool_id = measurement['metadata']['tool_id'] or "(no id)"
+        alerts = []
+        for view in ('top_view', 'side_view'):
+            for name, value in measurement[view]['measurements'].items():
+                if not name.endswith('_std_dev') and isinstance(value, (int, float)):
+                    alerts.extend(self.spc.add(tool_id, name, value))
+        try:
+            self.spc.save()
+        except OSError as e:
+            self.update_status(f"Could not save SPC state: {str(e)}")
+        return alerts
+
+    def set_spc_tolerances(self):
+        """Set lower/upper specification limits for a tool ID and feature"""
+        tool_id = self.tool_id_entry.get().strip() or "(no id)"
+        feature = simpledialog.askstring("SPC Tolerances", f"Feature for tool '{tool_id}' (e.g. diameter_mm):",
+                                         initialvalue="diameter_mm")
+        if not feature:
+            return
+        limits = simpledialog.askstring("SPC Tolerances", f"Lower and upper limit for {feature} (e.g. 9.98, 10.02):")
+        try:
+            lsl, usl = (float(v) for v in limits.split(','))
+        except (AttributeError, ValueError):
+            messagebox.showerror("Error", "Enter two numbers separated by a comma")
+            return
+        self.spc.set_tolerance(tool_id, feature.strip(), min(lsl, usl), max(lsl, usl))
+        self.spc.save()
+        self.update_status(f"SPC tolerance for {tool_id} {feature}: {min(lsl, usl)} - {max(lsl, usl)}")
+
+    def show_spc_charts(self):
+        """X-bar and R charts with capability figures for a tool ID and feature"""
+        keys = self.spc.keys()
+        if not keys:
+            messagebox.showinfo("SPC", "No saved measurements yet")
+            return
+            
+        dialog = tk.Toplevel(self.root)
+        dialog.title("SPC Charts")
+        labels = [f"{tool_id} - {feature}" for tool_id, feature in keys]
+        combo = ttk.Combobox(dialog, values=labels, state='readonly')
+        combo.pack(fill=tk.X, padx=5, pady=5)
+        xbar_canvas = tk.Canvas(dialog, width=640, height=220, bg="#fff")
+        xbar_canvas.pack(fill=tk.BOTH, expand=True, padx=5)
+        r_canvas = tk.Canvas(dialog, width=640, height=160, bg="#fff")
+        r_canvas.pack(fill=tk.BOTH, expand=True, padx=5)
+        stats_var = tk.StringVar()
+        ttk.Label(dialog, textvariable=stats_var, justify=tk.LEFT).pack(fill=tk.X, padx=5, pady=5)
+        
+        def refresh(event=None):
+            summary = self.spc.summary(*keys[combo.current()])
+            limits = summary['limits']
+            groups = summary['subgroups']
+            if limits:
+                self.draw_control_chart(xbar_canvas, [g[0] for g in groups], limits['center'],
+                                        limits['ucl'], limits['lcl'], "X-bar")
+                self.draw_control_chart(r_canvas, [g[1] for g in groups], limits['r_center'],
+                                        limits['r_ucl'], limits['r_lcl'], "R")
+            else:
+                xbar_canvas.delete("all")
+                r_canvas.delete("all")
+                xbar_canvas.create_text(10, 10, anchor=tk.NW,
+                                        text=f"Charts start after {self.spc.subgroup_size} measurements")
+            cap = "not set (use Set SPC Tolerances)"
+            if summary['cp'] is not None:
+                cap = f"Cp {summary['cp']:.2f}   Cpk {summary['cpk']:.2f}   (LSL {summary['lsl']}, USL {summary['usl']})"
+            stats_var.set(f"n = {summary['n']}   mean = {summary['mean']:.4f}   std = {summary['std']:.4f}   "
+                          f"min = {summary['min']:.4f}   max = {summary['max']:.4f}\nCapability: {cap}")
+        
+        combo.bind("<<ComboboxSelected>>", refresh)
+        combo.current(0)
+        dialog.after_idle(refresh)
+
+    def draw_control_chart(self, canvas, values, center, ucl, lcl, title):
+        """Plot subgroup statistics with center line and control limits"""
+        canvas.delete("all")
+        canvas.update_idletasks()
+        w, h = max(canvas.winfo_width(), 200), max(canvas.winfo_height(), 100)
+        pad = 40
+        lo, hi = min(values + [lcl]), max(values + [ucl])
+        span = (hi - lo) or 1.0
+        lo, hi = lo - 0.1 * span, hi + 0.1 * span
+        
+        def y(v):
+            return h - pad / 2 - (v - lo) / (hi - lo) * (h - pad)
+        
+        for level, color, label in ((ucl, "#c00", "UCL"), (center, "#070", "CL"), (lcl, "#c00", "LCL")):
+            canvas.create_line(pad, y(level), w - 5, y(level), fill=color, dash=(4, 2))
+            canvas.create_text(pad - 3, y(level), anchor=tk.E, text=f"{label}\n{level:.4f}", font=('Helvetica', 7))
+        step = (w - pad - 10) / max(len(values) - 1, 1)
+        points = [(pad + i * step, y(v)) for i, v in enumerate(values)]
+        if len(points) > 1:
+            canvas.create_line(*[c for p in points for c in p], fill="#036")
+        for (px, py), v in zip(points, values):
+            color = "#c00" if v > ucl or v < lcl else "#036"
+            canvas.create_oval(px - 3, py - 3, px + 3, py + 3, fill=color, outline=color)
+        canvas.create_text(w - 5, 5, anchor=tk.NE, text=f"{title} chart", font=('Helvetica', 9, 'bold'))
+
+    def write_history_file(self):
+        """Replace measurement_history.json atomically, so a crash never leaves half a file"""
+        path = "measurement_history.json"
+        with open(path + ".tmp", 'w') as f:
+            json.dump(self.measurement_history.to_records(), f, indent=2)
+        os.replace(path + ".tmp", path)
+        self.history_on_disk = len(self.measurement_history)
+        self.history_journaled = 0
+        try:
+            os.remove("measurement_history.jsonl")
+        except FileNotFoundError:
+            pass
+
+    def append_history_journal(self, records):
+        """Append records to measurement_history.jsonl, or rewrite the JSON file when that is due"""
+        # Rewriting once the journal is as long as the file keeps the cost per record amortized O(1)
+        if (self.history_on_disk is None
+                or self.history_journaled + len(records) > max(1000, self.history_on_disk)):
+            self.write_history_file()
+            return
+        try:
+            with open("measurement_history.jsonl", 'a' if self.history_journaled else 'w') as f:
+                if not self.history_journaled:
+                    # Records in the JSON file this journal extends; a mismatch on load means it is stale
+                    f.write(json.dumps({'base': self.history_on_disk}) + "\n")
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            self.history_on_disk = None  # The journal may hold a partial line; rewrite next time
+            raise
+        self.history_journaled += len(records)
+
+    @staticmethod
+    def read_history_journal(path, history):
+        """Append the records of the journal extending a JSON history file that was just loaded"""
+        try:
+            with open(path, 'r') as f:
+                header = f.readline()
+                if not header or json.loads(header).get('base') != len(history):
+                    return
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # Cut short by a crash; its file was never moved out of the watch folder
+                    history.append(record)
+        except FileNotFoundError:
+            pass
 
     def save_history_to_file(self):
         try:
-            with open("measurement_history.json", 'w') as f:
-                json.dump(self.measurement_history, f, indent=2)
+            self.write_history_file()
         except Exception as e:
             messagebox.showerror("Error", f"Could not save history: {str(e)}")
 
@@ -1542,11 +5479,12 @@ class CNCToolMeasurerPro:
             try:
                 if file_path.endswith('.json'):
                     with open(file_path, 'r') as f:
-                        self.measurement_history = json.load(f)
+                        self.measurement_history = MeasurementHistory(json.load(f))
+                    self.read_history_journal(os.path.splitext(file_path)[0] + ".jsonl", self.measurement_history)
                 elif file_path.endswith('.csv'):
                     with open(file_path, 'r') as f:
                         reader = csv.DictReader(f)
-                        self.measurement_history = []
+                        self.measurement_history = MeasurementHistory()
                         for row in reader:
                             self.measurement_history.append({
                                 'metadata': {
@@ -1561,6 +5499,7 @@ class CNCToolMeasurerPro:
                                     }
                                 }
                             })
+                self.history_on_disk = None
                 self.update_history_tree()
                 messagebox.showinfo("Success", f"Loaded {len(self.measurement_history)} measurements")
                 self.update_status(f"History loaded from {os.path.basename(file_path)}")
@@ -1569,21 +5508,51 @@ class CNCToolMeasurerPro:
 
     def clear_history(self):
         if messagebox.askyesno("Confirm", "Clear all measurement history?"):
-            self.measurement_history = []
+            self.measurement_history = MeasurementHistory()
+            self.history_on_disk = None
             self.update_history_tree()
             self.update_status("Measurement history cleared")
 
     def update_history_tree(self):
+        if self.history_tree is None:
+            return  # Filled when the panel is first shown
         self.history_tree.delete(*self.history_tree.get_children())
-        for idx, measurement in enumerate(self.measurement_history[-50:]):
-            diameter = measurement['top_view']['measurements'].get('diameter_mm', 'N/A') if 'top_view' in measurement else 'N/A'
+        history = self.measurement_history
+        start = max(0, len(history) - 50)
+        diameters = history.column('top_view', 'diameter_mm')[start:]
+        for idx, diameter in enumerate(diameters, start):
+            metadata = history.metadata(idx)
             self.history_tree.insert('', 'end', text=str(idx+1),
-                                   values=(measurement['metadata']['timestamp'],
-                                          measurement['metadata']['tool_id'],
-                                          measurement['metadata']['operator'],
-                                          f"{diameter:.2f}" if isinstance(diameter, float) else diameter))
+                                   values=(metadata['timestamp'],
+                                          metadata['tool_id'],
+                                          metadata['operator'],
+                                          'N/A' if np.isnan(diameter) else f"{diameter:.2f}"))
+
+    def show_history_statistics(self):
+        """Per-tool count, mean, spread and range of every saved feature"""
+        history = self.measurement_history
+        if not len(history):
+            messagebox.showinfo("History Statistics", "No saved measurements yet")
+            return
+            
+        window = tk.Toplevel(self.root)
+        window.title("History Statistics")
+        text = tk.Text(window, wrap=tk.NONE, width=100, height=30)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert(tk.END, f"{len(history)} measurements, {len(history.tables['tool_id'])} tool IDs\n")
+        for view, name in history.feature_names():
+            if name.endswith('_std_dev') or name == 'pixels_per_mm':
+                continue
+            text.insert(tk.END, f"\n=== {view.replace('_', ' ').title()}: {name.replace('_', ' ').title()} ===\n")
+            for row in history.aggregate(view, name):
+                text.insert(tk.END, f"{row['tool_id'] or '(no id)':<20} n={row['n']:<5} mean={row['mean']:.4f} "
+                                    f"std={row['std']:.4f} min={row['min']:.4f} max={row['max']:.4f} "
+                                    f"{measurement_unit(name)}\n")
+        text.configure(state='disabled')
 
     def view_history_details(self):
+        if self.history_tree is None:
+            return
         selected = self.history_tree.focus()
         if not selected:
             return
@@ -1604,16 +5573,89 @@ class CNCToolMeasurerPro:
             if 'top_view' in measurement:
                 text.insert(tk.END, "=== Top View ===\n")
                 for name, value in measurement['top_view']['measurements'].items():
-                    text.insert(tk.END, f"{name.replace('_', ' ').title()}: {value:.2f} mm\n")
+                    text.insert(tk.END, f"{name.replace('_', ' ').title()}: {value:.2f} {measurement_unit(name)}\n")
                     
             if 'side_view' in measurement:
                 text.insert(tk.END, "\n=== Side View ===\n")
                 for name, value in measurement['side_view']['measurements'].items():
-                    text.insert(tk.END, f"{name.replace('_', ' ').title()}: {value:.2f} mm\n")
+                    text.insert(tk.END, f"{name.replace('_', ' ').title()}: {value:.2f} {measurement_unit(name)}\n")
                     
             text.insert(tk.END, f"\nNotes:\n{measurement['metadata']['notes']}")
             text.config(state=tk.DISABLED)
 
+    def save_wear_baseline(self):
+        """Store the detected tool outline (and side profile) as the new-tool baseline"""
+        tool_id = self.tool_id_entry.get().strip()
+        if not tool_id:
+            messagebox.showerror("Error", "Enter a Tool ID before saving a baseline")
+            return
+        if self.pixels_per_mm is None or not self.detected_objects or self.current_view is None:
+            messagebox.showerror("Error", "Detect the tool and set the reference scale first")
+            return
+            
+        tool_obj = next(obj for obj in self.detected_objects if obj['type'] == 'tool')
+        contour_mm = tool_obj['contour'].reshape(-1, 2) / self.pixels_per_mm
+        profile_mm = None
+        if self.current_view == 'side_view' and self.tool_profile is not None:
+            profile_mm = self.tool_profile['widths'] / self.pixels_per_mm
+            
+        if self.baselines.has(tool_id, self.current_view):
+            if not messagebox.askyesno("Replace Baseline", f"Replace the existing baseline for {tool_id}?"):
+                return
+        self.baselines.save(tool_id, self.current_view, contour_mm, profile_mm)
+        self.update_status(f"Wear baseline saved for {tool_id} ({self.current_view.replace('_', ' ')})")
+
+    def compare_with_baseline(self, show_report=True):
+        """Compare the detected tool outline with its baseline and draw the wear map"""
+        tool_id = self.tool_id_entry.get().strip()
+        if self.pixels_per_mm is None or not self.detected_objects or self.current_view is None:
+            if show_report:
+                messagebox.showerror("Error", "Detect the tool and set the reference scale first")
+            return None
+        if not self.baselines.has(tool_id, self.current_view):
+            if show_report:
+                messagebox.showinfo("No Baseline", f"No {self.current_view.replace('_', ' ')} baseline for tool '{tool_id}'")
+            return None
+            
+        tool_obj = next(obj for obj in self.detected_objects if obj['type'] == 'tool')
+        wear = self.baselines.compare(tool_id, self.current_view,
+                                      tool_obj['contour'].reshape(-1, 2) / self.pixels_per_mm)
+        self.last_wear = wear
+        self.draw_wear_map(wear)
+        
+        if show_report:
+            lines = [f"=== Wear Map: {tool_id} ({self.current_view.replace('_', ' ')}) ===",
+                     f"Chamfer distance: {wear['chamfer_mm']:.4f} mm",
+                     f"Hausdorff distance: {wear['hausdorff_mm']:.4f} mm",
+                     "",
+                     "Region (deg)   Mean dev (mm)   Max dev (mm)"]
+            n = len(wear['region_max_mm'])
+            for i, (mean_dev, max_dev) in enumerate(zip(wear['region_mean_mm'], wear['region_max_mm'])):
+                flag = "  WEAR" if max_dev > self.wear_tolerance_mm and mean_dev < 0 else ""
+                lines.append(f"{i * 360 // n:3d}-{(i + 1) * 360 // n:<3d}       {mean_dev:+.4f}         {max_dev:.4f}{flag}")
+            self.show_scrollable_message("Wear Comparison", "\n".join(lines))
+            self.update_status(f"Wear comparison: Hausdorff {wear['hausdorff_mm']:.3f} mm")
+        return wear
+
+    def draw_wear_map(self, wear):
+        """Color the measured outline by region deviation on the tool canvas"""
+        overlay = self.tool_canvas.overlay
+        overlay.clear("wear")
+        points = self.contour_to_display(wear['points_mm'] * self.pixels_per_mm)
+        for i, max_dev in enumerate(wear['region_max_mm']):
+            sel = np.flatnonzero(wear['region'] == i)
+            if len(sel) < 2:
+                continue
+            if max_dev <= self.wear_tolerance_mm:
+                color = (0, 200, 0)
+            elif max_dev <= 4 * self.wear_tolerance_mm:
+                color = (0, 200, 255)
+            else:
+                color = (0, 0, 255)
+            # Split where the sector's points are not consecutive along the outline
+            for run in np.split(sel, np.flatnonzero(np.diff(sel) > 1) + 1):
+                overlay.polyline(points[run], color, 3, tags=("wear",))
+
     def ai_analyze(self):
         """Enhanced AI analysis with more detailed feedback"""
         if not self.detected_objects:
@@ -1682,11 +5724,26 @@ class CNCToolMeasurerPro:
                 f"- Estimated uncertainty: ±{self.cmm_accuracy}µm"
             ])
         
+        # Compare against the new-tool baseline when one exists
+        wear = self.compare_with_baseline(show_report=False)
+        if wear is not None:
+            worn = int(np.sum((wear['region_max_mm'] > self.wear_tolerance_mm) & (wear['region_mean_mm'] < 0)))
+            insights.extend([
+                "",
+                "Wear Analysis (vs. new-tool baseline):",
+                f"- Chamfer distance: {wear['chamfer_mm']:.4f} mm",
+                f"- Hausdorff distance: {wear['hausdorff_mm']:.4f} mm",
+                f"- Worn regions: {worn} of {len(wear['region_max_mm'])}"
+            ])
+            worn_tool = worn > 0
+        else:
+            worn_tool = circularity < 0.9
+        
         insights.extend([
             "",
             "Recommendations:",
             "- Verify against tool specifications sheet",
-            "- Check for visible wear or damage" if circularity < 0.9 else "- Tool geometry appears within normal parameters",
+            "- Check for visible wear or damage" if worn_tool else "- Tool geometry appears within normal parameters",
             "- Re-measure if lighting conditions were suboptimal"
         ])
         
@@ -1718,9 +5775,9 @@ class CNCToolMeasurerPro:
                             continue
                         if f"{name}_std_dev" in self.current_measurement['top_view']['measurements']:
                             std_dev = self.current_measurement['top_view']['measurements'][f"{name}_std_dev"]
-                            f.write(f"  {name.replace('_', ' ').title()}: {value:.4f} ±{std_dev:.4f} mm\n")
+                            f.write(f"  {name.replace('_', ' ').title()}: {value:.4f} ±{std_dev:.4f} {measurement_unit(name)}\n")
                         else:
-                            f.write(f"  {name.replace('_', ' ').title()}: {value:.4f} mm\n")
+                            f.write(f"  {name.replace('_', ' ').title()}: {value:.4f} {measurement_unit(name)}\n")
                 
                 if 'side_view' in self.current_measurement:
                     f.write("\nSide View Measurements:\n")
@@ -1729,9 +5786,9 @@ class CNCToolMeasurerPro:
                             continue
                         if f"{name}_std_dev" in self.current_measurement['side_view']['measurements']:
                             std_dev = self.current_measurement['side_view']['measurements'][f"{name}_std_dev"]
-                            f.write(f"  {name.replace('_', ' ').title()}: {value:.4f} ±{std_dev:.4f} mm\n")
+                            f.write(f"  {name.replace('_', ' ').title()}: {value:.4f} ±{std_dev:.4f} {measurement_unit(name)}\n")
                         else:
-                            f.write(f"  {name.replace('_', ' ').title()}: {value:.4f} mm\n")
+                            f.write(f"  {name.replace('_', ' ').title()}: {value:.4f} {measurement_unit(name)}\n")
             
             messagebox.showinfo("Export Complete", f"Report saved to:\n{file_path}")
             self.update_status(f"Report exported to {os.path.basename(file_path)}")
@@ -1752,21 +5809,22 @@ class CNCToolMeasurerPro:
             # Save measurement data
             data_path = os.path.join(dir_path, "measurement_data.json")
             with open(data_path, 'w') as f:
-                json.dump(self.current_measurement, f, indent=2)
+                json.dump(MeasurementHistory([self.current_measurement])[0], f, indent=2)  # Without images
             
             # Save history
             history_path = os.path.join(dir_path, "measurement_history.csv")
             with open(history_path, 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(['Timestamp', 'Tool ID', 'Operator', 'Diameter (mm)', 'Notes'])
-                for m in self.measurement_history:
-                    diameter = m['top_view']['measurements'].get('diameter_mm', '') if 'top_view' in m else ''
+                history = self.measurement_history
+                for idx, diameter in enumerate(history.column('top_view', 'diameter_mm')):
+                    metadata = history.metadata(idx)
                     writer.writerow([
-                        m['metadata']['timestamp'],
-                        m['metadata']['tool_id'],
-                        m['metadata']['operator'],
-                        diameter,
-                        m['metadata']['notes'].replace('\n', ' ')
+                        metadata['timestamp'],
+                        metadata['tool_id'],
+                        metadata['operator'],
+                        '' if np.isnan(diameter) else diameter,
+                        metadata['notes'].replace('\n', ' ')
                     ])
             
             messagebox.showinfo("Export Complete", f"All data exported to:\n{dir_path}")
@@ -1777,12 +5835,16 @@ class CNCToolMeasurerPro:
             if not messagebox.askyesno("Unsaved Changes", "You have unsaved changes. Reset anyway?"):
                 return
                 
+        self.tasks.cancel_all()  # Results would belong to the cleared measurement
+        self.release_memmap()
         self.initialize_variables()
+        for _, record in self.watch_unsaved:
+            self.measurement_history.append(record)  # Not on disk yet; their files are still waiting
         self.update_view_indicator()
         self.display_measurements()
-        self.ref_canvas.delete("all")
-        self.tool_canvas.delete("all")
-        self.overlay_canvas.delete("all")
+        self.ref_canvas.overlay.reset()
+        self.tool_canvas.overlay.reset()
+        self.overlay_canvas.overlay.reset()
         self.tool_id_entry.delete(0, tk.END)
         self.operator_entry.delete(0, tk.END)
         self.notes_text.delete(1.0, tk.END)
@@ -1794,8 +5856,15 @@ class CNCToolMeasurerPro:
             if not messagebox.askyesno("Unsaved Changes", "You have unsaved changes. Exit anyway?"):
                 return
                 
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.watch_folder is not None:
+            self.watch_folder.stop()
+        self.tasks.shutdown()
+        self.metrics.shutdown()
         if self.camera_active and self.cap:
             self.cap.release()
+        self.release_memmap()
         self.root.destroy()
 
     def toggle_dark_mode(self):
@@ -1880,7 +5949,92 @@ class CNCToolMeasurerPro:
             self.measurement_strategy = strategy.lower()
             self.update_status(f"Measurement strategy set to {self.measurement_strategy}")
 
+def _startup_probe(t_start):
+    """Report import and first-paint time of this process as one JSON line"""
+    t_imported = time.perf_counter()
+    root = tk.Tk()
+    app = CNCToolMeasurerPro(root, show_guidance=False)
+    timings = {'import_s': t_imported - t_start}
+
+    def on_map(event):
+        if event.widget is root and 'first_paint_s' not in timings:
+            root.update_idletasks()
+            timings['first_paint_s'] = time.perf_counter() - t_start
+            root.after_idle(root.destroy)
+
+    root.bind('<Map>', on_map, add='+')
+    root.mainloop()
+    print(json.dumps(timings))
+
+
+def benchmark_startup(runs=5):
+    """Measure import and first-paint time over several fresh interpreter starts"""
+    import subprocess
+    import statistics
+
+    probe = ("import time; t0 = time.perf_counter(); "
+             "import toolFMM; toolFMM._startup_probe(t0)")
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", probe], cwd=here,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"Startup benchmark ({runs} runs)")
+    for key, label in (('import_s', 'Import'), ('first_paint_s', 'First paint')):
+        values = [s[key] * 1000 for s in samples]
+        print(f"  {label:<12} median {statistics.median(values):8.1f} ms   "
+              f"min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+    return samples
+
+
+def benchmark_replay(directory):
+    """Time edge and contour detection over every frame of a recorded session"""
+    import statistics
+
+    cap = ReplayCapture(directory, realtime=False)
+    if not cap.isOpened():
+        raise SystemExit(f"No recorded frames in {directory}")
+    flat = FlatField.load("flat_field.npz")
+    times = []
+    ret, frame = cap.read()
+    height, width = frame.shape[:2]
+    while ret:
+        start = time.perf_counter()
+        edges = detect_edges(frame, flat=flat)
+        cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        times.append((time.perf_counter() - start) * 1000)
+        ret, frame = cap.read()
+    times.sort()
+    print(f"Replay benchmark ({len(times)} frames, {width}x{height}{', flat field' if flat else ''})")
+    print(f"  Detection    median {statistics.median(times):8.2f} ms   "
+          f"p95 {times[int(0.95 * (len(times) - 1))]:8.2f} ms   max {times[-1]:8.2f} ms")
+    return times
+
+
+def _option(flag):
+    """Value following a command line flag, or None"""
+    if flag in sys.argv and sys.argv.index(flag) + 1 < len(sys.argv):
+        return sys.argv[sys.argv.index(flag) + 1]
+    return None
+
+
 if __name__ == "__main__":
+    if "--benchmark-startup" in sys.argv:
+        benchmark_startup()
+        sys.exit(0)
+    if _option("--benchmark-replay"):
+        benchmark_replay(_option("--benchmark-replay"))
+        sys.exit(0)
     root = tk.Tk()
     app = CNCToolMeasurerPro(root)
+    if _option("--replay"):
+        # Use a recorded session as the camera, at recorded speed unless --max-speed
+        app.replay_path = _option("--replay")
+        app.replay_realtime = "--max-speed" not in sys.argv
+    if _option("--watch"):
+        app.toggle_watch_folder(_option("--watch"))
+    if _option("--metrics-port") or _option("--metrics-file"):
+        app.start_metrics_export(_option("--metrics-port"), _option("--metrics-file"))
     root.mainloop()